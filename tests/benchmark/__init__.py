@@ -0,0 +1,6 @@
+# benchmark.__init__.py
+
+# This is necessary to run benchmarks via command line:
+import sys
+sys.path.insert(0, "./webtomator")
+sys.path.insert(0, "./tests")
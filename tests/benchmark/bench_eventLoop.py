@@ -0,0 +1,120 @@
+# benchmark.bench_eventLoop.py
+""" Compares the event loop backends (see `network.eventLoop`) for many concurrent HTTP
+requests against a local aiohttp test server: Requests per second and CPU time of the
+client process per request, once with keep-alive connections and once with a new
+connection per request, as with rotating proxies. Backends which are not installed are
+skipped. The server runs in separate processes, so it does not count to the client's CPU.
+Run from the project root: python -m tests.benchmark.bench_eventLoop [--requests N]
+"""
+import asyncio
+import multiprocessing as mp
+import os
+import socket
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+from network.eventLoop import EVENT_LOOPS, createEventLoopPolicy, isEventLoopAvailable
+
+REQUEST_COUNT = 20_000
+CONCURRENCY = 500
+PAGE_BYTES = 30_000
+""" About the size of a product page. """
+
+
+def _getFreePort() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _runServer(port: int, reusePort: bool, ready: mp.Event) -> None:
+    page = b"<html><body>" + b"x" * PAGE_BYTES + b"</body></html>"
+
+    async def handlePage(request: web.Request) -> web.Response:
+        return web.Response(body=page, content_type="text/html")
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/product", handlePage)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port, reuse_port=reusePort,
+                          backlog=CONCURRENCY * 2).start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+async def _fetchAll(url: str, requestCount: int, isKeepAlive: bool) -> None:
+    connector = aiohttp.TCPConnector(limit=CONCURRENCY, force_close=not isKeepAlive)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        remaining = iter(range(requestCount))
+
+        async def fetchNext():
+            for _ in remaining:
+                async with session.get(url) as response:
+                    await response.read()
+
+        await asyncio.gather(*(fetchNext() for _ in range(CONCURRENCY)))
+
+
+def benchLoop(name: str, url: str, requestCount: int, isKeepAlive: bool) -> None:
+    asyncio.set_event_loop_policy(createEventLoopPolicy(name))
+    try:
+        # Warm up, so connection setup of the first run does not count.
+        asyncio.run(_fetchAll(url, CONCURRENCY, isKeepAlive))
+        cpuStart = time.process_time()
+        start = time.perf_counter()
+        asyncio.run(_fetchAll(url, requestCount, isKeepAlive))
+        duration = time.perf_counter() - start
+        cpuDuration = time.process_time() - cpuStart
+    finally:
+        asyncio.set_event_loop_policy(None)
+
+    connections = "keep-alive" if isKeepAlive else "new connection per request"
+    print(f"{name:<8} {connections:<28} {requestCount / duration:>10.0f} req/s "
+          f"{cpuDuration / requestCount * 1e6:>10.1f} µs CPU/request")
+
+
+def main():
+    requestCount = REQUEST_COUNT
+    if "--requests" in sys.argv:
+        requestCount = int(sys.argv[sys.argv.index("--requests") + 1])
+
+    # Several server processes, so the server is not what limits the client.
+    reusePort = sys.platform != "win32"
+    serverCount = max(1, (os.cpu_count() or 2) - 1) if reusePort else 1
+    port = _getFreePort()
+    context = mp.get_context("spawn")
+    servers = list()
+    for _ in range(serverCount):
+        ready = context.Event()
+        server = context.Process(target=_runServer, args=(port, reusePort, ready), daemon=True)
+        server.start()
+        if not ready.wait(timeout=30):
+            raise RuntimeError("Test server did not start.")
+        servers.append(server)
+
+    try:
+        url = f"http://127.0.0.1:{port}/product"
+        print(f"{requestCount} requests, {CONCURRENCY} concurrent, {serverCount} server "
+              f"process(es)")
+        for name in EVENT_LOOPS:
+            if not isEventLoopAvailable(name):
+                print(f"{name:<8} not available, skipped")
+                continue
+            for isKeepAlive in (True, False):
+                benchLoop(name, url, requestCount, isKeepAlive)
+
+    finally:
+        for server in servers:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# benchmark.bench_productMemory.py
+""" Measures the memory retained by decoded products: 12,500 products with 8 sizes each,
+so 100k sizes in total.
+Run from the project root: python -m tests.benchmark.bench_productMemory
+"""
+import gc
+import json
+import tracemalloc
+
+from benchmark.benchhelper import createShop
+from shop.shop import Shop
+
+PRODUCT_COUNT = 12_500
+
+
+def main():
+    # Decode from JSON text, as when loading shops, so no strings are shared by accident.
+    shopJson = json.dumps(createShop(productCount=PRODUCT_COUNT).toDict())
+    shopDict = json.loads(shopJson)
+    sizeCount = sum(len(productDict["sizes"]) for productDict in shopDict["products"])
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    shop = Shop.fromDict(shopDict)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    retained = after - before
+    print(f"{len(shop.products)} products, {sizeCount} sizes")
+    print(f"{'Retained by Shop.fromDict':<40} {retained / 2 ** 20:>10.1f} MiB")
+    print(f"{'Peak while decoding':<40} {(peak - before) / 2 ** 20:>10.1f} MiB")
+    print(f"{'Per size (incl. product share)':<40} {retained / sizeCount:>10.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmark.bench_productsUrlsUpdate.py
+""" Compares the reconciliation of ShopRepo.updateFromProductsUrls for 50k product URLs in
+50 shops, of which 2% are new and 2% have been removed: Former nested scans vs. planned diff.
+Shops are neither loaded nor written.
+Run from the project root: python -m tests.benchmark.bench_productsUrlsUpdate
+"""
+from typing import List, Tuple
+
+from benchmark.benchhelper import createShop, measure
+from shop.product import Product
+from shop.shop import Shop
+from shop.shopRepo import ShopRepo
+
+SHOP_COUNT = 50
+URLS_PER_SHOP = 1_000
+CHANGED_PER_SHOP = 20
+REPEAT = 3
+
+
+def reconcileByScans(repoShops: List[Shop], urlsShops: List[Shop]) -> List[Shop]:
+    """ Former implementation of the reconciliation in updateFromProductsUrls, for reference. """
+    for shopCandidate in urlsShops:
+        results = list(filter(lambda s: s.url == shopCandidate.url, repoShops))
+        if results:
+            foundPersistentProductsUrls = [url for url in results[0].getProductUrls() if url]
+            for productCandidate in shopCandidate.products:
+                if productCandidate.url not in foundPersistentProductsUrls:
+                    results[0].addProduct(product=productCandidate)
+        else:
+            repoShops.append(shopCandidate)
+
+    for persistentShop in reversed(repoShops):
+        results = list(filter(lambda s: s.url == persistentShop.url, urlsShops))
+        if results:
+            foundProductsUrls = [url for url in results[0].getProductUrls() if url]
+            if all(url in foundProductsUrls for url in persistentShop.getProductUrls()):
+                continue
+            productsToDelete = \
+                [p for p in persistentShop.products if p.url not in foundProductsUrls]
+            [persistentShop.products.remove(p) for p in productsToDelete]
+        else:
+            repoShops.remove(persistentShop)
+
+    return repoShops
+
+
+def reconcileByPlan(repoShops: List[Shop], urlsShops: List[Shop]) -> List[Shop]:
+    plan = ShopRepo._planProductsUrlsUpdate(repoShops, urlsShops)
+    return ShopRepo._applyProductsUrlsPlan(repoShops, plan)
+
+
+def createInput() -> Tuple[List[Shop], List[Shop]]:
+    repoShops = [createShop(productCount=URLS_PER_SHOP, sizeCount=0, shopNumber=i)
+                 for i in range(SHOP_COUNT)]
+    urlsShops: List[Shop] = list()
+
+    for repoShop in repoShops:
+        # Drop the first products, add the same count of new ones.
+        urls = [p.url for p in repoShop.products[CHANGED_PER_SHOP:]]
+        urls += [f"{repoShop.url}/new/{i}" for i in range(CHANGED_PER_SHOP)]
+        urlsShops.append(Shop(url=repoShop.url, products=[Product(url=url) for url in urls]))
+
+    return repoShops, urlsShops
+
+
+def main():
+    def getUrls(shops: List[Shop]) -> List[Tuple[str, List[str]]]:
+        return sorted((s.url, sorted(s.getProductUrls())) for s in shops)
+    assert getUrls(reconcileByScans(*createInput())) == getUrls(reconcileByPlan(*createInput()))
+
+    print(f"{SHOP_COUNT} shops with {URLS_PER_SHOP} product URLs each, "
+          f"{CHANGED_PER_SHOP} added and {CHANGED_PER_SHOP} removed per shop")
+
+    for label, reconcile in (("Reconcile: nested scans (former)", reconcileByScans),
+                             ("Reconcile: planned diff", reconcileByPlan)):
+        inputs = [createInput() for _ in range(REPEAT)]
+        measure(label, lambda: reconcile(*inputs.pop()), repeat=REPEAT)
+
+
+if __name__ == "__main__":
+    main()
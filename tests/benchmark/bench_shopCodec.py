@@ -0,0 +1,46 @@
+# benchmark.bench_shopCodec.py
+""" Compares encoding and decoding of a shop with 10k products.
+Run from the project root: python -m tests.benchmark.bench_shopCodec
+"""
+import json
+
+from benchmark.benchhelper import createShop, measure
+from shop.product import Product, Size
+from shop.shop import Shop
+from shop.shopDao import TinyShopDao
+
+PRODUCT_COUNT = 10_000
+DICT_KEYS = {cls: tuple(cls().toDict()) for cls in (Shop, Product, Size)}
+""" Data attributes per class. Derived from toDict(), so caches and change tracking state are
+left out without listing them. """
+
+
+def encodeByJsonRoundTrip(shop: Shop) -> dict:
+    """ Former implementation of TinyShopDao._encodeShop, for reference. """
+    def getAttributes(o) -> dict:
+        # Private attributes are mangled like _Product__name.
+        prefix = f"_{type(o).__name__}__"
+        return {f"{prefix}{k}": getattr(o, f"{prefix}{k}") for k in DICT_KEYS[type(o)]}
+
+    jsonStr = json.dumps(getAttributes(shop), default=getAttributes)
+    jsonStr = jsonStr \
+        .replace(f"_{Shop.__name__}__", "") \
+        .replace(f"_{Product.__name__}__", "") \
+        .replace(f"_{Size.__name__}__", "")
+    return json.loads(jsonStr)
+
+
+def main():
+    shop = createShop(productCount=PRODUCT_COUNT)
+    shopDict = shop.toDict()
+    assert encodeByJsonRoundTrip(shop) == shopDict
+
+    print(f"Shop with {PRODUCT_COUNT} products, {len(shop.products[0].sizes)} sizes each")
+    measure("Encode: JSON round trip (former)", lambda: encodeByJsonRoundTrip(shop))
+    measure("Encode: TinyShopDao._encodeShop (toDict)", lambda: TinyShopDao._encodeShop(shop))
+    measure("Decode: TinyShopDao._decodeShops (fromDict)",
+            lambda: TinyShopDao._decodeShops([shopDict]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmark.bench_shopDaoBackends.py
+""" Compares TinyShopDao and SqliteShopDao for a single shop with 100, 10k and 100k products:
+Loading all shops, and updating the shop after one size changed its stock state.
+Run from the project root: python -m tests.benchmark.bench_shopDaoBackends [--skip-tiny-100k]
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmark.benchhelper import createShop, measure
+from shop.shopDao import TinyShopDao, SqliteShopDao
+
+PRODUCT_COUNTS = (100, 10_000, 100_000)
+
+
+def benchDao(label: str, daoClass, path: Path, productCount: int) -> None:
+    shop = createShop(productCount=productCount)
+    path.touch()
+    with daoClass(path) as dao:
+        dao.saveAll(data=[shop])
+    shop.commitChanges()
+
+    size = shop.products[productCount // 2].sizes[0]
+
+    def updateOneSize():
+        size.isInStock = not size.isInStock
+        with daoClass(path) as dao:
+            dao.update(data=shop, changesOnly=True)
+        shop.commitChanges()
+
+    def loadAll():
+        with daoClass(path) as dao:
+            dao.loadAll()
+
+    measure(f"{label} {productCount:>7} products: update one size", updateOneSize)
+    measure(f"{label} {productCount:>7} products: loadAll", loadAll, repeat=1)
+
+
+def main():
+    skipTiny100k = "--skip-tiny-100k" in sys.argv
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        for productCount in PRODUCT_COUNTS:
+            if not (skipTiny100k and productCount >= 100_000):
+                benchDao("TinyDB", TinyShopDao,
+                         Path(tempDir, f"Shops_{productCount}.json"), productCount)
+            benchDao("SQLite", SqliteShopDao,
+                     Path(tempDir, f"Shops_{productCount}.sqlite"), productCount)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# benchmark.bench_shopSaveAll.py
+""" Compares saving many shops with TinyShopDao.saveAll, as done at each startup by
+ShopRepo.updateFromProductsUrls: Former insert per shop vs. one bulk insert.
+Run from the project root: python -m tests.benchmark.bench_shopSaveAll
+"""
+import tempfile
+from pathlib import Path
+from typing import List
+
+from benchmark.benchhelper import createShop, measure
+from shop.shop import Shop
+from shop.shopDao import TinyShopDao
+from storage.tinyDao import TinyDao
+
+SHOP_COUNT = 50
+PRODUCTS_PER_SHOP = 200
+
+
+def saveAllByInserts(dao: TinyShopDao, shops: List[Shop]) -> None:
+    """ Former implementation of TinyShopDao.saveAll, for reference. """
+    TinyDao.saveAll(dao, list())
+    for shop in shops:
+        dao.insert(shop)
+
+
+def main():
+    shops = [createShop(productCount=PRODUCTS_PER_SHOP, shopNumber=i) for i in range(SHOP_COUNT)]
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        path = Path(tempDir, "Shops.json")
+        path.touch()
+
+        def former():
+            with TinyShopDao(path) as dao:
+                saveAllByInserts(dao, shops)
+
+        def bulk():
+            with TinyShopDao(path) as dao:
+                dao.saveAll(data=shops)
+
+        print(f"{SHOP_COUNT} shops with {PRODUCTS_PER_SHOP} products each")
+        measure("saveAll: insert per shop (former)", former)
+        measure("saveAll: bulk insert", bulk)
+
+
+if __name__ == "__main__":
+    main()
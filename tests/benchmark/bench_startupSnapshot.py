@@ -0,0 +1,41 @@
+# benchmark.bench_startupSnapshot.py
+""" Compares loading all shops from Shops.json (TinyShopDao) with loading them from a
+binary startup snapshot, for 10 shops with 2,000 products each.
+Run from the project root: python -m tests.benchmark.bench_startupSnapshot
+"""
+import tempfile
+from pathlib import Path
+
+from benchmark.benchhelper import createShop, measure
+from shop.shopDao import TinyShopDao
+from storage.snapshot import PickleSnapshot
+
+SHOP_COUNT = 10
+PRODUCTS_PER_SHOP = 2_000
+
+
+def main():
+    shops = [createShop(productCount=PRODUCTS_PER_SHOP, shopNumber=i) for i in range(SHOP_COUNT)]
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        shopsPath = Path(tempDir, "Shops.json")
+        shopsPath.touch()
+        with TinyShopDao(shopsPath) as dao:
+            dao.saveAll(data=shops)
+        for shop in shops:
+            shop.commitChanges()
+
+        snapshot = PickleSnapshot(Path(tempDir, "Shops.snapshot"), sourcePaths=[shopsPath])
+        snapshot.save(shops)
+
+        def loadJson():
+            with TinyShopDao(shopsPath) as dao:
+                dao.loadAll()
+
+        label = f"{SHOP_COUNT} shops, {PRODUCTS_PER_SHOP} products each"
+        measure(f"{label}: JSON loadAll", loadJson)
+        measure(f"{label}: snapshot load", snapshot.load)
+
+
+if __name__ == "__main__":
+    main()
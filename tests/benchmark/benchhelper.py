@@ -0,0 +1,46 @@
+# benchmark.benchhelper.py
+import time
+from typing import Callable, List
+
+from shop.product import Product, Size
+from shop.shop import Shop
+
+SIZES_EU = ("38", "38 2/3", "39 1/3", "40", "40 2/3", "41 1/3", "42", "42 2/3")
+
+
+def createShop(productCount: int, sizeCount: int = len(SIZES_EU), shopNumber: int = 0) -> Shop:
+    """ Creates a shop with completely filled products and sizes. """
+    shopUrl = f"https://www.shop-{shopNumber}.com"
+    products: List[Product] = list()
+
+    for i in range(productCount):
+        sizes = [Size(sizeEU=SIZES_EU[j % len(SIZES_EU)],
+                      price=99.95,
+                      url=f"{shopUrl}/product/{i}/size/{j}",
+                      urlAddToCart=f"{shopUrl}/atc/{i}/{j}",
+                      isInStock=bool((i + j) % 2))
+                 for j in range(sizeCount)]
+
+        products.append(Product(name=f"Product {i}",
+                                url=f"{shopUrl}/product/{i}",
+                                basePrice=99.95,
+                                currency="EUR",
+                                sizes=sizes,
+                                urlThumb=f"{shopUrl}/thumb/{i}.jpg",
+                                releaseDateStamp=1601466659.0,
+                                lastScanStamp=1588548868.304869))
+
+    return Shop(name=f"Shop {shopNumber}", url=shopUrl, products=products)
+
+
+def measure(label: str, func: Callable, repeat: int = 3) -> float:
+    """ Runs func `repeat` times, prints and returns the best duration in seconds. """
+    durations = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    best = min(durations)
+    print(f"{label:<60} {best * 1000:>10.1f} ms")
+    return best
@@ -0,0 +1 @@
+# unit.test_cluster.__init__.py
@@ -0,0 +1,224 @@
+# unit.test_cluster.test_coordinator.py
+import asyncio
+import socket
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from cluster.coordinator import Coordinator, HashRing, splitAddress
+from cluster.node import CoordinatorClient, CoordinatorShopDao
+from fixtures.shop import ShopFixture
+from shop.shopDao import JournaledShopDao, TinyShopDao
+from shop.shopRepo import AsyncShopRepo
+from unit.testhelper import WebtomatorTestCase, ProductsUrlsRepoMock
+
+
+class HashRingTest(WebtomatorTestCase):
+
+    def test_getNode_shouldMapKeysStableAndBalanced(self):
+        # Given
+        keys = [f"shop-{index}" for index in range(3000)]
+
+        # When
+        sut = HashRing(["node-a", "node-b", "node-c"])
+        other = HashRing(["node-c", "node-a", "node-b"])
+
+        # Then
+        mapping = {key: sut.getNode(key) for key in keys}
+        self.assertDictEqual(mapping, {key: other.getNode(key) for key in keys})
+        for nodeID in ("node-a", "node-b", "node-c"):
+            self.assertGreater(list(mapping.values()).count(nodeID), 600)
+
+    def test_remove_shouldMoveKeysOfRemovedNodeOnly(self):
+        # Given
+        keys = [f"shop-{index}" for index in range(3000)]
+        sut = HashRing(["node-a", "node-b", "node-c"])
+        before = {key: sut.getNode(key) for key in keys}
+
+        # When
+        sut.remove("node-b")
+
+        # Then
+        self.assertSetEqual({"node-a", "node-c"}, sut.nodeIDs)
+        for key in keys:
+            if before[key] != "node-b":
+                self.assertEqual(before[key], sut.getNode(key))
+            else:
+                self.assertIn(sut.getNode(key), ("node-a", "node-c"))
+
+    def test_getNode_shouldReturnNoneForEmptyRing(self):
+        self.assertIsNone(HashRing().getNode("shop"))
+
+    def test_splitAddress(self):
+        self.assertEqual(("127.0.0.1", 8765), splitAddress("127.0.0.1:8765"))
+        self.assertEqual(("/tmp/coordinator.sock", None),
+                         splitAddress("unix:/tmp/coordinator.sock"))
+        with self.assertRaises(ValueError):
+            splitAddress("localhost")
+
+
+class CoordinatorTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.snapshotPath = Path(self.tempDir.name, "Shops.json")
+        self.snapshotPath.touch()
+        self.journalPath = Path(self.tempDir.name, "Shops.journal.jsonl")
+        self.journalDao = JournaledShopDao(snapshotDao=TinyShopDao(self.snapshotPath),
+                                           journalPath=self.journalPath)
+        self.shopRepo = AsyncShopRepo(dao=self.journalDao)
+        self.fixture = ShopFixture()
+        self.fixture.create2Shops()
+        self.shopRepo.setAll(shops=self.fixture.shops)
+        self.uids = [shop.uid for shop in self.fixture.shops]
+
+    def tearDown(self) -> None:
+        self.tempDir.cleanup()
+
+    def _getInstance(self, leaseScnds: float = 15.0) -> Coordinator:
+        sut = Coordinator(shopRepo=self.shopRepo, journalDao=self.journalDao,
+                          leaseScnds=leaseScnds)
+        sut.setShopUIDs(self.uids)
+        return sut
+
+    def test_heartbeat_shouldHandOverShopsAfterRelease(self):
+        # Given
+        sut = self._getInstance()
+
+        # When
+        shopsOfA = sut.heartbeat("node-a", holding=[])
+        shopsOfB = sut.heartbeat("node-b", holding=[])
+
+        # Then
+        self.assertListEqual(self.uids, shopsOfA)
+        self.assertListEqual([], shopsOfB)  # Node A still holds all shops
+
+        # When
+        shopsOfA = sut.heartbeat("node-a", holding=shopsOfA)
+        shopsOfB = sut.heartbeat("node-b", holding=shopsOfB)
+
+        # Then: A gets told to release the shops of B, which B gets after A released them.
+        ring = HashRing(["node-a", "node-b"])
+        expectedOfA = [uid for uid in self.uids if ring.getNode(uid) == "node-a"]
+        expectedOfB = [uid for uid in self.uids if ring.getNode(uid) == "node-b"]
+        self.assertListEqual(expectedOfA, shopsOfA)
+        self.assertListEqual([], shopsOfB)
+
+        # When
+        sut.heartbeat("node-a", holding=shopsOfA)
+        shopsOfB = sut.heartbeat("node-b", holding=shopsOfB)
+
+        # Then
+        self.assertListEqual(expectedOfB, shopsOfB)
+
+    def test_heartbeat_shouldHandOverShopsAfterLeaseExpired(self):
+        # Given
+        sut = self._getInstance(leaseScnds=0.05)
+        sut.heartbeat("node-a", holding=[])
+
+        # When
+        time.sleep(0.1)
+        shopsOfB = sut.heartbeat("node-b", holding=[])
+
+        # Then
+        self.assertSetEqual({"node-b"}, sut.nodeIDs)
+        self.assertListEqual(self.uids, shopsOfB)
+
+    def test_leave_shouldHandOverShops(self):
+        # Given
+        sut = self._getInstance()
+        sut.heartbeat("node-a", holding=[])
+
+        # When
+        sut.leave("node-a")
+        shopsOfB = sut.heartbeat("node-b", holding=[])
+
+        # Then
+        self.assertListEqual(self.uids, shopsOfB)
+
+    def test_reloadFromProductsUrls_shouldPauseLeasesUntilShopsAreReleased(self):
+        # Given
+        urlsPath = Path(self.tempDir.name, "ProductsURLs.txt")
+        urlsPath.write_text("https://a.com/1\nhttps://b.com/1\n")
+        productsUrlsRepo = ProductsUrlsRepoMock(productsUrlsRepoPath=urlsPath)
+        sut = self._getInstance()
+        held = sut.heartbeat("node-a", holding=[])
+
+        async def runner():
+            # When
+            reloadTask = asyncio.ensure_future(sut.reloadFromProductsUrls(productsUrlsRepo))
+            await asyncio.sleep(0.3)
+
+            # Then
+            self.assertFalse(reloadTask.done())
+            self.assertListEqual([], sut.heartbeat("node-a", holding=held))
+
+            # When
+            sut.heartbeat("node-a", holding=[])
+            plan = await reloadTask
+            newShops = sut.heartbeat("node-a", holding=[])
+            await self.shopRepo.close()
+
+            # Then
+            self.assertFalse(plan.isEmpty)
+            self.assertListEqual(sorted(shop.uid for shop in self.shopRepo.getAll()),
+                                 sorted(newShops))
+
+        asyncio.run(runner())
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Needs Unix sockets")
+    def test_write_shouldAcceptChangesOfHoldingNodeOnly(self):
+        # Given
+        address = f"unix:{Path(self.tempDir.name, 'coordinator.sock')}"
+        sut = self._getInstance()
+        clientA = CoordinatorClient(address=address, nodeID="node-a")
+        clientB = CoordinatorClient(address=address, nodeID="node-b")
+
+        def runNodes():
+            shopUIDs = clientA.heartbeat(holding=[])
+            clientB.heartbeat(holding=[])
+            shop = CoordinatorShopDao(client=clientA).find(uid=shopUIDs[0])
+            shop.commitChanges()
+            shop.name = "Changed by node A"
+
+            # When
+            with self.assertRaises(PermissionError):
+                CoordinatorShopDao(client=clientB).update(data=shop, changesOnly=True)
+            CoordinatorShopDao(client=clientA).update(data=shop, changesOnly=True)
+            clientA.leave()
+            clientA.close()
+            clientB.close()
+            return shop
+
+        async def runner():
+            await sut.start(address)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(None, runNodes)
+            finally:
+                await sut.close()
+                await self.shopRepo.close()
+
+        changedShop = asyncio.run(runner())
+
+        # Then
+        journalLines = self.journalPath.read_text().splitlines()
+        self.assertEqual(1, len(journalLines))
+        self.assertIn('"setShopFields"', journalLines[0])
+        persisted = self.shopRepo.findByUID(changedShop.uid)
+        self.assertEqual("Changed by node A", persisted.name)
+        self.assertDictEqual({}, sut.holders)  # Node A left
+
+    def test_CoordinatorShopDao_shouldRefuseOperationsOnAllShops(self):
+        # Given
+        sut = CoordinatorShopDao(client=CoordinatorClient(address="127.0.0.1:1", nodeID="node-a"))
+
+        # When / Then
+        with self.assertRaises(PermissionError):
+            sut.loadAll()
+        with self.assertRaises(PermissionError):
+            sut.saveAll(data=self.fixture.shops)
+        with self.assertRaises(PermissionError):
+            sut.deleteAll()
+        with self.assertRaises(PermissionError):
+            sut.insert(data=self.fixture.shops[0])
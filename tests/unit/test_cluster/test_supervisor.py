@@ -0,0 +1,105 @@
+# unit.test_cluster.test_supervisor.py
+import os
+import sys
+import time
+
+import debug.logger as clog
+from cluster.supervisor import Supervisor, WorkerContext, WorkerMetrics, assignShops
+from config.base import LoggerConfig
+from shop.product import Product
+from shop.shop import Shop
+from shop.shopRepo import ShopWriteStats
+from unit.testhelper import WebtomatorTestCase
+
+logger = clog.getLogger(__name__)
+
+
+def _reportAndWaitForStop(worker: WorkerContext):
+    # Target of worker processes. Must be defined at module level.
+    config = LoggerConfig(isConsoleLogging=False, isFileLogging=False,
+                          consoleLogLevel=clog.INFO, fileLogLevel=clog.NOTSET)
+    clog.configureQueueLogger(logger=clog.getRootLogger(), config=config, queue=worker.logQueue)
+    logger.info("Running with shops %s", ",".join(worker.shopUIDs))
+
+    while not worker.isStopRequested:
+        time.sleep(0.05)
+
+    worker.reportMetrics(WorkerMetrics(
+        name=worker.name, pid=os.getpid(), shopCount=len(worker.shopUIDs),
+        storage=ShopWriteStats(receivedUpdates=4, writtenShops=2, writeBatches=1,
+                               maxQueueDepth=len(worker.shopUIDs))))
+
+
+def _crash(worker: WorkerContext):
+    sys.exit(3)
+
+
+class AssignShopsTest(WebtomatorTestCase):
+
+    @staticmethod
+    def _createShop(uid: str, productCount: int) -> Shop:
+        products = [Product(url=f"https://{uid}.com/{i}") for i in range(productCount)]
+        return Shop(uid=uid, url=f"https://{uid}.com", products=products)
+
+    def test_assignShops_shouldBalanceProductCounts(self):
+        # Given
+        shops = [self._createShop(uid, count) for uid, count in
+                 (("a", 2), ("b", 10), ("c", 4), ("d", 7), ("e", 5), ("f", 2))]
+
+        # When
+        groups = assignShops(shops, workerCount=2)
+
+        # Then
+        self.assertListEqual([["b", "c", "f"], ["d", "e", "a"]], groups)
+
+    def test_assignShops_shouldLeaveOutWorkersWithoutShops(self):
+        # Given
+        shops = [self._createShop("a", 0), self._createShop("b", 3)]
+
+        # When
+        groups = assignShops(shops, workerCount=4)
+
+        # Then
+        self.assertListEqual([["b"], ["a"]], groups)
+
+
+class SupervisorTest(WebtomatorTestCase):
+
+    def test_stop_shouldStopWorkersAndCollectMetricsAndLogs(self):
+        # Given
+        sut = Supervisor(target=_reportAndWaitForStop, stopTimeoutScnds=20)
+
+        # When
+        with self.assertLogs(logger, level=clog.INFO) as logs:
+            with sut:
+                sut.start([["a", "b"], ["c"]])
+                self.assertTrue(sut.isRunning)
+                sut.stop()
+
+        # Then
+        self.assertFalse(sut.isRunning)
+        self.assertListEqual(["Worker-1", "Worker-2"], sorted(m.name for m in sut.metrics))
+        self.assertEqual(ShopWriteStats(receivedUpdates=8, writtenShops=4, writeBatches=2,
+                                        maxQueueDepth=2), sut.getStorageStats())
+        messages = sorted(record.getMessage() for record in logs.records)
+        self.assertListEqual(["Worker-1: Running with shops a,b",
+                              "Worker-2: Running with shops c"], messages)
+
+    def test_poll_shouldRestartCrashedWorker(self):
+        # Given
+        sut = Supervisor(target=_crash, stopTimeoutScnds=20)
+        sut._MIN_RESTART_DELAY_SCNDS = 0
+
+        # When
+        with sut:
+            sut.start([["a"]])
+            deadline = time.monotonic() + 20
+            while sut.restartCount < 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+                sut.poll()
+
+            # Then
+            self.assertEqual(2, sut.restartCount)
+            self.assertTrue(sut.isRunning)
+
+        self.assertFalse(sut.isRunning)
@@ -1,5 +1,6 @@
 # unit.test_config.test_base.py
-from config.base import TinyConfigDao, ScraperConfig, ConfigRepo, LoggerConfig
+from config.base import TinyConfigDao, ScraperConfig, ConfigRepo, LoggerConfig, StorageConfig, \
+    ProcessConfig
 from fixtures.scraper import TEST_EMPTY_DATABASE_CONFIGURATION_PATH
 from fixtures.scraper import TEST_VALID_CONFIGURATION_PATH
 from unit.testhelper import WebtomatorTestCase
@@ -202,6 +203,28 @@ class TinyConfigDaoTest(WebtomatorTestCase):
         # Then
         self.assertEqual(expectedRescueConfig, foundDefaultConfig)
 
+    def test_find_storageConfig_shouldFallbackToRescueDefaultsIfNotFound(self):
+        # Given
+        dao = TinyConfigDao(path=TEST_EMPTY_DATABASE_CONFIGURATION_PATH)
+
+        # When
+        with dao as sut:
+            foundConfig = sut.find(storageConfig=True)
+
+        # Then
+        self.assertEqual(StorageConfig(shopsBackend="tinydb"), foundConfig)
+
+    def test_find_processConfig_shouldFallbackToRescueDefaultsIfNotFound(self):
+        # Given
+        dao = TinyConfigDao(path=TEST_EMPTY_DATABASE_CONFIGURATION_PATH)
+
+        # When
+        with dao as sut:
+            foundConfig = sut.find(processConfig=True)
+
+        # Then
+        self.assertEqual(ProcessConfig(supervisor=False, workerProcesses=0), foundConfig)
+
 
 class ConfigRepoTest(WebtomatorTestCase):
     testConfigDao: TinyConfigDao
@@ -0,0 +1,61 @@
+# unit.test_network.test_eventLoop.py
+import asyncio
+import sys
+from unittest import mock
+
+from network.eventLoop import createEventLoopPolicy, isEventLoopAvailable, setEventLoop
+from unit.testhelper import WebtomatorTestCase
+
+
+class EventLoopTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.addCleanup(asyncio.set_event_loop_policy, None)
+
+    def test_createEventLoopPolicy_default(self):
+        # When
+        policy = createEventLoopPolicy("default")
+
+        # Then
+        if sys.platform == "win32":
+            self.assertIsInstance(policy, asyncio.WindowsSelectorEventLoopPolicy)
+        else:
+            self.assertIsInstance(policy, asyncio.DefaultEventLoopPolicy)
+        self.assertTrue(isEventLoopAvailable("default"))
+
+    def test_createEventLoopPolicy_shouldRaiseOnUnknownLoop(self):
+        with self.assertRaises(ValueError):
+            createEventLoopPolicy("tokio")
+
+    def test_createEventLoopPolicy_shouldRaiseIfUvloopIsNotInstalled(self):
+        # Given: Importing a module which is set to None raises ImportError.
+        with mock.patch.dict(sys.modules, {"uvloop": None}):
+            # When / Then
+            with self.assertRaises(LookupError):
+                createEventLoopPolicy("uvloop")
+            self.assertFalse(isEventLoopAvailable("uvloop"))
+
+    def test_setEventLoop_shouldFallBackToDefaultLoop(self):
+        # Given
+        with mock.patch.dict(sys.modules, {"uvloop": None}):
+            # When
+            name = setEventLoop("uvloop")
+
+        # Then
+        self.assertEqual("default", name)
+        self.assertIsInstance(asyncio.get_event_loop_policy(),
+                              type(createEventLoopPolicy("default")))
+
+    def test_setEventLoop_shouldSetUvloopIfInstalled(self):
+        # Given
+        uvloop = mock.Mock()
+        uvloop.EventLoopPolicy.return_value = asyncio.DefaultEventLoopPolicy()
+
+        with mock.patch.dict(sys.modules, {"uvloop": uvloop}), \
+                mock.patch.object(sys, "platform", "linux"):
+            # When
+            name = setEventLoop("uvloop")
+
+        # Then
+        self.assertEqual("uvloop", name)
+        self.assertIs(uvloop.EventLoopPolicy.return_value, asyncio.get_event_loop_policy())
@@ -164,6 +164,7 @@ class ScraperTest(WebtomatorTestCase):
         # Expecting values from ScraperConfigRepoMonkeyPatch repository for
         # scraper URL https://www.test_scraper_config_01.com
         expectedIterSleep = (8, 15, 0.5)
+        expectedFetchMaxConcurrency = 20  # not set in repository, expecting default
         expectedRequestTimeout = 8
         expectedRequestMaxRetries = 4
         expectedRequestUseRandomProxy = True
@@ -185,6 +186,7 @@ class ScraperTest(WebtomatorTestCase):
         self.assertEqual(False, sut._isCancelLoop)
         self.assertEqual(0, sut._failCount)
         self.assertEqual(expectedIterSleep, sut._iterSleep)
+        self.assertEqual(expectedFetchMaxConcurrency, sut._fetchMaxConcurrency)
         self.assertEqual(expectedRequestTimeout, sut._request._timeout)
         self.assertEqual(expectedRequestMaxRetries, sut._request._maxRetries)
         self.assertEqual(expectedRequestUseRandomProxy, sut._request._useRandomProxy)
@@ -400,6 +402,18 @@ class ScraperFactoryTest(WebtomatorTestCase):
                 session=Mock(),
                 messenger=Mock())
 
+    def test_isSupported(self):
+        # Given
+        sut = ScraperFactory()
+        supportedScrapee = Mock(spec_set=Scrapable)
+        supportedScrapee.url = sut._scraperClasses[0].URL
+        nonFindableScrapee = Mock(spec_set=Scrapable)
+        nonFindableScrapee.url = "https://non-findable-url.com"
+
+        # When / Then
+        self.assertTrue(sut.isSupported(supportedScrapee))
+        self.assertFalse(sut.isSupported(nonFindableScrapee))
+
     def test_makeFromScrapee_shouldRaiseOnMultipleScrapersFound(self):
         # Given
         sut = ScraperFactory()
@@ -1,4 +1,5 @@
 # unit.test_shop.test_product.py
+import pickle
 import uuid
 from typing import List
 
@@ -49,6 +50,23 @@ class ProductTest(WebtomatorTestCase):
         # Then Getter
         self.assertEqual("https://something-to-test/shop", sut.url)
 
+    def test_urlParts_shouldBeParsedOncePerUrl(self):
+        # Given
+        sut = Product(url="https://shop.com/p?id=1")
+
+        # When
+        parts = sut.urlParts
+
+        # Then
+        self.assertEqual("shop.com", parts.netloc)
+        self.assertIs(parts, sut.urlParts)
+
+        # When
+        sut.url = "http://other.org/p"
+
+        # Then
+        self.assertEqual(("http", "other.org"), sut.urlParts[:2])
+
     def test_name_shouldGetAndSet(self):
         # Given
         sut = Product()
@@ -171,6 +189,211 @@ class ProductTest(WebtomatorTestCase):
         # Then
         self.assertEqual(sizeC, foundSize)
 
+    def test_findSize_shouldFindSizesChangedAfterIndexing(self):
+        # Given
+        sizeA = Size(sizeEU="40")
+        sut = Product(sizes=[sizeA])
+        self.assertIs(sizeA, sut.findSize("40"))
+
+        # When
+        sizeB = Size(sizeEU="41")
+        sut.sizes.append(sizeB)
+        sizeA.sizeEU = "39"
+
+        # Then
+        self.assertIs(sizeB, sut.findSize("41"))
+        self.assertIs(sizeA, sut.findSize("39"))
+        self.assertIsNone(sut.findSize("40"))
+
+        # When
+        sizeC = Size(sizeEU="42")
+        sut.sizes = [sizeC]
+
+        # Then
+        self.assertIs(sizeC, sut.findSize("42"))
+        self.assertIsNone(sut.findSize("41"))
+
+    def test_applySizeSnapshot_shouldReturnNewRestockedAndSoldOutSizes(self):
+        # Given
+        soldOut = Size(sizeEU="40", isInStock=True)
+        restocked = Size(sizeEU="41", isInStock=False)
+        unchanged = Size(sizeEU="42", isInStock=True)
+        untouched = Size(sizeEU="43", isInStock=True)
+        sut = Product(sizes=[soldOut, restocked, unchanged, untouched])
+
+        # When
+        changes = sut.applySizeSnapshot({"40": False, "41": True, "42": True, "44": True})
+
+        # Then
+        self.assertEqual(1, len(changes.newSizes))
+        self.assertEqual("44", changes.newSizes[0].sizeEU)
+        self.assertTrue(changes.newSizes[0].isInStock)
+        self.assertListEqual([restocked], changes.restockedSizes)
+        self.assertListEqual([soldOut], changes.soldOutSizes)
+        self.assertIs(changes.newSizes[0], sut.findSize("44"))
+        self.assertFalse(soldOut.isInStock)
+        self.assertTrue(untouched.isInStock)
+        self.assertEqual(5, len(sut.sizes))
+
+        # When
+        productChanges = sut.getChanges()
+
+        # Then
+        self.assertListEqual(changes.newSizes, productChanges.newSizes)
+        self.assertListEqual(changes.restockedSizes, productChanges.restockedSizes)
+        self.assertListEqual(changes.soldOutSizes, productChanges.soldOutSizes)
+
+    def test_getChanges_shouldReturnNoChangesForNewProduct(self):
+        # Given
+        sut = Product(basePrice=20.0, sizes=[Size(sizeEU="40", isInStock=False)])
+
+        # When
+        changes = sut.getChanges()
+
+        # Then
+        self.assertFalse(sut.isChanged)
+        self.assertFalse(changes.isSizesChanged)
+        self.assertFalse(changes.isPriceChanged)
+
+    def test_getChanges_shouldReturnSizeAndPriceChanges(self):
+        # Given
+        restockedSize = Size(sizeEU="40", isInStock=False)
+        soldOutSize = Size(sizeEU="41", isInStock=True)
+        unchangedSize = Size(sizeEU="42", isInStock=True)
+        sut = Product(basePrice=20.0, sizes=[restockedSize, soldOutSize, unchangedSize])
+        newSize = Size(sizeEU="43")
+
+        # When
+        sut.basePrice = 17.5
+        sut.basePrice = 15.0
+        restockedSize.isInStock = True
+        soldOutSize.isInStock = False
+        unchangedSize.isInStock = True
+        sut.addSize(newSize)
+        newSize.isInStock = True
+        changes = sut.getChanges()
+
+        # Then
+        self.assertTrue(sut.isChanged)
+        self.assertListEqual([newSize], changes.newSizes)
+        self.assertListEqual([restockedSize], changes.restockedSizes)
+        self.assertListEqual([soldOutSize], changes.soldOutSizes)
+        self.assertTrue(changes.isPriceChanged)
+        self.assertEqual(20.0, changes.oldBasePrice)
+
+    def test_commitChanges_shouldResetChangesOfProductAndSizes(self):
+        # Given
+        size = Size(sizeEU="40", isInStock=False)
+        sut = Product(sizes=[size])
+        size.isInStock = True
+        sut.urlThumb = "https://some-thumb.com/1.jpg"
+
+        # When
+        sut.commitChanges()
+
+        # Then
+        self.assertFalse(sut.isChanged)
+        self.assertFalse(size.isChanged)
+        self.assertDictEqual({}, sut.changedFields)
+        self.assertFalse(sut.getChanges().isSizesChanged)
+
+    def test_toDict_shouldReturnPlainData(self):
+        # Given
+        size = Size(uid="s-uid", sizeEU="42 2/3", price=20.5, isInStock=True)
+        sut = Product(uid="p-uid", name="Some _Product__ name", url="https://shop.com/p",
+                      basePrice=20.5, currency="EUR", sizes=[size], urlThumb=None,
+                      releaseDateStamp=1601466659.0, lastScanStamp=1588548868.304869)
+
+        # When
+        result = sut.toDict()
+
+        # Then
+        self.assertDictEqual(
+            {"uid": "p-uid", "name": "Some _Product__ name", "url": "https://shop.com/p",
+             "basePrice": 20.5, "currency": "EUR",
+             "sizes": [{"uid": "s-uid", "sizeEU": "42 2/3", "price": 20.5, "url": None,
+                        "urlAddToCart": None, "isInStock": True}],
+             "urlThumb": None, "releaseDateStamp": 1601466659.0,
+             "lastScanStamp": 1588548868.304869},
+            result)
+
+    def test_fromDict_shouldCreateProductWithSizes(self):
+        # Given
+        data = Product(name="Roundtrip", sizes=[Size(sizeEU="40"), Size(sizeEU="41")]).toDict()
+
+        # When
+        sut = Product.fromDict(data)
+
+        # Then
+        self.assertDictEqual(data, sut.toDict())
+        self.assertEqual(2, len(sut.sizes))
+        self.assertIsInstance(sut.sizes[0], Size)
+        self.assertFalse(sut.isChanged)
+
+    def test_hasEqualValues_shouldCompareValuesOfProductAndSizes(self):
+        # Given
+        data = Product(name="Values", basePrice=99.0, sizes=[Size(sizeEU="40")]).toDict()
+        sut = Product.fromDict(data)
+        other = Product.fromDict(data)
+
+        # When / Then
+        self.assertTrue(sut.hasEqualValues(other))
+
+        # When
+        other.sizes[0].price = 80.0
+
+        # Then
+        self.assertFalse(sut.hasEqualValues(other))
+        self.assertFalse(sut.hasEqualValues(Product.fromDict(dict(data, sizes=list()))))
+        self.assertFalse(Product(name="A").hasEqualValues(Product(name="A")))
+
+    def test_uid_shouldBeGeneratedOnceOnFirstAccess(self):
+        # Given
+        sut = Product()
+
+        # When
+        uid = sut.uid
+
+        # Then
+        self.assertEqual(uid, sut.uid)
+        self.assertEqual(uid, sut.toDict()["uid"])
+        self.assertNotEqual(uid, Product().uid)
+
+    def test_snapshot_shouldShareUIDNotGeneratedBefore(self):
+        # Given
+        sut = Product(sizes=[Size()])
+
+        # When
+        clone = sut.snapshot()
+
+        # Then
+        self.assertEqual(sut.uid, clone.uid)
+        self.assertEqual(sut.sizes[0].uid, clone.sizes[0].uid)
+
+    def test_init_shouldNotAllowUndeclaredAttributes(self):
+        # Given
+        sut = Product(sizes=[Size()])
+
+        # When / Then
+        self.assertFalse(hasattr(sut, "__dict__"))
+        self.assertFalse(hasattr(sut.sizes[0], "__dict__"))
+        with self.assertRaises(AttributeError):
+            sut.someUndeclaredAttribute = "value"
+
+    def test_pickle_shouldKeepValuesAndChanges(self):
+        # Given
+        sut = Product(name="Pickled", currency="EUR", sizes=[Size(sizeEU="40", price=10.0)])
+        sut.commitChanges()
+        sut.sizes[0].price = 12.0
+
+        # When
+        result = pickle.loads(pickle.dumps(sut, protocol=5))
+
+        # Then
+        self.assertDictEqual(sut.toDict(), result.toDict())
+        self.assertTrue(result.isChanged)
+        self.assertEqual(10.0, result.sizes[0].changedFields["price"])
+
     def test_getReleaseDate_shouldReturnDatetime(self):
         # Given
         sut = Product()
@@ -330,6 +553,19 @@ class SizesTest(WebtomatorTestCase):
             # Then
             self.assertEqual(None, result)
 
+    def test_sizeEU_shouldBeInterned(self):
+        # Given
+        label = "".join(["42 ", "2/3"])  # Not a compile-time constant, so not interned
+        sut = Size(sizeEU=label)
+        other = Size()
+
+        # When
+        other.sizeEU = "".join(["42", " 2/3"])
+
+        # Then
+        self.assertEqual(label, sut.sizeEU)
+        self.assertIs(sut.sizeEU, other.sizeEU)
+
 
 class StringProductUrlConverterTest(WebtomatorTestCase):
 
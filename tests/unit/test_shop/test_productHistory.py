@@ -0,0 +1,82 @@
+# unit.test_shop.test_productHistory.py
+import tempfile
+from pathlib import Path
+
+from shop.product import Product, Size
+from shop.productHistory import ProductHistory
+from unit.testhelper import WebtomatorTestCase
+
+
+class ProductHistoryTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tempDir.name, "History")
+        self.product = Product(url="https://www.megashop.com/p/1", basePrice=100.0,
+                               sizes=[Size(sizeEU="40", isInStock=True),
+                                      Size(sizeEU="41", isInStock=False)])
+
+    def tearDown(self) -> None:
+        self.tempDir.cleanup()
+
+    def _recordScan(self, sut: ProductHistory, stamp: float, price: float,
+                    inStock40: bool, inStock41: bool) -> None:
+        self.product.lastScanStamp = stamp
+        self.product.basePrice = price
+        self.product.sizes[0].isInStock = inStock40
+        self.product.sizes[1].isInStock = inStock41
+        sut.record([self.product])
+
+    def test_record_shouldStoreChangesOnly(self):
+        # Given
+        sut = ProductHistory(directory=self.directory)
+        base = 2000000000
+
+        # When
+        self._recordScan(sut, base + 10, 100.0, True, False)
+        self._recordScan(sut, base + 20, 100.0, True, False)
+        self._recordScan(sut, base + 30, 89.99, True, False)
+        self._recordScan(sut, base + 40, 89.99, False, True)
+        sut.flush()
+
+        # Then
+        self.assertListEqual([(base + 10, 100.0), (base + 30, 89.99)],
+                             sut.getPriceSeries(self.product.uid))
+        self.assertListEqual([(base + 10, True), (base + 40, False)],
+                             sut.getStockSeries(self.product.uid, "40"))
+        self.assertListEqual([(base + 10, False), (base + 40, True)],
+                             sut.getStockSeries(self.product.uid, "41"))
+
+    def test_getLastInStockStamp(self):
+        # Given
+        sut = ProductHistory(directory=self.directory)
+        base = 2000000000
+        self._recordScan(sut, base + 10, 100.0, True, False)
+        self._recordScan(sut, base + 40, 100.0, False, True)
+        self._recordScan(sut, base + 50, 100.0, False, True)
+        sut.flush()
+
+        # When
+        soldOutStamp = sut.getLastInStockStamp(self.product.uid, "40")
+        stillInStockStamp = sut.getLastInStockStamp(self.product.uid, "41")
+        unknownSizeStamp = sut.getLastInStockStamp(self.product.uid, "47")
+
+        # Then
+        self.assertEqual(base + 40, soldOutStamp)
+        self.assertEqual(base + 50, stillInStockStamp)
+        self.assertIsNone(unknownSizeStamp)
+
+    def test_flush_shouldPersistAcrossInstances(self):
+        # Given
+        sut = ProductHistory(directory=self.directory)
+        self._recordScan(sut, 2000000010, 100.0, True, False)
+        sut.flush()
+
+        # When
+        sut = ProductHistory(directory=self.directory)
+        self._recordScan(sut, 2000000020, 100.0, True, False)
+
+        # Then
+        self.assertFalse(sut.hasPendingRecords)
+        self.assertEqual(1, len(sut.getPriceSeries(self.product.uid)))
+        self.assertEqual([True], [s for _, s in sut.getStockSeries(self.product.uid, "40")])
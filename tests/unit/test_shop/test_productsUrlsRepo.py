@@ -1,6 +1,6 @@
 # unit.test_shop.test_productsUrlsRepo.py
 from typing import TYPE_CHECKING
-from unittest.mock import Mock
+from unittest.mock import MagicMock, Mock
 
 from fixtures.shop import PRODUCTS_URLS_9_VALID_TEST_PATH, PRODUCTS_URLS_0_VALID_TEST_PATH
 from shop.product import Product
@@ -63,6 +63,25 @@ class ProductsUrlsRepoTest(WebtomatorTestCase):
         self.assertIn("https://www.dbyte.org", shopsUrls)
         self.assertIn("http://real.fantastic.de", shopsUrls)
 
+    def test_createShops_shouldGroupProductsByNetloc(self):
+        # Given
+        urls = ["http://a.com/1", "https://b.com/1", "http://a.com/2", "https://b.com/1",
+                "https://a.com/3", "//c.com/1", "https://b.com/2"]
+        daoMock = MagicMock()
+        daoMock.__enter__.return_value.loadAll.return_value = [Product(url=u) for u in urls]
+        sut = ProductsUrlsRepo(dao=daoMock)
+
+        # When
+        shops: List[Shop] = sut.createShops()
+
+        # Then
+        # Latest listed shop first. Shops take the scheme of their last listed product.
+        self.assertListEqual(["https://b.com", "https://a.com"], [s.url for s in shops])
+        self.assertListEqual(["https://b.com/1", "https://b.com/2"],
+                             [p.url for p in shops[0].products])
+        self.assertListEqual(["http://a.com/1", "http://a.com/2", "https://a.com/3"],
+                             [p.url for p in shops[1].products])
+
     def test_createShops_shouldRaiseIfNoValidURLsFound(self):
         # Given
         emptyUrlsDao = ProductsUrlsDao(filepath=PRODUCTS_URLS_0_VALID_TEST_PATH)
@@ -1,8 +1,234 @@
 # unit.test_shop.test_scraper.py
+from __future__ import annotations
 
-from unit.testhelper import WebtomatorTestCase
+import asyncio
+from typing import TYPE_CHECKING
+from unittest.mock import Mock
+
+import network.messenger as msn
+from network.connection import Request, Response
+from shop.product import Product, Size
+from shop.scraper import ShopScraper
+from shop.shop import Shop
+from shop.shopRepo import ShopRepo
+from unit.testhelper import WebtomatorTestCase, RequestMock, MessengerMock
+
+if TYPE_CHECKING:
+    from typing import List
 
 
-# TODO implement
 class ShopScraperTest(WebtomatorTestCase):
-    pass
+    class ShopScraperTestImpl(ShopScraper):
+        URL = "https://www.test_scraper_config_01.com"
+
+        async def _setShopName(self, soup) -> bool:
+            return False
+
+        async def _setProductName(self, soup, product) -> bool:
+            return False
+
+        async def _setProductSizes(self, soup, product) -> bool:
+            return False
+
+        async def _setProductPrice(self, soup, product) -> bool:
+            return False
+
+        async def _setProductThumbUrl(self, soup, product) -> bool:
+            return False
+
+        async def _setProductReleaseTime(self, soup, product) -> bool:
+            return False
+
+    class ConcurrencyCountingRequestMock(RequestMock):
+        """ Returns empty responses and keeps track of how many fetches run at once. """
+
+        def __init__(self):
+            super().__init__()
+            self.runningCount = 0
+            self.maxRunningCount = 0
+            self.fetchedUrls: List[str] = list()
+            self.slowUrls: List[str] = list()
+
+        async def fetch(self, params: Request.Params, callCount=0) -> Response:
+            self.runningCount += 1
+            self.maxRunningCount = max(self.maxRunningCount, self.runningCount)
+            await asyncio.sleep(10 if params.url in self.slowUrls else 0.01)
+            self.fetchedUrls.append(params.url)
+            self.runningCount -= 1
+            return Response(data=None, text=None, error=None)
+
+    class SizeScanningScraper(ShopScraperTestImpl):
+        """ Applies the next of the given size scans with each product request. """
+        sizeScans: List[dict]
+
+        async def _setProductSizes(self, soup, product) -> bool:
+            return self._processSizes(product=product, sizes=self.sizeScans.pop(0))
+
+    class PostRecordingRequestMock(RequestMock):
+        """ Returns an empty page for each fetch and records the data of all posts. """
+
+        def __init__(self):
+            super().__init__()
+            self.postedData: List[dict] = list()
+
+        async def fetch(self, params: Request.Params, callCount=0) -> Response:
+            return Response(data=None, text="<html></html>", error=None)
+
+        async def post(self, params: Request.Params, callCount=0) -> Response:
+            self.postedData.append(params.data)
+            return Response(data=None, text=None, error=None)
+
+    def _getInstance(self, productCount: int) -> ShopScraper:
+        products = [Product(url=f"https://www.test_scraper_config_01.com/p/{i}")
+                    for i in range(productCount)]
+        shop = Shop(url="https://www.test_scraper_config_01.com", products=products)
+        request = self.ConcurrencyCountingRequestMock()
+
+        return self.ShopScraperTestImpl(scrapee=shop,
+                                        scrapeeRepo=Mock(spec_set=ShopRepo),
+                                        request=request,
+                                        messenger=MessengerMock(request=request))
+
+    def test_requestAllProducts_shouldRequestEachProductOnce(self):
+        # Given
+        sut = self._getInstance(productCount=25)
+        expectedUrls = sorted(p.url for p in sut._scrapee.products)
+
+        # When
+        asyncio.run(sut._requestAllProducts())
+
+        # Then
+        self.assertListEqual(expectedUrls, sorted(sut._request.fetchedUrls))
+
+    def test_requestAllProducts_shouldNotExceedMaxConcurrency(self):
+        # Given
+        sut = self._getInstance(productCount=25)
+        sut._fetchMaxConcurrency = 3
+
+        # When
+        asyncio.run(sut._requestAllProducts())
+
+        # Then
+        self.assertEqual(3, sut._request.maxRunningCount)
+
+    def test_requestAllProducts_shouldContinueWhenProductRaises(self):
+        # Given
+        sut = self._getInstance(productCount=5)
+        sut._fetchMaxConcurrency = 2
+        failingUrl = sut._scrapee.products[0].url
+        originalFetch = sut._request.fetch
+
+        async def fetch(params: Request.Params, callCount=0) -> Response:
+            if params.url == failingUrl:
+                raise ValueError("Raised by unit test")
+            return await originalFetch(params=params, callCount=callCount)
+
+        sut._request.fetch = fetch
+
+        # When
+        asyncio.run(sut._requestAllProducts())
+
+        # Then
+        self.assertEqual(4, len(sut._request.fetchedUrls))
+        self.assertEqual(1, sut._failCount)
+
+    def test_requestAllProducts_shouldReturnWhenShopHasNoProducts(self):
+        # Given
+        sut = self._getInstance(productCount=0)
+
+        # When
+        asyncio.run(sut._requestAllProducts())
+
+        # Then
+        self.assertEqual(0, len(sut._request.fetchedUrls))
+
+    def test_loopRun_shouldCancelStragglersWhenDeadlineExceeded(self):
+        # Given
+        sut = self._getInstance(productCount=5)
+        sut._iterDeadline = 0.3
+        sut._isCancelLoop = True  # Run one iteration only
+        slowProduct = sut._scrapee.products[2]
+        sut._request.slowUrls.append(slowProduct.url)
+
+        # When
+        asyncio.run(asyncio.wait_for(sut.loopRun(), timeout=3))
+
+        # Then
+        fetchedProductUrls = [u for u in sut._request.fetchedUrls if u != sut._scrapee.url]
+        self.assertEqual(1, sut._missedProductsCount)
+        self.assertSetEqual({id(slowProduct)}, sut._carriedOverProductIds)
+        self.assertEqual(4, len(fetchedProductUrls))
+        self.assertNotIn(slowProduct.url, fetchedProductUrls)
+        # Expect partial results to be committed
+        sut._scrapeeRepo.scheduleUpdate.assert_called_once_with(shop=sut._scrapee)
+        sut._scrapeeRepo.flush.assert_called_once()
+
+    def test_run_shouldRequestCarriedOverProductsFirst(self):
+        # Given
+        sut = self._getInstance(productCount=5)
+        sut._fetchMaxConcurrency = 1
+        carriedOverProduct = sut._scrapee.products[3]
+        sut._carriedOverProductIds = {id(carriedOverProduct)}
+        sut._missedProductsCount = 1
+
+        # When
+        asyncio.run(sut.run())
+
+        # Then
+        fetchedProductUrls = [u for u in sut._request.fetchedUrls if u != sut._scrapee.url]
+        self.assertEqual(carriedOverProduct.url, fetchedProductUrls[0])
+        self.assertEqual(5, len(fetchedProductUrls))
+        self.assertEqual(0, sut._missedProductsCount)
+        self.assertSetEqual(set(), sut._carriedOverProductIds)
+
+    def test_requestProduct_shouldSendChangesOfCurrentScanOnly(self):
+        # Given
+        product = Product(url="https://www.test_scraper_config_01.com/p/1",
+                          sizes=[Size(sizeEU="40", isInStock=True),
+                                 Size(sizeEU="41", isInStock=False)])
+        shop = Shop(url="https://www.test_scraper_config_01.com", products=[product])
+        shop.commitChanges()
+        request = self.PostRecordingRequestMock()
+        messengerRepo = Mock()
+        messengerRepo.findWebhookApiEndpoint.return_value = "https://discord.test/api/webhooks"
+        messengerRepo.findProductMessageConfig.return_value = msn.MessageConfig(
+            configName="product", user="user", token="token", username="Webtomator", timeout=1,
+            maxRetries=0, useRandomProxy=False)
+        messenger = msn.Discord(request=request, repo=messengerRepo)
+        sut = self.SizeScanningScraper(scrapee=shop,
+                                       scrapeeRepo=Mock(spec_set=ShopRepo),
+                                       request=request,
+                                       messenger=messenger)
+        sut.sizeScans = [{"40": False, "41": False},  # Sold out only
+                         {"40": True, "41": False},  # Restock of the sold out size
+                         {"40": True, "41": True}]  # Another restock
+
+        def getFieldsOfLastMessage() -> dict:
+            fields = request.postedData[-1]["embeds"][0]["fields"]
+            return {field["name"]: field["value"] for field in fields}
+
+        # When
+        asyncio.run(sut._requestProduct(product=product))
+
+        # Then: No message, but the sold out size gets written.
+        self.assertListEqual([], request.postedData)
+        sut._scrapeeRepo.scheduleUpdate.assert_called_once_with(shop=shop)
+
+        # When
+        asyncio.run(sut._requestProduct(product=product))
+
+        # Then
+        self.assertEqual(1, len(request.postedData))
+        fields = getFieldsOfLastMessage()
+        self.assertEqual("40", fields.get("Restocked"))
+        self.assertNotIn("Sold out", fields)
+
+        # When
+        asyncio.run(sut._requestProduct(product=product))
+
+        # Then
+        self.assertEqual(2, len(request.postedData))
+        fields = getFieldsOfLastMessage()
+        self.assertEqual("41", fields.get("Restocked"))
+        self.assertNotIn("Sold out", fields)
+        self.assertDictEqual({}, sut._scanSizeChanges)
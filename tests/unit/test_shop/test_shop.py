@@ -1,8 +1,10 @@
 # unit.test_shop.test_shop.py
+import pickle
 import uuid
 from unittest import mock
 
-from shop.product import Product
+from fixtures.shop import ShopFixture
+from shop.product import Product, Size
 from shop.shop import Shop
 from unit.testhelper import WebtomatorTestCase
 
@@ -145,6 +147,44 @@ class ShopTest(WebtomatorTestCase):
         # Then
         self.assertListEqual(expectedProducts, sut.products)
 
+    def test_removeProducts_shouldRemoveAllGivenProductsInOrder(self):
+        # Given
+        products = [Product(url=f"https://shop.com/p/{i}") for i in range(5)]
+        sut = Shop(products=list(products))
+        sut.commitChanges()
+
+        # When
+        sut.removeProducts([products[3], products[0], Product(url="https://shop.com/other")])
+
+        # Then
+        self.assertListEqual([products[1], products[2], products[4]], sut.products)
+        self.assertIsNone(sut.findProduct(products[0].url))
+        self.assertIs(products[4], sut.findProduct(products[4].url))
+        self.assertIn("products", sut.changedFields)
+
+    def test_findProduct_shouldFindProductsByUrl(self):
+        # Given
+        productA = Product(url="https://shop.com/a")
+        productB = Product(url="https://shop.com/b")
+        sut = Shop(products=[productA])
+
+        # When
+        sut.addProduct(productB)
+
+        # Then
+        self.assertIs(productA, sut.findProduct("https://shop.com/a"))
+        self.assertIs(productB, sut.findProduct("https://shop.com/b"))
+        self.assertIsNone(sut.findProduct("https://shop.com/c"))
+
+        # When
+        productA.url = "https://shop.com/c"
+        sut.removeProduct(productB)
+
+        # Then
+        self.assertIsNone(sut.findProduct("https://shop.com/a"))
+        self.assertIs(productA, sut.findProduct("https://shop.com/c"))
+        self.assertIsNone(sut.findProduct("https://shop.com/b"))
+
     def test_removeProduct_shouldRaiseTypeErrorOnInvalidType(self):
         # Given
         sut = Shop()
@@ -155,6 +195,42 @@ class ShopTest(WebtomatorTestCase):
         with self.assertRaises(TypeError):
             sut.removeProduct(prodA)
 
+    def test_eq_shouldCompareUidAndValues(self):
+        # Given
+        sut = Shop(uid="shop-uid", name="Shop", products=[Product(uid="p-uid", name="A")])
+        other = Shop(uid="shop-uid", name="Shop", products=[Product(uid="p-uid", name="A")])
+
+        # When / Then
+        self.assertEqual(sut, sut)
+        self.assertEqual(sut, other)
+
+        # When
+        other.products[0].name = "B"
+
+        # Then
+        self.assertNotEqual(sut, other)
+        self.assertNotEqual(Shop(name="Shop"), Shop(name="Shop"))
+        self.assertNotEqual(sut, "shop-uid")
+
+    def test_eq_shouldCompareLazilyLoadedShopsByValue(self):
+        # Given
+        data = Shop(uid="shop-uid", products=[
+            Product(uid="p-uid", sizes=[Size(uid="s-uid", sizeEU="42")])]).toDict()
+        sut = Shop.fromDict(data, lazyProducts=True)
+        other = Shop.fromDict(data, lazyProducts=True)
+        decoded = Shop.fromDict(data)
+
+        # When / Then
+        self.assertEqual(sut, other)
+        self.assertFalse(sut.isProductsDecoded)
+        self.assertEqual(sut, decoded)
+
+        # When
+        decoded.products[0].sizes[0].isInStock = True
+
+        # Then
+        self.assertNotEqual(other, decoded)
+
     def test_getNetloc(self):
         # Given
         sut = Shop()
@@ -199,24 +275,23 @@ class ShopTest(WebtomatorTestCase):
 
         # Any product with the same URL netloc part as the shop's URL netloc part
         # is expected to be added to the shop's products list.
-        productMock_01 = mock.Mock(spec=Product)
-        productMock_01.url = "http://this-is-the-netloc-part.com/en/some_product_link_284734.htm"
-        productMock_02 = mock.Mock(spec=Product)
-        productMock_02.url = "http://this-is-the-netloc-part.com/en/some_other_product_9274692"
-        productMock_03 = mock.Mock(spec=Product)
-        productMock_03.url = "http://another-shop.org/some_other_product_9274692.php"
+        product_01 = Product(
+            url="http://this-is-the-netloc-part.com/en/some_product_link_284734.htm")
+        product_02 = Product(
+            url="http://this-is-the-netloc-part.com/en/some_other_product_9274692")
+        product_03 = Product(url="http://another-shop.org/some_other_product_9274692.php")
 
         products = list()
-        products.extend([productMock_01, productMock_02, productMock_03])
+        products.extend([product_01, product_02, product_03])
 
         # When
         addedProducts = sut.assignProducts(products)
 
         # Then
-        # productMock_03 should NOT be in the shop's products list.
+        # product_03 should NOT be in the shop's products list.
         self.assertEqual(2, len(sut.products))
-        self.assertEqual(productMock_01.url, sut.products[0].url)
-        self.assertEqual(productMock_02.url, sut.products[1].url)
+        self.assertEqual(product_01.url, sut.products[0].url)
+        self.assertEqual(product_02.url, sut.products[1].url)
         self.assertIsInstance(addedProducts, list)
         self.assertEqual(2, len(addedProducts))
 
@@ -240,4 +315,220 @@ class ShopTest(WebtomatorTestCase):
         # Then
         self.assertEqual(0, len(sut.products))
         self.assertIsInstance(addedProducts, list)
-        self.assertEqual(0, len(addedProducts))
\ No newline at end of file
+        self.assertEqual(0, len(addedProducts))
+
+    def test_changes_shouldTrackNameAndProducts(self):
+        # Given
+        product = Product(url="https://megashop.com/products/1")
+        sut = Shop(name="Megashop", products=[product])
+
+        # Then
+        self.assertFalse(sut.isChanged)
+
+        # When
+        sut.name = "Megashop Deluxe"
+        newProduct = Product(url="https://megashop.com/products/2")
+        sut.addProduct(newProduct)
+
+        # Then
+        self.assertTrue(sut.isChanged)
+        self.assertEqual("Megashop", sut.changedFields["name"])
+        self.assertListEqual([product], sut.changedFields["products"])
+        self.assertListEqual([newProduct], sut.getChangedProducts())
+
+    def test_changes_shouldIncludeChangedProducts(self):
+        # Given
+        product = Product(url="https://megashop.com/products/1")
+        sut = Shop(name="Megashop", products=[product])
+
+        # When
+        product.name = "Changed product name"
+
+        # Then
+        self.assertTrue(sut.isChanged)
+        self.assertDictEqual({}, sut.changedFields)
+        self.assertListEqual([product], sut.getChangedProducts())
+
+    def test_changes_shouldReportSizeChangesOfListedProductsOnly(self):
+        # Given
+        size = Size(sizeEU="42", isInStock=False)
+        product = Product(url="https://megashop.com/products/1", sizes=[size])
+        removedProduct = Product(url="https://megashop.com/products/2")
+        sut = Shop(name="Megashop", products=[product, removedProduct])
+        sut.removeProduct(removedProduct)
+        sut.commitChanges()
+
+        # When
+        size.isInStock = True
+        removedProduct.name = "Changed after removal"
+
+        # Then
+        self.assertTrue(sut.isChanged)
+        self.assertListEqual([product], sut.getChangedProducts())
+
+        # When
+        sut.commitChanges()
+
+        # Then
+        self.assertFalse(size.isChanged)
+        self.assertFalse(sut.isChanged)
+        self.assertTrue(removedProduct.isChanged)
+
+    def test_changes_shouldBeTrackedAfterPickling(self):
+        # Given
+        sut = pickle.loads(pickle.dumps(Shop(products=[
+            Product(url="https://megashop.com/products/1", sizes=[Size(sizeEU="42")])])))
+
+        # When
+        sut.products[0].sizes[0].isInStock = True
+
+        # Then
+        self.assertTrue(sut.isChanged)
+        self.assertListEqual([sut.products[0]], sut.getChangedProducts())
+
+    def test_commitChanges_shouldResetChangesOfShopAndProducts(self):
+        # Given
+        product = Product(url="https://megashop.com/products/1")
+        sut = Shop(name="Megashop", products=[product])
+        sut.name = "Megashop Deluxe"
+        product.name = "Changed product name"
+
+        # When
+        sut.commitChanges()
+
+        # Then
+        self.assertFalse(sut.isChanged)
+        self.assertFalse(product.isChanged)
+        self.assertListEqual([], sut.getChangedProducts())
+
+    def test_snapshot_shouldCopyChangedProductsAndKeepChanges(self):
+        # Given
+        unchangedProduct = Product(url="https://megashop.com/products/1")
+        changedProduct = Product(url="https://megashop.com/products/2")
+        sut = Shop(name="Megashop", products=[unchangedProduct, changedProduct])
+        changedProduct.name = "Changed product name"
+        newProduct = Product(url="https://megashop.com/products/3")
+        sut.addProduct(newProduct)
+
+        # When
+        snapshot = sut.snapshot()
+        sut.commitChanges()
+        sut.name = "Changed after snapshot"
+        changedProduct.name = "Changed after snapshot"
+
+        # Then
+        self.assertEqual("Megashop", snapshot.name)
+        self.assertIn("products", snapshot.changedFields)
+        self.assertIs(unchangedProduct, snapshot.products[0])
+        self.assertIsNot(changedProduct, snapshot.products[1])
+        self.assertEqual("Changed product name", snapshot.products[1].name)
+        self.assertEqual("", snapshot.products[1].changedFields["name"])
+        self.assertListEqual([snapshot.products[1], snapshot.products[2]],
+                             snapshot.getChangedProducts())
+
+    def test_snapshot_shouldKeepProductsListWhenOriginalChangesBeforeAccess(self):
+        # Given
+        unchangedProduct = Product(url="https://megashop.com/products/1")
+        changedProduct = Product(url="https://megashop.com/products/2")
+        sut = Shop(name="Megashop", products=[unchangedProduct, changedProduct])
+        sut.commitChanges()
+        changedProduct.basePrice = 10.0
+
+        # When
+        snapshot = sut.snapshot()
+        sut.commitChanges()
+        sut.removeProduct(unchangedProduct)
+        sut.addProduct(Product(url="https://megashop.com/products/3"))
+        changedProduct.basePrice = 20.0
+
+        # Then
+        self.assertEqual(2, len(snapshot.products))
+        self.assertIs(unchangedProduct, snapshot.products[0])
+        self.assertEqual(10.0, snapshot.products[1].basePrice)
+        self.assertListEqual([snapshot.products[1]], snapshot.getChangedProducts())
+        self.assertCountEqual([sut.products[1], changedProduct], sut.getChangedProducts())
+
+    def test_toDict_fromDict_shouldRoundTrip(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        shop = fixture.shops[0]
+        shop.lastScanStamp = 1588548868.5
+        # Name contains a prefix which was stripped by a former encoder
+        shop.products[0].name = "Bottle _Shop__products _Product__name"
+
+        # When
+        sut = Shop.fromDict(shop.toDict())
+
+        # Then
+        self.assertEqual(shop, sut)
+        self.assertEqual("Bottle _Shop__products _Product__name", sut.products[0].name)
+        self.assertFalse(sut.isChanged)
+
+    def test_fromDict_lazyProducts_shouldDecodeProductsOnFirstAccess(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        shopDict = fixture.shops[0].toDict()
+
+        # When
+        sut = Shop.fromDict(shopDict, lazyProducts=True)
+
+        # Then
+        self.assertFalse(sut.isProductsDecoded)
+        self.assertFalse(sut.isChanged)
+        self.assertListEqual([p.url for p in fixture.shops[0].products], sut.getProductUrls())
+        self.assertDictEqual(shopDict, sut.toDict())
+        self.assertFalse(sut.isProductsDecoded)
+
+        # When
+        products = sut.products
+
+        # Then
+        self.assertTrue(sut.isProductsDecoded)
+        self.assertIs(products, sut.products)
+        self.assertEqual(fixture.shops[0], sut)
+
+    def test_fromDict_lazyProducts_shouldTrackChangesAfterDecoding(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        sut = Shop.fromDict(fixture.shops[0].toDict(), lazyProducts=True)
+        newProduct = Product(url="https://megashop.com/products/new")
+
+        # When
+        sut.addProduct(newProduct)
+        sut.products[0].basePrice = 1.5
+
+        # Then
+        self.assertIn("products", sut.changedFields)
+        self.assertEqual(len(fixture.shops[0].products), len(sut.changedFields["products"]))
+        self.assertCountEqual([sut.products[0], newProduct], sut.getChangedProducts())
+
+    def test_toDict_lazyProducts_shouldCompleteIncompleteProductDicts(self):
+        # Given
+        sut = Shop.fromDict({"name": "Megashop", "products": [{"url": "https://megashop.com/1"}]},
+                            lazyProducts=True)
+
+        # When
+        result = sut.toDict()
+
+        # Then
+        self.assertTrue(sut.isProductsDecoded)
+        self.assertEqual(sut.products[0].uid, result["products"][0]["uid"])
+        self.assertDictEqual(sut.products[0].toDict(), result["products"][0])
+
+    def test_toDict_shouldReturnPlainData(self):
+        # Given
+        product = Product(uid="p-uid", url="https://megashop.com/products/1")
+        sut = Shop(uid="s-uid", name="Megashop", url="https://megashop.com",
+                   products=[product], lastScanStamp=12.5)
+
+        # When
+        result = sut.toDict()
+
+        # Then
+        self.assertDictEqual(
+            {"uid": "s-uid", "name": "Megashop", "url": "https://megashop.com",
+             "products": [product.toDict()], "lastScanStamp": 12.5},
+            result)
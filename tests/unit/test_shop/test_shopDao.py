@@ -1,11 +1,18 @@
 # unit.test_shop.test_shopDao.py
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import List
+from unittest import mock
 from unittest.mock import Mock
 
 import tinydb as tdb
 
 from fixtures.shop import TEMP_SHOPS_TINYDB_TEST_PATH, ShopFixture
+from shop.product import Product
 from shop.shop import Shop
-from shop.shopDao import TinyShopDao
+from shop.shopDao import TinyShopDao, SqliteShopDao, ShardedTinyShopDao, JournaledShopDao
+from storage.tinyDao import TinyDao
 from unit.testhelper import WebtomatorTestCase
 
 
@@ -152,6 +159,21 @@ class TinyShopDaoTest(WebtomatorTestCase):
         # Cleanup
         dbRef.close()
 
+    def test_saveAll_shouldInsertAllShopsAtOnce(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+
+        # When
+        with mock.patch.object(TinyDao, "insert") as insert:
+            with TinyShopDao(self.testDBPath) as sut:
+                sut.saveAll(data=fixture.shops)
+
+        # Then
+        insert.assert_not_called()
+        with TinyShopDao(self.testDBPath) as sut:
+            self.assertEqual(fixture.shops, sut.loadAll())
+
     def test_loadAll(self):
         # Given
         assert self.testDBPath.exists()  # Precondition for the test
@@ -255,6 +277,127 @@ class TinyShopDaoTest(WebtomatorTestCase):
         # Expect that the second shop has been updated with correct updated values.
         self.assertEqual(fixture.shops[1], savedShops[1])
 
+    def test_update_changesOnly_shouldWriteChangedProductsOnly(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        with TinyShopDao(self.testDBPath) as sut:
+            sut.saveAll(data=fixture.shops)
+        for shop in fixture.shops:
+            shop.commitChanges()
+
+        shop = fixture.shops[0]
+        changedProduct, unchangedProduct = shop.products
+        shop.name = "An updated shop name"
+        changedProduct.sizes[1].isInStock = True
+        # Simulate a change which was not tracked and therefore must not be written
+        unchangedProduct.lastScanStamp = 999.0
+
+        # When
+        with mock.patch.object(TinyShopDao, "_encodeShop") as encodeShop:
+            with TinyShopDao(self.testDBPath) as sut:
+                sut.update(data=shop, changesOnly=True)
+
+        # Then
+        encodeShop.assert_not_called()
+        with TinyShopDao(self.testDBPath) as sut:
+            savedShop = sut.find(uid=shop.uid)
+
+        self.assertEqual("An updated shop name", savedShop.name)
+        self.assertIs(True, savedShop.products[0].sizes[1].isInStock)
+        self.assertEqual(1588548911.230381, savedShop.products[1].lastScanStamp)
+
+    def test_update_changesOnly_shouldSkipUnchangedShop(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        shop = fixture.shops[0]
+        shop.commitChanges()
+
+        # When
+        with mock.patch.object(TinyShopDao, "_updateByUID") as updateByUID:
+            with TinyShopDao(self.testDBPath) as sut:
+                sut.update(data=shop, changesOnly=True)
+
+        # Then
+        updateByUID.assert_not_called()
+
+    def test_update_changesOnly_shouldWriteWholeShopWhenProductsWereAdded(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        with TinyShopDao(self.testDBPath) as sut:
+            sut.saveAll(data=fixture.shops)
+        for shop in fixture.shops:
+            shop.commitChanges()
+
+        shop = fixture.shops[1]
+        shop.addProduct(Product(url="https://www.megashop.com/shoes/new-product.html"))
+
+        # When
+        with TinyShopDao(self.testDBPath) as sut:
+            sut.update(data=shop, changesOnly=True)
+
+        # Then
+        with TinyShopDao(self.testDBPath) as sut:
+            savedShop = sut.find(uid=shop.uid)
+
+        self.assertEqual(shop, savedShop)
+
+    def test_loadAll_shouldReturnUnchangedShops(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        with TinyShopDao(self.testDBPath) as sut:
+            sut.saveAll(data=fixture.shops)
+
+        # When
+        with TinyShopDao(self.testDBPath) as sut:
+            loadedShops = sut.loadAll()
+
+        # Then
+        for shop in loadedShops:
+            self.assertFalse(shop.isChanged)
+
+    def test_loadAll_lazyProducts_shouldDecodeProductsOnAccess(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        with TinyShopDao(self.testDBPath) as sut:
+            sut.saveAll(data=fixture.shops)
+
+        # When
+        with TinyShopDao(self.testDBPath, lazyProducts=True) as sut:
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertFalse(any(shop.isProductsDecoded for shop in loadedShops))
+        self.assertListEqual(fixture.shops, loadedShops)
+        self.assertFalse(any(shop.isProductsDecoded for shop in loadedShops))
+        self.assertEqual(len(fixture.shops[0].products), len(loadedShops[0].products))
+        self.assertTrue(loadedShops[0].isProductsDecoded)
+
+    def test_update_lazyProducts_shouldWriteUndecodedShop(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        with TinyShopDao(self.testDBPath) as sut:
+            sut.saveAll(data=fixture.shops)
+        with TinyShopDao(self.testDBPath, lazyProducts=True) as sut:
+            shop = sut.find(uid=fixture.shops[0].uid)
+        shop.name = "An updated shop name"
+
+        # When
+        with TinyShopDao(self.testDBPath) as sut:
+            sut.update(data=shop)
+
+        # Then
+        self.assertFalse(shop.isProductsDecoded)
+        with TinyShopDao(self.testDBPath) as sut:
+            savedShop = sut.find(uid=shop.uid)
+        fixture.shops[0].name = "An updated shop name"
+        self.assertEqual(fixture.shops[0], savedShop)
+
     def test_update_shouldRaiseIfGivenDataHasWrongType(self):
         # Given
         invalidData = Mock(name="invalidType")
@@ -309,3 +452,542 @@ class TinyShopDaoTest(WebtomatorTestCase):
         self.assertEqual(1, len(foundShops))
         self.assertIsInstance(foundShops[0], Shop)
         self.assertEqual(foundShops, [expectedShop])
+
+
+class ShardedTinyShopDaoTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.testDirPath = Path(self.tempDir.name, "Shops")
+
+    def tearDown(self) -> None:
+        self.tempDir.cleanup()
+
+    def _saveFixtureShops(self) -> ShopFixture:
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        with ShardedTinyShopDao(self.testDirPath) as dao:
+            dao.saveAll(data=fixture.shops)
+        for shop in fixture.shops:
+            shop.commitChanges()
+        return fixture
+
+    def test_saveAll_shouldWriteOneShardPerShop(self):
+        # When
+        fixture = self._saveFixtureShops()
+
+        # Then
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            for shop in fixture.shops:
+                self.assertTrue(sut.getShardPath(shop.uid).is_file())
+            self.assertTrue(sut.connection.path.is_file())
+
+    def test_saveAll_shouldDeleteShardsOfRemovedShops(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        removedShop = fixture.shops[0]
+
+        # When
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            sut.saveAll(data=fixture.shops[1:])
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertEqual(fixture.shops[1:], loadedShops)
+        self.assertFalse(sut.getShardPath(removedShop.uid).exists())
+
+    def test_loadAll(self):
+        # Given
+        fixture = self._saveFixtureShops()
+
+        # When
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertEqual(fixture.shops, loadedShops)
+
+    def test_loadAll_shouldReturnNoneWhenEmpty(self):
+        # When
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertIsNone(loadedShops)
+
+    def test_insert(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+
+        # When
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            sut.insert(data=fixture.shops[1])
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertEqual([fixture.shops[1]], loadedShops)
+
+    def test_update_shouldWriteAffectedShardOnly(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop, otherShop = fixture.shops
+        shop.products[0].sizes[1].isInStock = True
+
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            otherShardStamp = sut.getShardPath(otherShop.uid).stat().st_mtime_ns
+            manifestStamp = sut.connection.path.stat().st_mtime_ns
+
+        # When
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            sut.update(data=shop, changesOnly=True)
+
+        # Then
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            savedShop = sut.find(uid=shop.uid)
+            self.assertEqual(otherShardStamp,
+                             sut.getShardPath(otherShop.uid).stat().st_mtime_ns)
+            self.assertEqual(manifestStamp, sut.connection.path.stat().st_mtime_ns)
+
+        self.assertEqual(shop, savedShop)
+
+    def test_update_shouldUpdateManifestWhenNameChanged(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop = fixture.shops[1]
+        shop.name = "An updated shop name"
+
+        # When
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            sut.update(data=shop, changesOnly=True)
+
+        # Then
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            foundShops = sut.find(shopName="An updated shop name")
+
+        self.assertListEqual([shop], foundShops)
+
+    def test_update_shouldRaiseWhenUIDNotFound(self):
+        # Given
+        self._saveFixtureShops()
+        unknownShop = Shop(url="https://unknown-shop.com")
+
+        # When / Then
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            with self.assertRaises(LookupError):
+                sut.update(data=unknownShop)
+
+    def test_find_uid(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        expectedShop = fixture.shops[1]
+
+        # When
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            foundShop = sut.find(uid=expectedShop.uid)
+
+        # Then
+        self.assertEqual(expectedShop, foundShop)
+
+    def test_find_shouldRaiseOnWrongKeywords(self):
+        # When / Then
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            with self.assertRaises(KeyError):
+                sut.find(invalidKeyword="Value does not matter here")
+
+    def test_deleteAll(self):
+        # Given
+        fixture = self._saveFixtureShops()
+
+        # When
+        with ShardedTinyShopDao(self.testDirPath) as sut:
+            sut.deleteAll()
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertIsNone(loadedShops)
+        for shop in fixture.shops:
+            self.assertFalse(sut.getShardPath(shop.uid).exists())
+
+
+class SqliteShopDaoTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.testDBPath = Path(self.tempDir.name, "SQLite_TempShops.sqlite")
+
+    def tearDown(self) -> None:
+        self.tempDir.cleanup()
+
+    def _saveFixtureShops(self) -> ShopFixture:
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        with SqliteShopDao(self.testDBPath) as dao:
+            dao.saveAll(data=fixture.shops)
+        for shop in fixture.shops:
+            shop.commitChanges()
+        return fixture
+
+    def test_enter_shouldEnableWAL(self):
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            journalMode = sut.connection.db.execute("PRAGMA journal_mode").fetchone()[0]
+
+        # Then
+        self.assertEqual("wal", journalMode)
+
+    def test_saveAll_loadAll(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            sut.saveAll(data=fixture.shops)
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertEqual(fixture.shops, loadedShops)
+        for shop in loadedShops:
+            self.assertFalse(shop.isChanged)
+
+    def test_saveAll_shouldOverwriteExistingShops(self):
+        # Given
+        fixture = self._saveFixtureShops()
+
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            sut.saveAll(data=fixture.shops[1:])
+            loadedShops = sut.loadAll()
+            productCount = sut.connection.db.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+        # Then
+        self.assertEqual(fixture.shops[1:], loadedShops)
+        self.assertEqual(len(fixture.shops[1].products), productCount)
+
+    def test_saveAll_shouldRaiseIfGivenDataHasWrongType(self):
+        # When / Then
+        with SqliteShopDao(self.testDBPath) as sut:
+            with self.assertRaises(TypeError):
+                sut.saveAll(data=[Mock(name="invalidType")])
+
+    def test_loadAll_shouldReturnNoneWhenEmpty(self):
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertIsNone(loadedShops)
+
+    def test_insert_shouldRaiseWhenUIDExists(self):
+        # Given
+        fixture = self._saveFixtureShops()
+
+        # When / Then
+        with SqliteShopDao(self.testDBPath) as sut:
+            with self.assertRaises(sqlite3.IntegrityError):
+                sut.insert(data=fixture.shops[0])
+
+    def test_update(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        expectedShop = fixture.shops[0]
+        expectedShop.name = "An updated shop name"
+        expectedShop.products[0].name = "An updated product name"
+        expectedShop.products[0].sizes[0].url = "https://updated-size.com"
+        expectedShop.removeProduct(expectedShop.products[1])
+
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            sut.update(data=expectedShop)
+
+        # Then
+        with SqliteShopDao(self.testDBPath) as sut:
+            savedShops = sut.loadAll()
+
+        self.assertEqual(fixture.shops, savedShops)
+
+    def test_update_shouldRaiseWhenUIDNotFound(self):
+        # Given
+        self._saveFixtureShops()
+        unknownShop = Shop(url="https://unknown-shop.com")
+
+        # When / Then
+        with SqliteShopDao(self.testDBPath) as sut:
+            with self.assertRaises(LookupError):
+                sut.update(data=unknownShop)
+
+    def test_update_changesOnly_shouldWriteChangedRowsOnly(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop = fixture.shops[0]
+        changedProduct, unchangedProduct = shop.products
+        changedProduct.sizes[1].isInStock = True
+        # Simulate a change which was not tracked and therefore must not be written
+        unchangedProduct.lastScanStamp = 999.0
+
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            sut.update(data=shop, changesOnly=True)
+
+        # Then
+        with SqliteShopDao(self.testDBPath) as sut:
+            savedShop = sut.find(uid=shop.uid)
+
+        self.assertIs(True, savedShop.products[0].sizes[1].isInStock)
+        self.assertEqual(1588548911.230381, savedShop.products[1].lastScanStamp)
+
+    def test_update_changesOnly_shouldSyncSizesWhenSizesWereReplaced(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop = fixture.shops[0]
+        product = shop.products[0]
+        product.sizes = product.sizes[:1]
+
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            sut.update(data=shop, changesOnly=True)
+
+        # Then
+        with SqliteShopDao(self.testDBPath) as sut:
+            savedShop = sut.find(uid=shop.uid)
+
+        self.assertEqual(shop, savedShop)
+        self.assertEqual(1, len(savedShop.products[0].sizes))
+
+    def test_update_changesOnly_shouldWriteWholeShopWhenProductsWereAdded(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop = fixture.shops[1]
+        shop.addProduct(Product(url="https://www.megashop.com/shoes/new-product.html"))
+
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            sut.update(data=shop, changesOnly=True)
+
+        # Then
+        with SqliteShopDao(self.testDBPath) as sut:
+            savedShop = sut.find(uid=shop.uid)
+
+        self.assertEqual(shop, savedShop)
+
+    def test_find_shouldRaiseOnWrongKeywords(self):
+        # When / Then
+        with SqliteShopDao(self.testDBPath) as sut:
+            with self.assertRaises(KeyError):
+                sut.find(invalidKeyword="Value does not matter here")
+
+    def test_find_uid(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        expectedShop = fixture.shops[1]
+
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            foundShop = sut.find(uid=expectedShop.uid)
+
+        # Then
+        self.assertIsInstance(foundShop, Shop)
+        self.assertEqual(expectedShop, foundShop)
+
+    def test_find_name(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        expectedShop = fixture.shops[0]
+
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            foundShops = sut.find(shopName=expectedShop.name)
+
+        # Then
+        self.assertListEqual([expectedShop], foundShops)
+
+    def test_deleteAll(self):
+        # Given
+        self._saveFixtureShops()
+
+        # When
+        with SqliteShopDao(self.testDBPath) as sut:
+            sut.deleteAll()
+            sizeCount = sut.connection.db.execute("SELECT COUNT(*) FROM sizes").fetchone()[0]
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertIsNone(loadedShops)
+        self.assertEqual(0, sizeCount)
+
+
+class JournaledShopDaoTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.snapshotPath = Path(self.tempDir.name, "Shops.json")
+        self.snapshotPath.touch()
+        self.journalPath = Path(self.tempDir.name, "Shops.journal.jsonl")
+
+    def tearDown(self) -> None:
+        self.tempDir.cleanup()
+
+    def _getInstance(self) -> JournaledShopDao:
+        return JournaledShopDao(snapshotDao=TinyShopDao(self.snapshotPath),
+                                journalPath=self.journalPath)
+
+    def _saveFixtureShops(self) -> ShopFixture:
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        with self._getInstance() as dao:
+            dao.saveAll(data=fixture.shops)
+        for shop in fixture.shops:
+            shop.commitChanges()
+        return fixture
+
+    def _loadSnapshot(self) -> List[Shop]:
+        with TinyShopDao(self.snapshotPath) as dao:
+            return dao.loadAll()
+
+    def test_update_changesOnly_shouldAppendToJournalOnly(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop = fixture.shops[0]
+        shop.name = "An updated shop name"
+        shop.products[0].sizes[0].isInStock = False
+        shop.products[1].basePrice = 11.5
+        snapshotBefore = self._loadSnapshot()
+
+        # When
+        with self._getInstance() as sut:
+            sut.update(data=shop, changesOnly=True)
+
+        # Then
+        self.assertEqual(snapshotBefore, self._loadSnapshot())
+        records = list(self._getInstance().journal.read())
+        self.assertListEqual(["setShopFields", "setProductFields", "setSizeFields",
+                              "setProductFields"], [r["op"] for r in records])
+
+        with self._getInstance() as sut:
+            self.assertEqual(fixture.shops, sut.loadAll())
+
+    def test_update_changesOnly_shouldJournalReplacedSizesWithProduct(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop = fixture.shops[0]
+        shop.products[0].sizes = shop.products[0].sizes[:1]
+
+        # When
+        with self._getInstance() as sut:
+            sut.update(data=shop, changesOnly=True)
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertEqual(fixture.shops, loadedShops)
+
+    def test_update_shouldJournalWholeShopWhenProductsWereAdded(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop = fixture.shops[1]
+        shop.addProduct(Product(url="https://www.megashop.com/shoes/new-product.html"))
+
+        # When
+        with self._getInstance() as sut:
+            sut.update(data=shop, changesOnly=True)
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertEqual(["setShop"], [r["op"] for r in self._getInstance().journal.read()])
+        self.assertEqual(fixture.shops, loadedShops)
+
+    def test_insert(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        newShop = Shop(name="New shop", url="https://new-shop.com",
+                       products=[Product(url="https://new-shop.com/p/1")])
+
+        # When
+        with self._getInstance() as sut:
+            sut.insert(data=newShop)
+            foundShop = sut.find(uid=newShop.uid)
+
+        # Then
+        self.assertEqual(newShop, foundShop)
+        self.assertEqual(fixture.shops, self._loadSnapshot())
+
+    def test_find_uids_shouldReplayJournalOfRequestedShopsOnly(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        changedShop, otherShop = fixture.shops
+        changedShop.name = "An updated shop name"
+        changedShop.products[0].sizes[0].isInStock = False
+        otherShop.name = "Another updated shop name"
+        newShop = Shop(name="New shop", url="https://new-shop.com")
+
+        with self._getInstance() as dao:
+            dao.update(data=changedShop, changesOnly=True)
+            dao.update(data=otherShop, changesOnly=True)
+            dao.insert(data=newShop)
+
+        replayedRecords = list()
+
+        def replay(shopItems, records):
+            replayedRecords.extend(records)
+            return JournaledShopDao._replay(shopItems, replayedRecords)
+
+        # When
+        with self._getInstance() as sut:
+            with mock.patch.object(sut, "_replay", side_effect=replay):
+                foundShops = sut.find(uids=[changedShop.uid, newShop.uid, "unknown"])
+
+        # Then
+        self.assertListEqual([changedShop, newShop], foundShops)
+        self.assertSetEqual({changedShop.uid, newShop.uid},
+                            {sut.getRecordShopUID(r) for r in replayedRecords})
+
+    def test_compact_shouldFoldJournalIntoSnapshot(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop = fixture.shops[0]
+        shop.products[0].sizes[0].isInStock = False
+        with self._getInstance() as dao:
+            dao.update(data=shop, changesOnly=True)
+
+        # When
+        with self._getInstance() as sut:
+            sut.compact()
+
+        # Then
+        self.assertEqual(0, self._getInstance().journal.size)
+        self.assertEqual(fixture.shops, self._loadSnapshot())
+
+    def test_loadAll_shouldReplayRecordsOfInterruptedCompaction(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        shop = fixture.shops[0]
+        shop.products[0].name = "Renamed before compaction"
+        with self._getInstance() as dao:
+            dao.update(data=shop, changesOnly=True)
+            dao.journal.rotate()  # Simulates a crash while compacting
+        shop.commitChanges()
+        shop.products[1].name = "Renamed after compaction"
+        with self._getInstance() as dao:
+            dao.update(data=shop, changesOnly=True)
+
+        # When
+        with self._getInstance() as sut:
+            loadedShops = sut.loadAll()
+
+        # Then
+        self.assertEqual(fixture.shops, loadedShops)
+
+    def test_saveAll_shouldClearJournal(self):
+        # Given
+        fixture = self._saveFixtureShops()
+        fixture.shops[0].name = "An updated shop name"
+        with self._getInstance() as dao:
+            dao.update(data=fixture.shops[0], changesOnly=True)
+
+        # When
+        with self._getInstance() as sut:
+            sut.saveAll(data=fixture.shops)
+
+        # Then
+        self.assertEqual(0, self._getInstance().journal.size)
+        self.assertEqual(fixture.shops, self._loadSnapshot())
@@ -1,13 +1,21 @@
 # unit.test_shop.test_shopRepo.py
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
 from unittest.mock import Mock
 
 import tinydb as tdb
 
 from fixtures.shop import ShopFixture, TEMP_SHOPS_TINYDB_TEST_PATH, \
     PRODUCTS_URLS_9_VALID_TEST_PATH, PRODUCTS_URLS_TEST_DIR
+from shop.product import Product
+from shop.productHistory import ProductHistory
 from shop.shop import Shop
 from shop.shopDao import TinyShopDao
-from shop.shopRepo import ShopRepo
+from shop.shopRepo import ShopRepo, AsyncShopRepo
+from storage.base import ChangeTrackable
 from unit.testhelper import WebtomatorTestCase, ProductsUrlsRepoMock
 
 
@@ -143,6 +151,76 @@ class ShopRepoTest(WebtomatorTestCase):
         # Expect that updated shop matches the expected one
         self.assertEqual(expectedShop, updatedShops[0])
 
+    def test_scheduleUpdate_shouldNotWriteBeforeFlush(self):
+        # Given
+        daoMock = mock.MagicMock()
+        sut = ShopRepo(dao=daoMock)
+        shop = Shop(name="Scheduled shop")
+
+        # When
+        sut.scheduleUpdate(shop=shop)
+
+        # Then
+        self.assertTrue(sut.hasPendingUpdates)
+        daoMock.__enter__.assert_not_called()
+
+    def test_flush_shouldWriteEachScheduledShopOnce(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        testTinyShopDao = TinyShopDao(path=self.testDBPath)
+        sut = ShopRepo(dao=testTinyShopDao)
+        sut.setAll(shops=fixture.shops)
+        shop01, shop02 = fixture.shops
+        shop01.name = "Changed shop name 01"
+        shop02.name = "Changed shop name 02"
+
+        # When
+        with mock.patch.object(TinyShopDao, "update", autospec=True,
+                               side_effect=TinyShopDao.update) as update:
+            sut.scheduleUpdate(shop=shop01)
+            sut.scheduleUpdate(shop=shop02)
+            sut.scheduleUpdate(shop=shop01)
+            sut.flush()
+
+        # Then
+        self.assertEqual(2, update.call_count)
+        self.assertFalse(sut.hasPendingUpdates)
+        self.assertListEqual(fixture.shops, sut.getAll())
+
+    def test_flush_shouldRecordChangedProductsInHistory(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        history = mock.Mock(spec_set=ProductHistory)
+        sut = ShopRepo(dao=mock.MagicMock(), history=history)
+        shop = fixture.shops[0]
+        shop.commitChanges()
+        changedProduct = shop.products[1]
+        changedProduct.basePrice = 12.5
+
+        # When
+        sut.scheduleUpdate(shop=shop)
+        sut.flush()
+
+        # Then
+        history.record.assert_called_once_with([changedProduct])
+        history.flush.assert_called_once()
+
+    def test_flush_shouldKeepShopsScheduledOnError(self):
+        # Given
+        sut = ShopRepo(dao=TinyShopDao(path=self.testDBPath))
+        unknownShop = Shop()
+        unknownShop.name = "Shop which is not in DB"
+
+        # When
+        sut.scheduleUpdate(shop=unknownShop)
+        with self.assertRaises(LookupError):
+            sut.flush()
+
+        # Then
+        self.assertTrue(sut.hasPendingUpdates)
+
     def test_findByUID(self):
         # Given
         # Create test data to search for.
@@ -336,4 +414,356 @@ class ShopRepoTest(WebtomatorTestCase):
         self.assertIsInstance(newShop.products, list)
         self.assertEqual(1, len(newShop.products))
         for product in newShop.products:
-            self.assertIn(product.url, expectedProductUrls)
\ No newline at end of file
+            self.assertIn(product.url, expectedProductUrls)
+
+    def test_updateFromProductsUrls_shouldNotWriteShopsWhichAreUpToDate(self):
+        # Given
+        productsUrlsRepo = ProductsUrlsRepoMock(
+            productsUrlsRepoPath=PRODUCTS_URLS_9_VALID_TEST_PATH)
+        sut = ShopRepo(dao=TinyShopDao(path=self.testDBPath))
+        sut.updateFromProductsUrls(productsUrlsRepo=productsUrlsRepo)
+
+        # When
+        with mock.patch.object(ShopRepo, "setAll") as setAll:
+            sut.updateFromProductsUrls(productsUrlsRepo=productsUrlsRepo)
+
+        # Then
+        setAll.assert_not_called()
+
+    def test_planProductsUrlsUpdate_shouldListShopsAndProductsToAddAndRemove(self):
+        # Given
+        keptShop = Shop(url="https://kept.com", products=[
+            Product(url="https://kept.com/a"), Product(url="https://kept.com/b")])
+        removedShop = Shop(url="https://removed.com",
+                           products=[Product(url="https://removed.com/a")])
+        urlsShops = [
+            Shop(url="https://kept.com", products=[
+                Product(url="https://kept.com/b"), Product(url="https://kept.com/c")]),
+            Shop(url="https://new.com", products=[Product(url="https://new.com/a")])]
+
+        # When
+        plan = ShopRepo._planProductsUrlsUpdate([keptShop, removedShop], urlsShops)
+        shops = ShopRepo._applyProductsUrlsPlan([keptShop, removedShop], plan)
+
+        # Then
+        self.assertFalse(plan.isEmpty)
+        self.assertListEqual([urlsShops[1]], plan.addShops)
+        self.assertListEqual([removedShop], plan.removeShops)
+        self.assertListEqual([urlsShops[0].products[1]], plan.addProducts[keptShop.uid])
+        self.assertSetEqual({"https://kept.com/a"}, plan.removeProductUrls[keptShop.uid])
+        self.assertListEqual([keptShop, urlsShops[1]], shops)
+        self.assertListEqual(["https://kept.com/b", "https://kept.com/c"],
+                             [p.url for p in keptShop.products])
+        self.assertTrue(ShopRepo._planProductsUrlsUpdate(shops, urlsShops).isEmpty)
+
+
+class AsyncShopRepoTest(WebtomatorTestCase):
+    testDBPath = TEMP_SHOPS_TINYDB_TEST_PATH
+
+    def setUp(self) -> None:
+        dbRef = tdb.TinyDB(str(self.testDBPath))
+        dbRef.purge_tables()
+        dbRef.close()
+
+    def test_flush_shouldWriteScheduledShopsOnWriterThread(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        sut = AsyncShopRepo(dao=TinyShopDao(path=self.testDBPath))
+        sut.setAll(shops=fixture.shops)
+        shop = fixture.shops[0]
+        shop.name = "Changed shop name"
+        writerThreads = set()
+        originalUpdate = TinyShopDao.update
+
+        def update(dao, **kwargs):
+            writerThreads.add(threading.current_thread())
+            originalUpdate(dao, **kwargs)
+
+        async def runner():
+            sut.scheduleUpdate(shop=shop)
+            await sut.flush()
+            # Shops get committed when the write is dispatched.
+            self.assertFalse(shop.isChanged)
+            await sut.close()
+
+        # When
+        with mock.patch.object(TinyShopDao, "update", autospec=True, side_effect=update):
+            asyncio.run(runner())
+
+        # Then
+        self.assertEqual(1, len(writerThreads))
+        self.assertIsNot(threading.current_thread(), writerThreads.pop())
+        self.assertListEqual(fixture.shops, sut.getAll())
+
+    def test_reloadFromProductsUrls_shouldUpdateShopsInUse(self):
+        # Given
+        tempDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempDir.cleanup)
+        urlsPath = Path(tempDir.name, "ProductsURLs.txt")
+        urlsPath.write_text("https://a.com/1\nhttps://a.com/2\nhttps://b.com/1\n")
+        productsUrlsRepo = ProductsUrlsRepoMock(productsUrlsRepoPath=urlsPath)
+        sut = AsyncShopRepo(dao=TinyShopDao(path=self.testDBPath))
+        sut.updateFromProductsUrls(productsUrlsRepo=productsUrlsRepo)
+        shops = sut.getAll()
+        shopA = next(s for s in shops if s.url == "https://a.com")
+        shopB = next(s for s in shops if s.url == "https://b.com")
+
+        def getPersistedUrls():
+            return sorted((s.url, sorted(p.url for p in s.products)) for s in sut.getAll())
+
+        async def runner():
+            # When
+            urlsPath.write_text("https://a.com/1\nhttps://a.com/3\nhttps://b.com/1\n"
+                                "https://c.com/1\n")
+            with mock.patch.object(ShopRepo, "setAll") as setAll:
+                updatedShops, plan = await sut.reloadFromProductsUrls(shops, productsUrlsRepo)
+
+            # Then
+            setAll.assert_not_called()
+            self.assertListEqual(shops + plan.addShops, updatedShops)
+            self.assertListEqual(["https://a.com/1", "https://a.com/3"],
+                                 [p.url for p in shopA.products])
+            self.assertListEqual(
+                [("https://a.com", ["https://a.com/1", "https://a.com/3"]),
+                 ("https://b.com", ["https://b.com/1"]),
+                 ("https://c.com", ["https://c.com/1"])],
+                getPersistedUrls())
+
+            # When
+            urlsPath.write_text("https://a.com/1\nhttps://a.com/3\n")
+            updatedShops, plan = await sut.reloadFromProductsUrls(updatedShops, productsUrlsRepo)
+            shopB.name = "Changed name of removed shop"
+            sut.scheduleUpdate(shop=shopB)
+            await sut.close()
+
+            # Then
+            self.assertListEqual([shopA], updatedShops)
+            self.assertListEqual([("https://a.com", ["https://a.com/1", "https://a.com/3"])],
+                                 getPersistedUrls())
+
+        asyncio.run(runner())
+
+    def test_reloadFromProductsUrls_shouldKeepChangesMadeDuringWrite(self):
+        # Given
+        tempDir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempDir.cleanup)
+        urlsPath = Path(tempDir.name, "ProductsURLs.txt")
+        urlsPath.write_text("https://a.com/1\nhttps://b.com/1\n")
+        productsUrlsRepo = ProductsUrlsRepoMock(productsUrlsRepoPath=urlsPath)
+        sut = AsyncShopRepo(dao=TinyShopDao(path=self.testDBPath))
+        sut.updateFromProductsUrls(productsUrlsRepo=productsUrlsRepo)
+        shops = sut.getAll()
+        product = next(s for s in shops if s.url == "https://a.com").products[0]
+        originalSaveAll = TinyShopDao.saveAll
+
+        # A scraper changes a product, which is unchanged and so shared with the snapshot,
+        # while the snapshots get written.
+        def saveAll(dao, data):
+            product.basePrice = 20.5
+            originalSaveAll(dao, data=data)
+
+        async def runner():
+            # When: A shop is removed, so all shops get rewritten
+            urlsPath.write_text("https://a.com/1\n")
+            with mock.patch.object(TinyShopDao, "saveAll", autospec=True, side_effect=saveAll):
+                updatedShops, _ = await sut.reloadFromProductsUrls(shops, productsUrlsRepo)
+
+            # Then
+            self.assertEqual({"basePrice": None}, product.changedFields)
+            shopA = next(s for s in updatedShops if s.url == "https://a.com")
+            sut.scheduleUpdate(shop=shopA)
+            await sut.close()
+            return shopA
+
+        shopA = asyncio.run(runner())
+
+        # Then
+        self.assertFalse(product.isChanged)
+        self.assertEqual(20.5, sut.findByUID(shopA.uid).products[0].basePrice)
+
+    def test_flush_shouldWriteChangesMadeDuringWriteWithNextFlush(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        sut = AsyncShopRepo(dao=TinyShopDao(path=self.testDBPath))
+        sut.setAll(shops=fixture.shops)
+        product = fixture.shops[0].products[0]
+
+        async def runner():
+            product.basePrice = 10.5
+            sut.scheduleUpdate(shop=fixture.shops[0])
+            future = sut.flush()  # fire and forget
+            product.basePrice = 20.5
+            sut.scheduleUpdate(shop=fixture.shops[0])
+            await sut.close()
+            return future
+
+        # When
+        future = asyncio.run(runner())
+
+        # Then
+        self.assertTrue(future.done())
+        self.assertEqual(20.5, sut.findByUID(fixture.shops[0].uid).products[0].basePrice)
+
+    def test_flush_shouldInspectChangedProductsOnlyOnEventLoop(self):
+        # Given
+        daoMock = mock.MagicMock()
+        sut = AsyncShopRepo(dao=daoMock)
+        shop = Shop(products=[Product(url=f"https://shop.com/p/{i}") for i in range(1000)])
+        shop.commitChanges()
+        changedProduct = shop.products[500]
+        loopThread = threading.current_thread()
+        inspectedOnLoop = list()
+        isChanged = ChangeTrackable.isChanged
+
+        def countingIsChanged(product):
+            if threading.current_thread() is loopThread:
+                inspectedOnLoop.append(product)
+            return isChanged.fget(product)
+
+        async def runner():
+            changedProduct.basePrice = 10.5
+            sut.scheduleUpdate(shop=shop)
+            with mock.patch.object(Product, "isChanged", property(countingIsChanged)):
+                await sut.flush()
+            await sut.close()
+
+        # When
+        asyncio.run(runner())
+
+        # Then
+        self.assertFalse(shop.isChanged)
+        self.assertTrue(all(p is changedProduct for p in inspectedOnLoop))
+        written = daoMock.__enter__.return_value.update.call_args.kwargs["data"]
+        self.assertListEqual([10.5], [p.basePrice for p in written.getChangedProducts()])
+
+    def test_flush_shouldWriteCompleteShopAfterFailedWrite(self):
+        # Given
+        daoMock = mock.MagicMock()
+        daoMock.__enter__.return_value.update.side_effect = [IOError("Disk full"), None]
+        sut = AsyncShopRepo(dao=daoMock)
+        shop = Shop(name="Shop")
+        shop.commitChanges()
+
+        async def runner():
+            shop.name = "Changed shop name"
+            sut.scheduleUpdate(shop=shop)
+            with self.assertRaises(IOError):
+                await sut.flush()
+
+            # Failed shop stays pending without being scheduled again.
+            await sut.close()
+
+        # When
+        asyncio.run(runner())
+
+        # Then
+        updateCalls = daoMock.__enter__.return_value.update.call_args_list
+        self.assertEqual(2, len(updateCalls))
+        self.assertTrue(updateCalls[0].kwargs["changesOnly"])
+        self.assertFalse(updateCalls[1].kwargs["changesOnly"])
+        self.assertEqual("Changed shop name", updateCalls[1].kwargs["data"].name)
+
+    def test_flush_shouldRecordChangesOfFailedWriteInHistoryWithRetry(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        daoMock = mock.MagicMock()
+        daoMock.__enter__.return_value.update.side_effect = [IOError("Disk full"), None]
+        history = mock.Mock(spec_set=ProductHistory)
+        sut = AsyncShopRepo(dao=daoMock, history=history)
+        shop = fixture.shops[0]
+        shop.commitChanges()
+        changedProduct = shop.products[1]
+
+        async def runner():
+            changedProduct.basePrice = 12.5
+            sut.scheduleUpdate(shop=shop)
+            with self.assertRaises(IOError):
+                await sut.flush()
+            history.record.assert_not_called()
+
+            # Shop has been committed with the failed write, the retry writes it completely.
+            await sut.close()
+
+        # When
+        asyncio.run(runner())
+
+        # Then
+        history.record.assert_called_once()
+        recordedProducts = history.record.call_args.args[0]
+        self.assertListEqual([changedProduct.uid], [p.uid for p in recordedProducts])
+        self.assertEqual(12.5, recordedProducts[0].basePrice)
+
+    def test_flush_shouldCancelWaitersWhenActorGetsCancelledWhileWriting(self):
+        # Given
+        writeStarted = threading.Event()
+        releaseWrite = threading.Event()
+
+        def update(**kwargs):
+            writeStarted.set()
+            releaseWrite.wait(5)
+
+        daoMock = mock.MagicMock()
+        daoMock.__enter__.return_value.update.side_effect = update
+        sut = AsyncShopRepo(dao=daoMock)
+        shop = Shop(name="Shop")
+        shop.commitChanges()
+
+        async def runner():
+            shop.name = "Changed shop name"
+            sut.scheduleUpdate(shop=shop)
+            flushed = sut.flush()
+            await asyncio.get_running_loop().run_in_executor(None, writeStarted.wait, 5)
+
+            # When
+            sut._actor.cancel()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+            # Then
+            self.assertTrue(flushed.cancelled())
+            releaseWrite.set()
+            await sut.close()
+
+        asyncio.run(runner())
+
+    def test_flush_shouldMergeUpdatesOfSameShopWhileWriting(self):
+        # Given
+        daoMock = mock.MagicMock()
+        sut = AsyncShopRepo(dao=daoMock)
+        shop01, shop02 = Shop(name="Shop 01"), Shop(name="Shop 02")
+
+        async def runner():
+            shop01.name = "Changed shop 01"
+            sut.scheduleUpdate(shop=shop01)
+            firstFlush = sut.flush()
+            # Let the actor dispatch the first write, then send while it's being written.
+            await asyncio.sleep(0)
+            for i in range(3):
+                shop01.name = f"Changed shop 01, {i}"
+                shop02.name = f"Changed shop 02, {i}"
+                sut.scheduleUpdate(shop=shop01)
+                sut.scheduleUpdate(shop=shop02)
+                sut.flush()
+
+            self.assertEqual(9, sut.queueDepth)
+            await firstFlush
+            await sut.close()
+
+        # When
+        asyncio.run(runner())
+
+        # Then
+        updateCalls = daoMock.__enter__.return_value.update.call_args_list
+        self.assertEqual(3, len(updateCalls))
+        self.assertEqual("Changed shop 01", updateCalls[0].kwargs["data"].name)
+        self.assertEqual("Changed shop 01, 2", updateCalls[1].kwargs["data"].name)
+        self.assertEqual("Changed shop 02, 2", updateCalls[2].kwargs["data"].name)
+        self.assertEqual(7, sut.stats.receivedUpdates)
+        self.assertEqual(3, sut.stats.writtenShops)
+        self.assertEqual(2, sut.stats.writeBatches)
+        self.assertEqual(9, sut.stats.maxQueueDepth)
+        self.assertAlmostEqual(4 / 7, sut.stats.mergeRatio)
+        self.assertFalse(sut.hasPendingUpdates)
@@ -0,0 +1,70 @@
+# unit.test_storage.test_fileWatcher.py
+import os
+import tempfile
+from pathlib import Path
+
+from storage.fileWatcher import FileWatcher
+from unit.testhelper import WebtomatorTestCase
+
+
+class FileWatcherTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tempDir.name, "Watched.txt")
+        self.path.write_text("first")
+
+    def tearDown(self) -> None:
+        self.tempDir.cleanup()
+
+    def _touch(self, text: str) -> None:
+        # Some file systems have a coarse mtime resolution, so make sure it differs.
+        stat = self.path.stat() if self.path.is_file() else None
+        self.path.write_text(text)
+        if stat:
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+    def test_hasChanged_shouldReportSettledChangeOnce(self):
+        # Given
+        sut = FileWatcher(self.path)
+        self.assertFalse(sut.hasChanged())
+
+        # When
+        self._touch("second")
+
+        # Then
+        self.assertFalse(sut.hasChanged())  # Not settled yet
+        self.assertTrue(sut.hasChanged())
+        self.assertFalse(sut.hasChanged())
+
+    def test_hasChanged_shouldWaitUntilFileIsNotWrittenAnymore(self):
+        # Given
+        sut = FileWatcher(self.path)
+
+        # When
+        self._touch("second")
+        self.assertFalse(sut.hasChanged())
+        self._touch("second, third")
+
+        # Then
+        self.assertFalse(sut.hasChanged())
+        self.assertTrue(sut.hasChanged())
+
+    def test_hasChanged_shouldReportCreatedAndDeletedFile(self):
+        # Given
+        self.path.unlink()
+        sut = FileWatcher(self.path)
+
+        # When
+        self._touch("created")
+
+        # Then
+        sut.hasChanged()
+        self.assertTrue(sut.hasChanged())
+
+        # When
+        self.path.unlink()
+
+        # Then
+        sut.hasChanged()
+        self.assertTrue(sut.hasChanged())
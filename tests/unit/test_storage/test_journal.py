@@ -0,0 +1,91 @@
+# unit.test_storage.test_journal.py
+import tempfile
+from pathlib import Path
+
+from storage.journal import JsonlJournal
+from unit.testhelper import WebtomatorTestCase
+
+
+class JsonlJournalTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.journalPath = Path(self.tempDir.name, "Test.journal.jsonl")
+
+    def tearDown(self) -> None:
+        self.tempDir.cleanup()
+
+    def test_append_read(self):
+        # Given
+        sut = JsonlJournal(self.journalPath)
+        records = [{"op": "a", "value": 1}, {"op": "b", "value": [1, 2]}]
+
+        # When
+        sut.append(records[:1])
+        sut.append(records[1:])
+
+        # Then
+        self.assertListEqual(records, list(sut.read()))
+        self.assertEqual(2, len(self.journalPath.read_text().splitlines()))
+
+    def test_read_shouldSkipInvalidLines(self):
+        # Given
+        sut = JsonlJournal(self.journalPath)
+        sut.append([{"op": "a"}])
+        with open(self.journalPath, "a", encoding="utf-8") as file:
+            file.write('{"op": "cut by a cra')
+
+        # When
+        records = list(sut.read())
+
+        # Then
+        self.assertListEqual([{"op": "a"}], records)
+
+    def test_rotate_shouldMoveRecordsAside(self):
+        # Given
+        sut = JsonlJournal(self.journalPath)
+        sut.append([{"op": "a"}])
+
+        # When
+        sut.rotate()
+        sut.append([{"op": "b"}])
+
+        # Then
+        self.assertTrue(sut.rotatedPath.is_file())
+        self.assertListEqual([{"op": "a"}, {"op": "b"}], list(sut.read()))
+
+        # When
+        sut.discardRotated()
+
+        # Then
+        self.assertListEqual([{"op": "b"}], list(sut.read()))
+
+    def test_rotate_shouldAppendToRemainingRotatedRecords(self):
+        # Given
+        sut = JsonlJournal(self.journalPath)
+        sut.append([{"op": "a"}])
+        sut.rotate()
+        with open(sut.rotatedPath, "a", encoding="utf-8") as file:
+            file.write('{"op": "cut')
+        sut.append([{"op": "b"}])
+
+        # When
+        sut.rotate()
+
+        # Then
+        self.assertFalse(self.journalPath.exists())
+        self.assertListEqual([{"op": "a"}, {"op": "b"}], list(sut.read()))
+
+    def test_clear(self):
+        # Given
+        sut = JsonlJournal(self.journalPath)
+        sut.append([{"op": "a"}])
+        sut.rotate()
+        sut.append([{"op": "b"}])
+
+        # When
+        sut.clear()
+
+        # Then
+        self.assertEqual(0, sut.size)
+        self.assertListEqual(list(), list(sut.read()))
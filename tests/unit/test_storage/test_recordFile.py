@@ -0,0 +1,69 @@
+# unit.test_storage.test_recordFile.py
+import tempfile
+from pathlib import Path
+
+from storage.recordFile import FixedRecordFile
+from unit.testhelper import WebtomatorTestCase
+
+
+class FixedRecordFileTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tempDir.name, "records.bin")
+
+    def tearDown(self) -> None:
+        self.tempDir.cleanup()
+
+    def test_append_iterRecords(self):
+        # Given
+        sut = FixedRecordFile(self.path, "<IIi", baseStamp=1600000000)
+        records = [(1, 10, -5), (2, 20, 1999), (1, 30, 0)]
+
+        # When
+        sut.append(records[:2])
+        sut.append(records[2:])
+
+        # Then
+        self.assertEqual(3, sut.count)
+        self.assertListEqual(records, list(sut.iterRecords()))
+        self.assertListEqual(list(reversed(records)), list(sut.iterRecords(reverse=True)))
+
+    def test_init_shouldKeepBaseStampOfExistingFile(self):
+        # Given
+        FixedRecordFile(self.path, "<IIi", baseStamp=1600000000).append([(1, 2, 3)])
+
+        # When
+        sut = FixedRecordFile(self.path, "<IIi", baseStamp=1700000000)
+
+        # Then
+        self.assertEqual(1600000000, sut.baseStamp)
+
+    def test_init_shouldRaiseOnOtherRecordFormat(self):
+        # Given
+        FixedRecordFile(self.path, "<IIi").append([(1, 2, 3)])
+
+        # When / Then
+        with self.assertRaises(ValueError):
+            FixedRecordFile(self.path, "<IIQ")
+
+    def test_append_shouldDropIncompleteLastRecord(self):
+        # Given
+        sut = FixedRecordFile(self.path, "<IIi")
+        sut.append([(1, 2, 3)])
+        with open(self.path, "ab") as file:
+            file.write(b"\x01\x02")  # Simulates a crash while writing
+
+        # When
+        sut.append([(4, 5, 6)])
+
+        # Then
+        self.assertListEqual([(1, 2, 3), (4, 5, 6)], list(sut.iterRecords()))
+
+    def test_iterRecords_shouldYieldNothingWhenFileNotExists(self):
+        # Given
+        sut = FixedRecordFile(self.path, "<IIi")
+
+        # Then
+        self.assertEqual(0, sut.count)
+        self.assertListEqual(list(), list(sut.iterRecords()))
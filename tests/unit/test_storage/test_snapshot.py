@@ -0,0 +1,97 @@
+# unit.test_storage.test_snapshot.py
+import os
+import tempfile
+from pathlib import Path
+
+from fixtures.shop import ShopFixture
+from storage.snapshot import PickleSnapshot
+from unit.testhelper import WebtomatorTestCase
+
+
+class PickleSnapshotTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.snapshotPath = Path(self.tempDir.name, "Test.snapshot")
+        self.sourcePath = Path(self.tempDir.name, "Source.json")
+        self.sourcePath.write_text("{}")
+
+    def tearDown(self) -> None:
+        self.tempDir.cleanup()
+
+    def test_save_load_shouldRestoreShops(self):
+        # Given
+        fixture = ShopFixture()
+        fixture.create2Shops()
+        for shop in fixture.shops:
+            shop.commitChanges()
+        sut = PickleSnapshot(self.snapshotPath, sourcePaths=[self.sourcePath])
+
+        # When
+        sut.save(fixture.shops)
+        shops = sut.load()
+
+        # Then
+        self.assertListEqual(fixture.shops, shops)
+        self.assertEqual(fixture.shops[0].uid, shops[0].uid)
+        self.assertFalse(shops[0].isChanged)
+
+    def test_load_shouldReturnNoneIfSourceChanged(self):
+        # Given
+        sut = PickleSnapshot(self.snapshotPath, sourcePaths=[self.sourcePath])
+        sut.save(["data"])
+
+        # When
+        stat = self.sourcePath.stat()
+        os.utime(self.sourcePath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+        # Then
+        self.assertIsNone(sut.load())
+
+    def test_load_shouldReturnNoneIfSourceCreated(self):
+        # Given
+        missingPath = Path(self.tempDir.name, "Source.json-wal")
+        sut = PickleSnapshot(self.snapshotPath, sourcePaths=[self.sourcePath, missingPath])
+        sut.save(["data"])
+        self.assertListEqual(["data"], sut.load())
+
+        # When
+        missingPath.write_text("")
+
+        # Then
+        self.assertIsNone(sut.load())
+
+    def test_load_shouldReturnNoneIfFileInSourceDirectoryChanged(self):
+        # Given
+        sourceDir = Path(self.tempDir.name, "Shops")
+        sourceDir.mkdir()
+        shardPath = sourceDir / "shop.json"
+        shardPath.write_text("{}")
+        sut = PickleSnapshot(self.snapshotPath, sourcePaths=[sourceDir])
+        sut.save(["data"])
+
+        # When
+        shardPath.write_text('{"Shops": {}}')
+
+        # Then
+        self.assertIsNone(sut.load())
+
+    def test_load_shouldReturnNoneOnOtherVersion(self):
+        # Given
+        sut = PickleSnapshot(self.snapshotPath, sourcePaths=[self.sourcePath])
+        sut.save(["data"])
+
+        # When
+        sut.VERSION = PickleSnapshot.VERSION + 1
+
+        # Then
+        self.assertIsNone(sut.load())
+
+    def test_load_shouldReturnNoneOnInvalidFile(self):
+        # Given
+        sut = PickleSnapshot(self.snapshotPath, sourcePaths=[self.sourcePath])
+        self.snapshotPath.write_bytes(b"WTSN\x01\x00cut")
+
+        # When / Then
+        self.assertIsNone(sut.load())
+        self.assertIsNone(PickleSnapshot(Path(self.tempDir.name, "Missing"), []).load())
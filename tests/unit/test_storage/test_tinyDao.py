@@ -2,6 +2,7 @@
 import os
 import pathlib as pl
 from stat import S_IREAD, S_IWUSR
+from unittest import mock
 from unittest.mock import Mock
 
 import tinydb as tdb
@@ -76,6 +77,111 @@ class TinyConnectionTest(WebtomatorTestCase):
         self.assertFalse(tinyReferenceBeforeClosing._opened)
 
 
+class TinyConnectionPersistentModeTest(WebtomatorTestCase):
+
+    def setUp(self) -> None:
+        self.dbFixture = TinyDBFixture()
+        self.dbFixture.createTinyTestDB()
+        self.dbFixture.closeTinyTestDB()
+        TinyConnection.enablePersistentMode(writeCacheSize=100, flushIntervalScnds=3600)
+
+    def tearDown(self) -> None:
+        TinyConnection.disablePersistentMode()
+        self.dbFixture.connectTinyTestDB()
+        self.dbFixture.deleteTinyTestDB()
+        del self.dbFixture
+
+    def _readFile(self) -> dict:
+        with tdb.TinyDB(str(self.dbFixture.TINYDB_TEST_PATH)) as db:
+            return db.storage.read()
+
+    def test_open_shouldShareOneDatabasePerPath(self):
+        # Given
+        path = self.dbFixture.TINYDB_TEST_PATH
+        sut1 = TinyConnection(path)
+        sut2 = TinyConnection(path)
+
+        # When
+        sut1.open()
+        sut2.open()
+
+        # Then
+        self.assertIs(sut1.db, sut2.db)
+        sut1.close()
+        sut2.close()
+
+    def test_close_shouldKeepSharedDatabaseOpen(self):
+        # Given
+        sut = TinyConnection(self.dbFixture.TINYDB_TEST_PATH)
+        sut.open()
+        sharedDB = sut.db
+
+        # When
+        sut.close()
+
+        # Then
+        self.assertIsNone(sut.db)
+        self.assertTrue(sharedDB._opened)
+
+    def test_writes_shouldBeBufferedUntilFlushed(self):
+        # Given
+        tableName = self.dbFixture.TINYDB_TEST_TABLE_NAME
+        record = {"uid": "e7f1d4a0-persistent-mode-test"}
+
+        # When
+        with TinyDao(path=self.dbFixture.TINYDB_TEST_PATH, table=tableName) as sut:
+            sut.insert(data=record)
+
+        # Then
+        self.assertNotIn(record, self._readFile()[tableName].values())
+
+        # When
+        TinyConnection.flushShared()
+
+        # Then
+        self.assertIn(record, self._readFile()[tableName].values())
+
+    def test_close_shouldFlushWhenIntervalIsDue(self):
+        # Given
+        TinyConnection.enablePersistentMode(writeCacheSize=100, flushIntervalScnds=0)
+        tableName = self.dbFixture.TINYDB_TEST_TABLE_NAME
+        record = {"uid": "0c7b5e16-persistent-mode-test"}
+
+        # When
+        with TinyDao(path=self.dbFixture.TINYDB_TEST_PATH, table=tableName) as sut:
+            sut.insert(data=record)
+
+        # Then
+        self.assertIn(record, self._readFile()[tableName].values())
+
+    def test_writes_shouldBeFlushedWhenWriteCacheIsFull(self):
+        # Given
+        TinyConnection.enablePersistentMode(writeCacheSize=2, flushIntervalScnds=3600)
+        tableName = self.dbFixture.TINYDB_TEST_TABLE_NAME
+        records = [{"uid": "aa5e-persistent-mode-test"}, {"uid": "bb6f-persistent-mode-test"}]
+
+        # When
+        with TinyDao(path=self.dbFixture.TINYDB_TEST_PATH, table=tableName) as sut:
+            for record in records:
+                sut.insert(data=record)
+
+        # Then
+        for record in records:
+            self.assertIn(record, self._readFile()[tableName].values())
+
+    def test_closeShared_shouldWriteBufferedData(self):
+        # Given
+        tableName = self.dbFixture.TINYDB_TEST_TABLE_NAME
+        with TinyDao(path=self.dbFixture.TINYDB_TEST_PATH, table=tableName) as sut:
+            sut.deleteAll()
+
+        # When
+        TinyConnection.closeShared()
+
+        # Then
+        self.assertEqual(dict(), self._readFile()[tableName])
+
+
 class TinyDaoTest(WebtomatorTestCase):
 
     def setUp(self) -> None:
@@ -369,6 +475,72 @@ class TinyDaoTest(WebtomatorTestCase):
             with self.assertRaises(LookupError):
                 sut.update(data=recordWithDupUID)
 
+    def test_update_shouldNotQueryDocuments(self):
+        # Given
+        fullPath = self.dbFixture.TINYDB_TEST_PATH
+        tableName = self.dbFixture.TINYDB_TEST_TABLE_NAME
+        self.dbFixture.closeTinyTestDB()
+        documents = [{'uid': 'bcc013d4-d7f0-4255-9aa4-4790b08e2c13', 'key_01': 'update 1'},
+                     {'uid': '0a94dd8b-ec1a-4610-9cd3-daa7a9c1afcb', 'key_01': 'update 2'}]
+
+        # When
+        with TinyDao(path=fullPath, table=tableName) as sut:
+            with mock.patch.object(tdb.database.Table, "search") as search:
+                for document in documents:
+                    sut.update(data=document)
+
+        # Then
+        search.assert_not_called()
+        with TinyDao(path=fullPath, table=tableName) as sut:
+            for document in documents:
+                foundDocument = sut._findByField("uid", document["uid"])[0]
+                self.assertEqual(document["key_01"], foundDocument.get("key_01"))
+
+    def test_findByField(self):
+        # Given
+        fullPath = self.dbFixture.TINYDB_TEST_PATH
+        tableName = self.dbFixture.TINYDB_TEST_TABLE_NAME
+        self.dbFixture.closeTinyTestDB()
+
+        # When
+        with TinyDao(path=fullPath, table=tableName) as sut:
+            foundDocuments = sut._findByField("key_02", "record_02_value_for_key_02")
+            notFoundDocuments = sut._findByField("key_02", "not existing")
+
+        # Then
+        self.assertEqual(1, len(foundDocuments))
+        self.assertEqual("bcc013d4-d7f0-4255-9aa4-4790b08e2c13", foundDocuments[0].get("uid"))
+        self.assertListEqual(list(), notFoundDocuments)
+
+    def test_findByField_shouldReflectWrites(self):
+        # Given
+        fullPath = self.dbFixture.TINYDB_TEST_PATH
+        tableName = self.dbFixture.TINYDB_TEST_TABLE_NAME
+        self.dbFixture.closeTinyTestDB()
+        newDocument = {'uid': '5d8c9b53-a4d1-4bb5-8bd4-3e9b1d3a62f1', 'key_02': 'new'}
+
+        with TinyDao(path=fullPath, table=tableName) as sut:
+            # Build indexes
+            sut._findByField("uid", "")
+            sut._findByField("key_02", "")
+
+            # When / Then
+            sut.insert(data=newDocument)
+            self.assertEqual([newDocument], sut._findByField("uid", newDocument["uid"]))
+
+            # When / Then
+            sut.update(data={'uid': newDocument["uid"], 'key_02': 'updated'})
+            self.assertListEqual(list(), sut._findByField("key_02", "new"))
+            self.assertEqual(newDocument["uid"], sut._findByField("key_02", "updated")[0]["uid"])
+
+            # When / Then
+            sut.saveAll(data=[newDocument])
+            self.assertEqual([newDocument], sut._findByField("key_02", "new"))
+
+            # When / Then
+            sut.deleteAll()
+            self.assertListEqual(list(), sut._findByField("uid", newDocument["uid"]))
+
     def test_find(self):
         # Given
         fullPath = self.dbFixture.TINYDB_TEST_PATH
@@ -0,0 +1,350 @@
+# cluster.coordinator.py
+import asyncio
+import bisect
+import hashlib
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import debug.logger as clog
+from shop.productsUrlsRepo import ProductsUrlsRepo
+from shop.shopDao import JournaledShopDao
+from shop.shopRepo import AsyncShopRepo, ProductsUrlsPlan
+
+logger = clog.getLogger(__name__)
+
+_MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+_REMOTE_ERRORS = (ConnectionError, LookupError, PermissionError, ValueError)
+""" Error types which are passed on to the client as they are. """
+
+
+def splitAddress(address: str) -> Tuple[str, Optional[int]]:
+    """ Split the address of a coordinator.
+
+    :param address: 'host:port' for TCP or 'unix:/path/to/socket' for a Unix socket
+    :return: (host, port) for TCP or (path, None) for a Unix socket
+    :raises ValueError: On invalid addresses
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:"):], None
+
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid coordinator address '{address}'. Expected 'host:port' "
+                         f"or 'unix:/path/to/socket'.")
+    return host, int(port)
+
+
+def encodeMessage(message: dict) -> bytes:
+    """ Messages are JSON objects, one per line. """
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def encodeError(error: Exception) -> dict:
+    errorType = type(error) if isinstance(error, _REMOTE_ERRORS) else RuntimeError
+    return dict(error=str(error), errorType=errorType.__name__)
+
+
+def decodeError(message: dict) -> Exception:
+    errorTypes = {errorType.__name__: errorType for errorType in _REMOTE_ERRORS}
+    return errorTypes.get(message.get("errorType"), RuntimeError)(message["error"])
+
+
+class HashRing:
+    """ Consistent hashing of keys to nodes. Each node is placed on a ring of hash values
+    at many points (replicas). A key belongs to the node of the next point clockwise from
+    the key's hash. When a node joins or leaves, only the keys next to its points move,
+    which are about 1/n of all keys. """
+
+    def __init__(self, nodeIDs: Iterable[str] = (), replicas: int = 100):
+        self.__replicas = replicas
+        self.__points: List[int] = list()
+        self.__pointNodes: List[str] = list()
+        self.__nodeIDs: Set[str] = set()
+        for nodeID in nodeIDs:
+            self.add(nodeID)
+
+    @property
+    def nodeIDs(self) -> Set[str]:
+        return set(self.__nodeIDs)
+
+    def add(self, nodeID: str) -> None:
+        if nodeID in self.__nodeIDs: return
+
+        self.__nodeIDs.add(nodeID)
+        for replica in range(self.__replicas):
+            point = self._hash(f"{nodeID}#{replica}")
+            index = bisect.bisect(self.__points, point)
+            self.__points.insert(index, point)
+            self.__pointNodes.insert(index, nodeID)
+
+    def remove(self, nodeID: str) -> None:
+        if nodeID not in self.__nodeIDs: return
+
+        self.__nodeIDs.discard(nodeID)
+        points = [(p, n) for p, n in zip(self.__points, self.__pointNodes) if n != nodeID]
+        self.__points = [p for p, _ in points]
+        self.__pointNodes = [n for _, n in points]
+
+    def getNode(self, key: str) -> Optional[str]:
+        """ The node which the given key belongs to, or None if the ring is empty. """
+        if not self.__points: return None
+
+        index = bisect.bisect(self.__points, self._hash(key)) % len(self.__points)
+        return self.__pointNodes[index]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        # Stable across processes and hosts, unlike hash().
+        return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(),
+                              "big")
+
+
+class Coordinator:
+    """ Holds the authoritative shop list of a cluster and leases shops to worker nodes.
+
+    Nodes send a heartbeat with the shops they are running (holding). The reply lists the
+    shops they should run: Those which the hash ring maps to the node and which no other
+    node holds. So a shop moves to another node only after its former node reported that
+    it released the shop, or after the former node's lease expired. A lease expires when
+    a node did not send a heartbeat for `leaseScnds`.
+
+    Nodes write shop changes through the coordinator as journal records (see
+    `JournaledShopDao.getUpdateRecords`), which are accepted from the node holding the
+    shop only. All writes run on the shop repository's writer thread.
+
+    The protocol: One JSON object per line, in both directions. Requests have an 'op' and
+    a 'node' (ID of the sending node). Replies have an 'error' on failure.
+        heartbeat (holding: [shop UIDs]) -> shops: [shop UIDs], leaseScnds
+        getShops (shops: [shop UIDs]) -> shops: [encoded shops], of held shops only
+        write (records: [journal records]) -> {}
+        leave () -> {}, after the node wrote all its changes
+    """
+
+    def __init__(self, shopRepo: AsyncShopRepo, journalDao: JournaledShopDao,
+                 leaseScnds: float = 15.0):
+        """ Constructor
+
+        :param shopRepo: Repository of the shops, which writes through `journalDao`
+        :param journalDao: The DAO of `shopRepo`
+        :param leaseScnds: Max. seconds between two heartbeats of a node
+        """
+        self._shopRepo = shopRepo
+        self._journalDao = journalDao
+        self._leaseScnds = leaseScnds
+        self._ring = HashRing()
+        self._shopUIDs: List[str] = list()
+        self._shopUIDSet: Set[str] = set()
+        self._leaseStamps: Dict[str, float] = dict()
+        """ Monotonic stamps of the last heartbeat by node ID. """
+        self._holders: Dict[str, str] = dict()
+        """ Node IDs by UID of the shops they hold. """
+        self._isPaused = False
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def nodeIDs(self) -> Set[str]:
+        return self._ring.nodeIDs
+
+    @property
+    def holders(self) -> Dict[str, str]:
+        """ Node IDs by UID of the shops they hold. """
+        return dict(self._holders)
+
+    def setShopUIDs(self, uids: Iterable[str]) -> None:
+        """ Set the shops to distribute. Leases of shops which are not in the list anymore
+        end right away.
+
+        :param uids: UIDs of all shops
+        :return: None
+        """
+        self._shopUIDs = list(uids)
+        self._shopUIDSet = set(self._shopUIDs)
+        for uid in [uid for uid in self._holders if uid not in self._shopUIDSet]:
+            del self._holders[uid]
+
+    async def start(self, address: str) -> None:
+        """ Start listening for nodes.
+
+        :param address: See `splitAddress`
+        :return: None
+        :raises: On invalid addresses or if the address is in use
+        """
+        host, port = splitAddress(address)  # raises
+        if port is None:
+            self._server = await asyncio.start_unix_server(
+                self._handleConnection, path=host, limit=_MAX_MESSAGE_BYTES)
+        else:
+            self._server = await asyncio.start_server(
+                self._handleConnection, host=host, port=port, limit=_MAX_MESSAGE_BYTES)
+        logger.info("Coordinator listening on %s with %d shops.", address, len(self._shopUIDs))
+
+    async def close(self) -> None:
+        """ Stop listening and close all connections.
+
+        :return: None
+        """
+        if self._server:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def reloadFromProductsUrls(self, productsUrlsRepo: ProductsUrlsRepo
+                                     ) -> ProductsUrlsPlan:
+        """ Update the shops from the ProductsUrls repository. Nodes keep their copies of
+        the shops they hold, so all shops get taken back from the nodes first: No shop gets
+        leased until the update is done. Waits at most until all leases expired.
+
+        :param productsUrlsRepo: Repository of the product URLs to be scraped
+        :return: The applied plan
+        :raises: On errors while reading product URLs or writing shops
+        """
+        self._isPaused = True
+        try:
+            while self._holders:
+                await asyncio.sleep(0.2)
+                self._expireLeases()
+
+            shops = await self._shopRepo.runExclusive(self._shopRepo.getAll) or list()
+            shops, plan = await self._shopRepo.reloadFromProductsUrls(
+                shops=shops, productsUrlsRepo=productsUrlsRepo)  # raises
+            if not plan.isEmpty:
+                self.setShopUIDs(shop.uid for shop in shops)
+            return plan
+
+        finally:
+            self._isPaused = False
+
+    def heartbeat(self, nodeID: str, holding: Iterable[str]) -> List[str]:
+        """ Renew the lease of a node. A node which is unknown (or whose lease expired)
+        joins the ring.
+
+        :param nodeID: ID of the node
+        :param holding: UIDs of the shops which the node runs or did not finish writing
+        :return: UIDs of the shops which the node should run
+        """
+        self._expireLeases()
+        if nodeID not in self._leaseStamps:
+            self._ring.add(nodeID)
+            logger.info("Node %s joined. Nodes: %d", nodeID, len(self._leaseStamps) + 1)
+        self._leaseStamps[nodeID] = time.monotonic()
+
+        holding = set(holding)
+        for uid, holder in list(self._holders.items()):
+            if holder == nodeID and uid not in holding:
+                del self._holders[uid]
+        for uid in holding & self._shopUIDSet:
+            # Claims of shops without holder, e.g. after a restart of the coordinator.
+            self._holders.setdefault(uid, nodeID)
+
+        if self._isPaused: return list()
+
+        assigned = list()
+        for uid in self._shopUIDs:
+            if self._ring.getNode(uid) != nodeID: continue
+            if self._holders.setdefault(uid, nodeID) == nodeID:
+                assigned.append(uid)
+        return assigned
+
+    def leave(self, nodeID: str) -> None:
+        """ Remove a node and end its leases.
+
+        :param nodeID: ID of the node
+        :return: None
+        """
+        self._removeNode(nodeID)
+        logger.info("Node %s left. Nodes: %d", nodeID, len(self._leaseStamps))
+
+    async def getShops(self, nodeID: str, uids: Iterable[str]) -> List[dict]:
+        """ Load shops which the given node holds.
+
+        :param nodeID: ID of the node
+        :param uids: UIDs of the shops
+        :return: Encoded shops
+        :raises PermissionError: If the node does not hold all of the shops
+        """
+        uids = set(uids)
+        self._raiseIfNotHolder(nodeID, uids)  # raises
+        # Shops are read from the journal, so read along with the writes.
+        shops = await self._shopRepo.runExclusive(self._shopRepo.findByUIDs, uids)  # raises
+        return [shop.toDict() for shop in shops]
+
+    async def write(self, nodeID: str, records: List[dict]) -> None:
+        """ Journal shop changes of a node.
+
+        :param nodeID: ID of the node
+        :param records: Journal records, see `JournaledShopDao.getUpdateRecords`
+        :return: None
+        :raises PermissionError: If the node does not hold all of the changed shops
+        """
+        uids = {JournaledShopDao.getRecordShopUID(record) for record in records}
+        self._raiseIfNotHolder(nodeID, uids)  # raises
+        await self._shopRepo.runExclusive(self._journalDao.appendRecords, records)  # raises
+
+    async def _handleConnection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+
+                try:
+                    reply = await self._handleRequest(json.loads(line))
+                except Exception as e:
+                    if not isinstance(e, _REMOTE_ERRORS):
+                        logger.error("Failed handling request: %s", e, exc_info=True)
+                    reply = encodeError(e)
+
+                writer.write(encodeMessage(reply))
+                await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            logger.debug("Closed node connection: %s", e)
+
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _handleRequest(self, request: dict) -> dict:
+        op = request.get("op")
+        nodeID = request.get("node")
+        if not nodeID:
+            raise ValueError(f"Request without node ID: {op}")
+
+        if op == "heartbeat":
+            shops = self.heartbeat(nodeID, request.get("holding", list()))
+            return dict(shops=shops, leaseScnds=self._leaseScnds)
+        if op == "getShops":
+            return dict(shops=await self.getShops(nodeID, request.get("shops", list())))
+        if op == "write":
+            await self.write(nodeID, request.get("records", list()))
+            return dict()
+        if op == "leave":
+            self.leave(nodeID)
+            return dict()
+
+        raise ValueError(f"Unknown request: {op}")
+
+    def _raiseIfNotHolder(self, nodeID: str, uids: Iterable[str]) -> None:
+        self._expireLeases()
+        notHeld = [uid for uid in uids if self._holders.get(uid) != nodeID]
+        if notHeld:
+            raise PermissionError(f"Node {nodeID} does not hold shops {', '.join(notHeld)}")
+
+    def _expireLeases(self) -> None:
+        deadline = time.monotonic() - self._leaseScnds
+        for nodeID, stamp in list(self._leaseStamps.items()):
+            if stamp < deadline:
+                self._removeNode(nodeID)
+                logger.warning("Lease of node %s expired. Nodes: %d",
+                               nodeID, len(self._leaseStamps))
+
+    def _removeNode(self, nodeID: str) -> None:
+        self._leaseStamps.pop(nodeID, None)
+        self._ring.remove(nodeID)
+        for uid in [uid for uid, holder in self._holders.items() if holder == nodeID]:
+            del self._holders[uid]
@@ -0,0 +1,202 @@
+# cluster.node.py
+import json
+import socket
+import threading
+from typing import Iterable, List, Optional, Union
+
+import debug.logger as clog
+from cluster.coordinator import decodeError, encodeMessage, splitAddress
+from shop.shop import Shop
+from shop.shopDao import JournaledShopDao
+from storage.base import Dao
+
+logger = clog.getLogger(__name__)
+
+
+class CoordinatorClient:
+    """ Blocking client of a `Coordinator`, for a worker node. Keeps one connection, which
+    gets opened again after errors. Thread-safe: Requests get sent one after another. """
+
+    def __init__(self, address: str, nodeID: str, timeoutScnds: float = 30.0):
+        """ Constructor
+
+        :param address: Address of the coordinator, see `splitAddress`
+        :param nodeID: ID of this node, unique within the cluster
+        :param timeoutScnds: Max. seconds to wait for a reply
+        """
+        self.__address = address
+        self.__nodeID = nodeID
+        self.__timeoutScnds = timeoutScnds
+        self.__leaseScnds: Optional[float] = None
+        self.__socket: Optional[socket.socket] = None
+        self.__file = None
+        self.__lock = threading.Lock()
+
+    @property
+    def nodeID(self) -> str:
+        return self.__nodeID
+
+    @property
+    def leaseScnds(self) -> Optional[float]:
+        """ Lease duration, as of the last heartbeat. None before the first heartbeat. """
+        return self.__leaseScnds
+
+    def heartbeat(self, holding: Iterable[str]) -> List[str]:
+        """ Renew the lease of this node, which joins the cluster with its first heartbeat.
+
+        :param holding: UIDs of the shops which this node runs or did not finish writing
+        :return: UIDs of the shops which this node should run
+        :raises: ConnectionError if the coordinator is not reachable
+        """
+        reply = self._request(op="heartbeat", holding=list(holding))  # raises
+        self.__leaseScnds = reply["leaseScnds"]
+        return reply["shops"]
+
+    def getShops(self, uids: Iterable[str]) -> List[Shop]:
+        """ Load shops which this node holds.
+
+        :param uids: UIDs of the shops
+        :return: The shops
+        :raises: PermissionError if this node does not hold all of the shops
+        """
+        reply = self._request(op="getShops", shops=list(uids))  # raises
+        return [Shop.fromDict(shopItem) for shopItem in reply["shops"]]
+
+    def write(self, records: List[dict]) -> None:
+        """ Write shop changes.
+
+        :param records: Journal records, see `JournaledShopDao.getUpdateRecords`
+        :return: None
+        :raises: PermissionError if this node does not hold all of the changed shops
+        """
+        self._request(op="write", records=records)  # raises
+
+    def leave(self) -> None:
+        """ Leave the cluster, so other nodes take over the shops of this node right away.
+        Write all changes before.
+
+        :return: None
+        """
+        self._request(op="leave")  # raises
+
+    def close(self) -> None:
+        with self.__lock:
+            self._disconnect()
+
+    def _request(self, op: str, **kwargs) -> dict:
+        with self.__lock:
+            try:
+                if self.__socket is None:
+                    self._connect()
+                self.__socket.sendall(encodeMessage(dict(op=op, node=self.__nodeID, **kwargs)))
+                line = self.__file.readline()
+                if not line:
+                    raise ConnectionError("Coordinator closed the connection.")
+
+            except OSError as e:
+                self._disconnect()
+                raise ConnectionError(f"Request '{op}' to coordinator {self.__address} "
+                                      f"failed: {e}") from e
+
+        reply = json.loads(line)
+        if "error" in reply:
+            raise decodeError(reply)
+        return reply
+
+    def _connect(self) -> None:
+        host, port = splitAddress(self.__address)  # raises
+        if port is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.__timeoutScnds)
+            try:
+                sock.connect(host)
+            except OSError:
+                sock.close()
+                raise
+        else:
+            sock = socket.create_connection((host, port), timeout=self.__timeoutScnds)
+        self.__socket = sock
+        self.__file = sock.makefile("rb")
+
+    def _disconnect(self) -> None:
+        if self.__socket is None: return
+        try:
+            self.__file.close()
+            self.__socket.close()
+        finally:
+            self.__socket = None
+            self.__file = None
+
+
+class CoordinatorShopDao(Dao):
+    """ Shop DAO of a worker node: Reads and writes the shops which this node holds through
+    the coordinator. Writes send journal records, so only changes get transferred.
+    The coordinator owns all other shops, so operations on all shops or on new shops raise
+    PermissionError, like operations on shops which this node does not hold. """
+
+    def __init__(self, client: CoordinatorClient):
+        self._client = client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def loadAll(self) -> List[Shop]:
+        """ :raises: PermissionError, see class description """
+        raise self._refuse("load all Shops")
+
+    def saveAll(self, data: List[Shop]) -> None:
+        """ :raises: PermissionError, see class description """
+        raise self._refuse("save all Shops")
+
+    def deleteAll(self) -> None:
+        """ :raises: PermissionError, see class description """
+        raise self._refuse("delete all Shops")
+
+    def insert(self, data: Shop) -> None:
+        """ :raises: PermissionError, see class description """
+        raise self._refuse("insert Shop")
+
+    def update(self, data: Shop, changesOnly: bool = False) -> None:
+        """ Writes the given Shop through the coordinator.
+
+        :param data: Shop object, held by this node
+        :param changesOnly: See `JournaledShopDao.update`
+        :return: None
+        :raises: PermissionError if this node does not hold the shop
+        """
+        if not isinstance(data, Shop):
+            raise TypeError("Could not update Shop. Argument 'data' must be of type 'Shop'.")
+
+        if changesOnly and not data.isChanged:
+            logger.debug("Shop has no changes, skipping update. %s", data.url)
+            return
+
+        self._client.write(JournaledShopDao.getUpdateRecords(data, changesOnly))  # raises
+
+    def _refuse(self, operation: str) -> PermissionError:
+        return PermissionError(f"Could not {operation}. Node {self._client.nodeID} accesses "
+                               "only the shops which it holds, the coordinator owns all others.")
+
+    def find(self, **kwargs) -> Union[Shop, List[Shop]]:
+        """ Find shops which this node holds.
+
+        :param kwargs: 'uid': Find a Shop by its UID.
+                       'uids': Find Shops by their UIDs.
+        :return: A Shop, or a Shop list - depends on kwargs
+        :raises: If no shops were found, or if this node does not hold them
+        """
+        if "uid" in kwargs:
+            shops = self._client.getShops([kwargs["uid"]])  # raises
+            if not shops:
+                raise LookupError(f"No shops found with UID {kwargs['uid']}")
+            return shops[0]
+
+        elif "uids" in kwargs:
+            return self._client.getShops(kwargs["uids"])  # raises
+
+        else:
+            raise KeyError(f"Shop search fail. None of the expected arguments were given. "
+                           f"kwargs: {kwargs}")
@@ -0,0 +1,283 @@
+# cluster.supervisor.py
+import heapq
+import multiprocessing as mp
+import queue
+import time
+from dataclasses import dataclass, field
+from multiprocessing.synchronize import Event
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import debug.logger as clog
+from shop.shop import Shop
+from shop.shopRepo import ShopWriteStats
+
+logger = clog.getLogger(__name__)
+
+
+def assignShops(shops: Iterable[Shop], workerCount: int) -> List[List[str]]:
+    """ Distribute shops across workers, so all workers get about the same load.
+
+    The cost of a shop is its count of products, as each product means one request and one
+    parse per iteration. Shops get assigned greedily, most expensive first, each to the
+    worker with the lowest cost so far. The result is the same for the same shops.
+
+    :param shops: Shops to distribute
+    :param workerCount: Max. count of workers
+    :return: UIDs of the shops of each worker. Workers without shops are left out.
+    """
+    loads: List[Tuple[int, int]] = [(0, index) for index in range(max(1, workerCount))]
+    """ Heap of (cost, worker index) """
+    groups: List[List[str]] = [list() for _ in loads]
+
+    costs = [(max(1, len(shop.getProductUrls())), shop.uid) for shop in shops]
+    for cost, uid in sorted(costs, key=lambda item: (-item[0], item[1])):
+        load, index = heapq.heappop(loads)
+        groups[index].append(uid)
+        heapq.heappush(loads, (load + cost, index))
+
+    return [group for group in groups if group]
+
+
+@dataclass
+class WorkerMetrics:
+    """ Counters which a worker process reports to its supervisor. """
+    name: str
+    pid: int
+    shopCount: int = 0
+    scraperCount: int = 0
+    storage: ShopWriteStats = field(default_factory=ShopWriteStats)
+
+
+class WorkerContext:
+    """ Everything a worker process gets from its supervisor. Gets passed to the worker's
+    target function. """
+
+    def __init__(self, name: str, shopUIDs: List[str], logQueue: mp.Queue,
+                 metricsQueue: mp.Queue, stopEvent: Event):
+        self.__name = name
+        self.__shopUIDs = shopUIDs
+        self.__logQueue = logQueue
+        self.__metricsQueue = metricsQueue
+        self.__stopEvent = stopEvent
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def shopUIDs(self) -> List[str]:
+        """ UIDs of the shops this worker is responsible for. No other process writes them. """
+        return self.__shopUIDs
+
+    @property
+    def logQueue(self) -> mp.Queue:
+        """ See `clog.configureQueueLogger`. """
+        return self.__logQueue
+
+    @property
+    def isStopRequested(self) -> bool:
+        """ True if the worker should write its data and end. Poll this regularly. """
+        return self.__stopEvent.is_set()
+
+    def reportMetrics(self, metrics: WorkerMetrics) -> None:
+        """ Send metrics to the supervisor. Pass a copy, as it gets pickled later on.
+
+        :param metrics: Current counters of this worker
+        :return: None
+        """
+        self.__metricsQueue.put(metrics)
+
+
+@dataclass
+class _Worker:
+    name: str
+    shopUIDs: List[str]
+    process: Optional[mp.Process] = None
+    startStamp: float = 0.0
+    crashCount: int = 0
+    """ Count of crashes in a row, without a stable run in between. """
+    restartStamp: Optional[float] = None
+    """ If set, the worker crashed and gets restarted from this monotonic stamp on. """
+
+
+class Supervisor:
+    """ Runs a target function in worker processes, one per group of shops. Workers get
+    spawned, not forked, so they don't inherit threads and open files of this process.
+
+    Log records of workers get written by the handlers of this process (see
+    `clog.configureQueueLogger`). Workers report metrics through their `WorkerContext`.
+    A worker which ended with a non-zero exit code gets restarted with the same shops,
+    after a delay which doubles with each crash in a row. A worker which ended with exit
+    code 0 stays ended.
+
+    Use it as a context manager: Entering starts forwarding log records, exiting stops all
+    workers and the forwarding. Call `poll()` regularly in between.
+    """
+    _MIN_RESTART_DELAY_SCNDS: float = 1.0
+    _MAX_RESTART_DELAY_SCNDS: float = 60.0
+    _STABLE_RUN_SCNDS: float = 300.0
+    """ A worker which ran this long before it crashed gets restarted with the min. delay. """
+
+    def __init__(self, target: Callable[[WorkerContext], None], stopTimeoutScnds: float = 120.0):
+        """ Constructor
+
+        :param target: Function which gets run by each worker process. Must be picklable,
+                       i.e. defined at module level.
+        :param stopTimeoutScnds: Max. seconds to wait for workers to stop by themselves,
+                                 before they get terminated.
+        """
+        self._target = target
+        self._stopTimeoutScnds = stopTimeoutScnds
+        self._mpContext = mp.get_context("spawn")
+        self._logQueue = self._mpContext.Queue()
+        self._metricsQueue = self._mpContext.Queue()
+        self._stopEvent = self._mpContext.Event()
+        self._logForwarder = clog.LogRecordForwarder(self._logQueue)
+        self._workers: List[_Worker] = list()
+        self._metrics: Dict[Tuple[str, int], WorkerMetrics] = dict()
+        """ Last reported metrics by worker name and process ID. """
+        self._restartCount = 0
+
+    def __enter__(self) -> 'Supervisor':
+        self._logForwarder.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.stop()
+        finally:
+            self._logForwarder.stop()
+
+    @property
+    def isRunning(self) -> bool:
+        """ True as long as a worker is alive or waits for its restart. """
+        return any(worker.restartStamp is not None or
+                   (worker.process and worker.process.is_alive())
+                   for worker in self._workers)
+
+    @property
+    def restartCount(self) -> int:
+        """ Count of worker restarts after crashes. """
+        return self._restartCount
+
+    @property
+    def metrics(self) -> List[WorkerMetrics]:
+        """ Last reported metrics of each worker process, including ended ones. """
+        return list(self._metrics.values())
+
+    def getStorageStats(self) -> ShopWriteStats:
+        """ Sum of the shop storage counters of all worker processes.
+
+        :return: Aggregated counters. Max. queue depth is the max. of all workers.
+        """
+        stats = ShopWriteStats()
+        for metrics in self._metrics.values():
+            stats.receivedUpdates += metrics.storage.receivedUpdates
+            stats.writtenShops += metrics.storage.writtenShops
+            stats.writeBatches += metrics.storage.writeBatches
+            stats.maxQueueDepth = max(stats.maxQueueDepth, metrics.storage.maxQueueDepth)
+        return stats
+
+    def start(self, shopUIDGroups: List[List[str]]) -> None:
+        """ Start one worker process per group of shops.
+
+        :param shopUIDGroups: UIDs of the shops of each worker, see `assignShops`
+        :return: None
+        :raises RuntimeError: If workers of a former start are still running
+        """
+        if self.isRunning:
+            raise RuntimeError("Unable to start workers: Workers are still running.")
+
+        self._stopEvent.clear()
+        self._workers = [_Worker(name=f"Worker-{index + 1}", shopUIDs=list(uids))
+                         for index, uids in enumerate(shopUIDGroups)]
+        for worker in self._workers:
+            self._startWorker(worker)
+
+    def poll(self) -> None:
+        """ Collect reported metrics, detect ended workers and restart crashed workers
+        whose restart delay passed. Returns quickly.
+
+        :return: None
+        """
+        self._collectMetrics()
+        now = time.monotonic()
+
+        for worker in self._workers:
+            if worker.restartStamp is not None:
+                if now >= worker.restartStamp:
+                    self._restartCount += 1
+                    self._startWorker(worker)
+                continue
+
+            if worker.process is None or worker.process.is_alive():
+                continue
+
+            exitCode = worker.process.exitcode
+            worker.process = None
+            if exitCode == 0:
+                logger.info("%s ended.", worker.name)
+                continue
+
+            if now - worker.startStamp >= self._STABLE_RUN_SCNDS:
+                worker.crashCount = 0
+            delay = min(self._MIN_RESTART_DELAY_SCNDS * 2 ** worker.crashCount,
+                        self._MAX_RESTART_DELAY_SCNDS)
+            worker.crashCount += 1
+            worker.restartStamp = now + delay
+            logger.error("%s crashed with exit code %s. Restarting it in %.1f s.",
+                         worker.name, exitCode, delay)
+
+    def stop(self) -> None:
+        """ Ask all workers to stop and wait until they have written their data. Workers
+        which don't stop in time get terminated. Pending restarts get cancelled.
+
+        :return: None
+        """
+        self._stopEvent.set()
+        for worker in self._workers:
+            worker.restartStamp = None
+
+        runningWorkers = [worker for worker in self._workers if worker.process]
+        deadline = time.monotonic() + self._stopTimeoutScnds
+        for worker in runningWorkers:
+            while worker.process.is_alive() and time.monotonic() < deadline:
+                # Keep reading metrics meanwhile, so no worker blocks on sending its last ones.
+                self._collectMetrics()
+                worker.process.join(0.1)
+
+        for worker in runningWorkers:
+            if worker.process.is_alive():
+                logger.error("%s did not stop within %s s. Terminating it.",
+                             worker.name, self._stopTimeoutScnds)
+                worker.process.terminate()
+                worker.process.join(5)
+                if worker.process.is_alive():
+                    worker.process.kill()
+                    worker.process.join()
+            worker.process = None
+
+        self._collectMetrics()
+
+    def _startWorker(self, worker: _Worker) -> None:
+        context = WorkerContext(name=worker.name,
+                                shopUIDs=worker.shopUIDs,
+                                logQueue=self._logQueue,
+                                metricsQueue=self._metricsQueue,
+                                stopEvent=self._stopEvent)
+        # Daemonic, so workers never outlive the supervisor.
+        worker.process = self._mpContext.Process(
+            target=self._target, args=(context,), name=worker.name, daemon=True)
+        worker.process.start()
+        worker.startStamp = time.monotonic()
+        worker.restartStamp = None
+        logger.info("Started %s (process ID %s) with %d shops.",
+                    worker.name, worker.process.pid, len(worker.shopUIDs))
+
+    def _collectMetrics(self) -> None:
+        while True:
+            try:
+                metrics: WorkerMetrics = self._metricsQueue.get_nowait()
+            except queue.Empty:
+                return
+            self._metrics[(metrics.name, metrics.pid)] = metrics
@@ -56,6 +56,61 @@ class ScraperConfig:
     postTimeoutScnds: int
     postMaxRetries: int
     postUseRandomProxies: bool
+    fetchMaxConcurrency: int = 20
+    """ Max. number of product requests running at the same time per shop. """
+    iterDeadlineScnds: int = 180
+    """ Max. duration of one scraper iteration. Unfinished requests are cancelled
+    when exceeded. 0 disables the deadline. """
+
+
+@dataclass
+class StorageConfig:
+    """ Data wrapper for storage configuration repo.
+    Be warned: Attribute names must exactly correspond to key names in JSON data! """
+    shopsBackend: str = "tinydb"
+    """ Storage backend for shops. One of 'tinydb' (Shops.json), 'tinydb-sharded'
+    (one file per shop in directory 'Shops') or 'sqlite' (Shops.sqlite). """
+    shopsJournal: bool = False
+    """ Write shop changes to an append-only journal, which gets folded into the
+    shops backend from time to time. """
+    shopsJournalCompactBytes: int = 4 * 1024 * 1024
+    """ Journal size in bytes from which on the journal gets folded into the shops backend. """
+    productHistory: bool = False
+    """ Record price and stock changes of products in directory 'History'. """
+    startupSnapshot: bool = False
+    """ Save all shops to a binary snapshot on clean shutdown and load them from it at
+    the next startup, as long as the shops backend and ProductsURLs.txt did not change. """
+    tinyPersistentConnections: bool = False
+    """ Open each TinyDB file once per process and keep its data cached in memory. """
+    tinyWriteCacheSize: int = 100
+    """ Persistent connections only: Count of buffered writes per file before flushing. """
+    tinyFlushIntervalScnds: float = 5.0
+    """ Persistent connections only: Min. seconds between two time-based flushes. """
+
+
+@dataclass
+class ProcessConfig:
+    """ Data wrapper for process configuration repo.
+    Be warned: Attribute names must exactly correspond to key names in JSON data! """
+    supervisor: bool = False
+    """ Run the scrapers in worker processes, which get started, restarted after crashes
+    and stopped by this process. Needs shops backend 'sqlite', without shops journal and
+    product history. Else all scrapers run in this process. """
+    workerProcesses: int = 0
+    """ Supervisor only: Count of worker processes. 0 starts one per CPU core. """
+    eventLoop: str = "default"
+    """ Event loop backend: 'default' for the one of asyncio, or 'uvloop' if installed
+    (not on Windows). Falls back to 'default' if not available. """
+    clusterRole: str = ""
+    """ Run as part of a cluster of hosts: 'coordinator' holds the shops and leases them to
+    'node' processes, which run the scrapers. Empty for no cluster. """
+    clusterAddress: str = "127.0.0.1:8765"
+    """ Address of the coordinator: 'host:port' or 'unix:/path/to/socket'. """
+    clusterNodeID: str = ""
+    """ Node only: ID of this node, unique within the cluster. Empty for '<hostname>-<pid>'. """
+    clusterLeaseScnds: float = 15.0
+    """ Coordinator only: Shops of a node which did not send a heartbeat for this long get
+    leased to other nodes. """
 
 
 class TinyConfigDao(TinyDao):
@@ -78,13 +133,23 @@ class TinyConfigDao(TinyDao):
     def find(self, scraperConfigByUrl: str) -> ScraperConfig:
         ...
 
-    def find(self, **kwargs) -> Union[LoggerConfig, ScraperConfig]:
+    @overload
+    def find(self, storageConfig) -> StorageConfig:
+        ...
+
+    @overload
+    def find(self, processConfig) -> ProcessConfig:
+        ...
+
+    def find(self, **kwargs) -> Union[LoggerConfig, ScraperConfig, StorageConfig, ProcessConfig]:
         """ Find one ore more application configurations, depending on given args.
 
         :param kwargs:
             'loggerConfig': Find config for the app's logging behaviour.
             'scraperCommonConfig': Find the common config, for example used as a fallback.
             'scraperConfigByUrl': Find a specific scraper config by its scraper-URL.
+            'storageConfig': Find config for the app's storage backends.
+            'processConfig': Find config for the app's processes.
         :return: Results depend on which find arguments where used to call this method.
         :raises: When no or multiple configuration data were found.
         """
@@ -97,6 +162,12 @@ class TinyConfigDao(TinyDao):
         if "scraperConfigByUrl" in kwargs:
             return self._findScraperConfigByUrl(kwargs["scraperConfigByUrl"])  # raises
 
+        if "storageConfig" in kwargs:
+            return self._findStorageConfig()
+
+        if "processConfig" in kwargs:
+            return self._findProcessConfig()
+
         else:
             raise KeyError(f"Configuration search fail. None of the expected arguments were given. "
                            f"kwargs: {kwargs}")
@@ -132,6 +203,60 @@ class TinyConfigDao(TinyDao):
             decodedConfig = LoggerConfig(**config)
             return decodedConfig
 
+    def _findStorageConfig(self) -> StorageConfig:
+        """ Searches the storage configuration. Falls back to a hard coded rescue
+        configuration if persistent default does not exist. Returns gracefully.
+
+        :return: A StorageConfig object
+        """
+        storageQuery = tdb.Query().storage
+        try:
+            results = super().find(condition=storageQuery)  # raises
+            if not results: raise LookupError("No results for query %s", storageQuery)
+
+        except Exception as e:
+            rescueConfig = StorageConfig()
+
+            logger.debug(
+                "Did not find storage configuration in storage %s. Falling back to rescue "
+                "configuration. Error was: %s. Recover to rescue values: %s",
+                self.connection.path, e, rescueConfig)
+
+            return rescueConfig
+
+        else:
+            # Note: Let possible exceptions raise ungracefully here.
+            config = results[0]["storage"]
+            decodedConfig = StorageConfig(**config)
+            return decodedConfig
+
+    def _findProcessConfig(self) -> ProcessConfig:
+        """ Searches the process configuration. Falls back to a hard coded rescue
+        configuration if persistent default does not exist. Returns gracefully.
+
+        :return: A ProcessConfig object
+        """
+        processQuery = tdb.Query().process
+        try:
+            results = super().find(condition=processQuery)  # raises
+            if not results: raise LookupError("No results for query %s", processQuery)
+
+        except Exception as e:
+            rescueConfig = ProcessConfig()
+
+            logger.debug(
+                "Did not find process configuration in storage %s. Falling back to rescue "
+                "configuration. Error was: %s. Recover to rescue values: %s",
+                self.connection.path, e, rescueConfig)
+
+            return rescueConfig
+
+        else:
+            # Note: Let possible exceptions raise ungracefully here.
+            config = results[0]["process"]
+            decodedConfig = ProcessConfig(**config)
+            return decodedConfig
+
     def _findScraperConfigByUrl(self, url: str) -> ScraperConfig:
         """ Searches a scraper config (inside the 'Config' table) with the given scraper URL.
         If the config does not exist, we try to fall back to a persistent default configuration.
@@ -185,7 +310,9 @@ class TinyConfigDao(TinyDao):
                 fetchUseRandomProxy=True,
                 postTimeoutScnds=8,
                 postMaxRetries=4,
-                postUseRandomProxies=True)
+                postUseRandomProxies=True,
+                fetchMaxConcurrency=20,
+                iterDeadlineScnds=180)
 
             logger.warning("No default configuration for scrapers found at %s. Error was: %s "
                            "Falling back to rescue-configuration: %s",
@@ -257,6 +384,26 @@ class ConfigRepo:
             scraperConfig = dao.find(scraperCommonConfig=True)  # raises
         return scraperConfig
 
+    def findStorageConfig(self) -> StorageConfig:
+        """ Searches the storage configuration. Falls back to a hard coded rescue
+        configuration if record does not exist. Returns gracefully.
+
+        :return: A StorageConfig object
+        """
+        with self._dao as dao:
+            storageConfig = dao.find(storageConfig=True)
+        return storageConfig
+
+    def findProcessConfig(self) -> ProcessConfig:
+        """ Searches the process configuration. Falls back to a hard coded rescue
+        configuration if record does not exist. Returns gracefully.
+
+        :return: A ProcessConfig object
+        """
+        with self._dao as dao:
+            processConfig = dao.find(processConfig=True)
+        return processConfig
+
 
 # Globals --------------------------------------------------------------------------------
 
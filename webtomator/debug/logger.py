@@ -7,11 +7,13 @@
 from __future__ import annotations
 
 import logging
+import logging.handlers
 import sys
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from pathlib import Path
+    from multiprocessing import Queue
     from typing import Union
     from config.base import LoggerConfig
 
@@ -75,13 +77,9 @@ def configureLogger(logger: Union[CustomLogger, logging.Logger],
                     config: LoggerConfig,
                     logfilePath: Path = None) -> None:
     cfg = config
-    minLevel = min(cfg.consoleLogLevel, cfg.fileLogLevel)
-    if minLevel <= 0:
-        # If one of the logLevels is 0 or less, ignore it and set the other logLevel.
-        minLevel = max(cfg.consoleLogLevel, cfg.fileLogLevel)
 
     # Set main log level
-    logger.setLevel(minLevel)
+    logger.setLevel(_getMinLevel(cfg))
 
     if cfg.isConsoleLogging:
         if cfg.consoleLogLevel >= ERROR:
@@ -118,6 +116,46 @@ def configureLogger(logger: Union[CustomLogger, logging.Logger],
             logger.addHandler(InfoOnlyFileHandler(path=logfilePath))
             logger.addHandler(WarnAndAboveFileHandler(path=logfilePath))
 
+
+def configureQueueLogger(logger: Union[CustomLogger, logging.Logger],
+                         config: LoggerConfig,
+                         queue: Queue) -> None:
+    """ Configure the logger of a worker process. Records don't get written by the worker,
+    but sent to the given queue. The parent process takes them from there with a
+    `LogRecordForwarder` and writes them with its own handlers.
+
+    :param logger: Usually the root logger of the worker process
+    :param config: The same config as the parent process uses
+    :param queue: A multiprocessing queue, shared with the parent process
+    :return: None
+    """
+    logger.setLevel(_getMinLevel(config))
+    handler = logging.handlers.QueueHandler(queue)
+    # Records get formatted here, so tag them with the name of the worker.
+    handler.setFormatter(logging.Formatter("%(processName)s: %(message)s"))
+    logger.addHandler(handler)
+
+
+def _getMinLevel(config: LoggerConfig) -> int:
+    minLevel = min(config.consoleLogLevel, config.fileLogLevel)
+    if minLevel <= 0:
+        # If one of the logLevels is 0 or less, ignore it and set the other logLevel.
+        minLevel = max(config.consoleLogLevel, config.fileLogLevel)
+    return minLevel
+
+
+class LogRecordForwarder(logging.handlers.QueueListener):
+    """ Takes log records of worker processes from a queue on a thread of its own and hands
+    them to the logger of the same name in this process, so they get written by its
+    handlers. See `configureQueueLogger`. Call `start()` and `stop()`. """
+
+    def __init__(self, queue: Queue):
+        super().__init__(queue)
+
+    def handle(self, record: logging.LogRecord) -> None:
+        # Level was already checked by the worker, handlers check their own levels.
+        logging.getLogger(record.name).handle(record)
+
 # -------------------------------------------------------------------------
 # Filters
 # -------------------------------------------------------------------------
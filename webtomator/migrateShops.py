@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# migrateShops.py
+""" Copies all shops from the TinyDB file (Shops.json) to another shops backend:
+The SQLite database (Shops.sqlite) or sharded TinyDB files (directory 'Shops').
+Existing shops in the target get overwritten. Set 'shopsBackend' in Config.json
+afterwards to make the app use the target backend. """
+
+import argparse
+import sys
+from pathlib import Path
+
+import debug.logger as clog
+from config.base import APP_USERDATA_DIR
+from shop.shopDao import TinyShopDao, SqliteShopDao, ShardedTinyShopDao
+from shop.shopRepo import ShopRepo
+from storage.base import Dao
+
+logger = clog.getLogger(__name__)
+
+TARGET_DAOS = {
+    "sqlite": (SqliteShopDao, APP_USERDATA_DIR / "Shops.sqlite"),
+    "tinydb-sharded": (ShardedTinyShopDao, APP_USERDATA_DIR / "Shops"),
+}
+
+
+def migrate(sourcePath: Path, targetDao: Dao) -> int:
+    """ Copy all shops from a TinyDB shops file to another shops backend.
+
+    :param sourcePath: Path of the TinyDB shops file
+    :param targetDao: DAO of the target backend. Its storage gets created if it does not exist.
+    :return: Count of migrated shops
+    """
+    sourceRepo = ShopRepo(dao=TinyShopDao(path=sourcePath))
+    targetRepo = ShopRepo(dao=targetDao)
+
+    shops = sourceRepo.getAll() or list()
+    targetRepo.setAll(shops=shops)
+    return len(shops)
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate shops from TinyDB to another backend.")
+    parser.add_argument("--source", type=Path, default=APP_USERDATA_DIR / "Shops.json",
+                        help="Path of the TinyDB shops file (default: userdata/Shops.json)")
+    parser.add_argument("--backend", choices=sorted(TARGET_DAOS), default="sqlite",
+                        help="Target backend (default: sqlite)")
+    parser.add_argument("--target", type=Path, default=None,
+                        help="Path of the target database file or directory "
+                             "(default: userdata/Shops.sqlite or userdata/Shops)")
+    parsed = parser.parse_args(args)
+
+    if not parsed.source.is_file():
+        logger.error("Source file not found: %s", parsed.source)
+        return 1
+
+    daoClass, defaultTarget = TARGET_DAOS[parsed.backend]
+    target = parsed.target or defaultTarget
+
+    count = migrate(sourcePath=parsed.source, targetDao=daoClass(target))
+    logger.info("Migrated %d shop(s) from %s to %s", count, parsed.source, target)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# network.eventLoop.py
+import asyncio
+import sys
+from typing import Tuple
+
+import debug.logger as clog
+
+logger = clog.getLogger(__name__)
+
+EVENT_LOOPS: Tuple[str, ...] = ("default", "uvloop")
+""" Names of the supported event loop backends. """
+
+
+def isEventLoopAvailable(name: str) -> bool:
+    """ Check if an event loop backend can be used on this system.
+
+    :param name: One of `EVENT_LOOPS`
+    :return: True if the backend is installed and supports this platform
+    """
+    try:
+        createEventLoopPolicy(name)
+    except LookupError:
+        return False
+    return True
+
+
+def createEventLoopPolicy(name: str) -> asyncio.AbstractEventLoopPolicy:
+    """ Create the event loop policy of a backend.
+
+    :param name: One of `EVENT_LOOPS`
+    :return: The policy, which creates loops of the backend
+    :raises ValueError: On unknown backends
+    :raises LookupError: If the backend is not installed or does not support this platform
+    """
+    if name == "default":
+        if sys.platform == 'win32' and sys.version_info >= (3, 8, 0):
+            # Use this workaround on Win for Python >= 3.8, else
+            # web proxies won't work with aiohttp.
+            # source: https://github.com/aio-libs/aiohttp/issues/2245#issuecomment-545586306
+            return asyncio.WindowsSelectorEventLoopPolicy()
+        return asyncio.DefaultEventLoopPolicy()
+
+    if name == "uvloop":
+        if sys.platform == 'win32':
+            raise LookupError("Event loop 'uvloop' is not available on Windows.")
+        try:
+            import uvloop  # Optional dependency
+        except ImportError as e:
+            raise LookupError(f"Event loop 'uvloop' is not installed: {e}") from e
+        return uvloop.EventLoopPolicy()
+
+    raise ValueError(f"Unknown event loop '{name}'. Expected one of: {', '.join(EVENT_LOOPS)}")
+
+
+def setEventLoop(name: str) -> str:
+    """ Set the event loop backend for all loops which get created afterwards, e.g. by
+    `asyncio.run`. Falls back to the default backend if the given one is not available.
+
+    :param name: One of `EVENT_LOOPS`
+    :return: Name of the backend which was set
+    :raises ValueError: On unknown backends
+    """
+    try:
+        policy = createEventLoopPolicy(name)  # raises
+    except LookupError as e:
+        logger.warning("%s Falling back to the default event loop.", e)
+        name = "default"
+        policy = createEventLoopPolicy(name)
+
+    asyncio.set_event_loop_policy(policy)
+    return name
@@ -7,8 +7,6 @@ from pathlib import Path
 from typing import TYPE_CHECKING
 from typing import overload
 
-import tinydb as tdb
-
 from config.base import APP_USERDATA_DIR
 from storage.tinyDao import TinyDao
 
@@ -17,7 +15,7 @@ if TYPE_CHECKING:
     from typing import overload
     from storage.base import Dao
     from network.connection import Request
-    from shop.product import Product
+    from shop.product import Product, ProductChanges
     from shop.shop import Shop
 
 
@@ -29,7 +27,7 @@ class Discord:
         self._payload = defaultdict(dict)
 
     @overload
-    async def send(self, productMsg: Product, shop: Shop):
+    async def send(self, productMsg: Product, shop: Shop, changes: ProductChanges = None):
         ...
 
     @overload
@@ -46,12 +44,14 @@ class Discord:
         errorMsg = kwargs.get("errorMsg")
         shop = kwargs.get("shop")
         """ Argument is mandatory when productMsg is given """
+        changes = kwargs.get("changes")
+        """ Optional with productMsg: What the scan which triggered the message changed """
 
         apiEndpoint = self._repo.findWebhookApiEndpoint().rstrip("/")
 
         if productMsg:
             msgConfig = self._repo.findProductMessageConfig()
-            self._setProductPayload(msgConfig, product=productMsg, shop=shop)
+            self._setProductPayload(msgConfig, product=productMsg, shop=shop, changes=changes)
 
         elif logMsg:
             msgConfig = self._repo.findLogMessageConfig()
@@ -81,7 +81,8 @@ class Discord:
         # Send message
         await self._request.post(params=postParams)
 
-    def _setProductPayload(self, msgConfig: MessageConfig, product: Product, shop: Shop):
+    def _setProductPayload(self, msgConfig: MessageConfig, product: Product, shop: Shop,
+                           changes: ProductChanges = None):
         if not product:
             raise AttributeError(f"No 'product' given. Actual value: {product}")
         if not shop:
@@ -96,6 +97,9 @@ class Discord:
             if sizeBlock:
                 fields.append({"name": "Sizes", "value": "\n".join(sizeBlock)})
 
+        if changes:
+            fields.extend(self._getProductChangesFields(product, changes))
+
         self.setPayload(username=msgConfig.username,
                         title=product.name,
                         description=shop.name,
@@ -104,6 +108,29 @@ class Discord:
                         footer="️Webtomator © 2020 dbyte solutions",
                         fields=fields)
 
+    @staticmethod
+    def _getProductChangesFields(product: Product, changes: ProductChanges) -> List[dict]:
+        """ Describes what changed with the scan which triggered the message.
+
+        :param product: The product of the message
+        :param changes: Changes of the scan, see `Product.applySizeSnapshot`
+        :return: List of embed fields, empty if there are no changes of sizes or price.
+        """
+        fields = []
+
+        if changes.isPriceChanged and changes.oldBasePrice:
+            fields.append({"name": "Price changed",
+                           "value": "{:.2f} ➔ {}".format(changes.oldBasePrice,
+                                                         product.getPriceWithCurrency())})
+
+        for name, sizes in (("New sizes", changes.newSizes),
+                            ("Restocked", changes.restockedSizes),
+                            ("Sold out", changes.soldOutSizes)):
+            if sizes:
+                fields.append({"name": name, "value": "\n".join(f"{s.sizeEU}" for s in sizes)})
+
+        return fields
+
     def _setLogPayload(self, msgConfig: MessageConfig, msgText: str):
         self.setPayload(username=msgConfig.username, content=f"🔹{msgText}")
 
@@ -183,8 +210,7 @@ class DiscordTinyDao(TinyDao):
             raise AttributeError(f"None of the expected kwargs were given. kwargs are: {kwargs}")
 
     def _findMessageConfig(self, configName: str) -> MessageConfig:
-        query = tdb.Query().configName == configName  # prepare statement
-        results = super().find(condition=query)  # raises
+        results = self._findByField("configName", configName)  # raises
 
         try:
             decodedMessageConfig = MessageConfig(**results[0])
@@ -195,8 +221,7 @@ class DiscordTinyDao(TinyDao):
                               f"Search value: '{configName}'. {e}")
 
     def _findApiEndpointByType(self, apiType: str) -> str:
-        query = tdb.Query().apiType == apiType  # prepare statement
-        results = super().find(condition=query)  # raises
+        results = self._findByField("apiType", apiType)  # raises
 
         try:
             endpoint = results[0].get("apiEndpoint")
@@ -16,6 +16,7 @@ logger = clog.getLogger(__name__)
 class Scrapable(ABC):
     """ Interface for classes with the ability to scrape its URL target.
     """
+    __slots__ = ()
 
     @property
     @abstractmethod
@@ -74,10 +75,19 @@ class Scraper(ABC):
             |  Example: (20, 30, 0.5)
         This is used to generate a random sleep time, constrained by the 1st and the 2nd number.
         """
+        self._fetchMaxConcurrency = 20  # finally overridden by __configureAfterInit
+        """ Max. number of sub-requests (e.g. products of a shop) running at the same time. """
+        self._iterDeadline = 0  # finally overridden by __configureAfterInit
+        """ Max. seconds for one call of `run()`. It gets cancelled when exceeded.
+        0 means no deadline. """
 
         # Do final setup after initialization is done
         self.__configureAfterInit()
 
+    @property
+    def scrapee(self) -> Scrapable:
+        return self._scrapee
+
     @property
     @abstractmethod
     def URL(self) -> str:
@@ -107,7 +117,15 @@ class Scraper(ABC):
 
             # Wait until whole worker has completed. Rules for completion are defined
             # within the worker itself. Meanwhile, suspend me for other tasks.
-            result = await self.run()
+            # Cancel the worker if it did not complete within the iteration deadline, so
+            # a single straggler can't delay the next iteration.
+            try:
+                await asyncio.wait_for(self.run(), timeout=self._iterDeadline or None)
+
+            except asyncio.TimeoutError:
+                logger.warning("⏱ Scraper %s: Iteration %d exceeded deadline of %d seconds "
+                               "and has been cancelled.", self._scrapee.name, i, self._iterDeadline)
+                await self._onIterationDeadline()
 
             # Stop performance measuring for iteration
             duration = time.time() - startTime
@@ -125,6 +143,14 @@ class Scraper(ABC):
             logger.info("Waiting %.2f seconds before running scraper again.", randSleep)
             await asyncio.sleep(randSleep)
 
+    async def _onIterationDeadline(self) -> None:
+        """ Called by `loopRun` after `run()` has been cancelled because it exceeded the
+        iteration deadline. Override to clean up or persist partial results.
+
+        :return: None
+        """
+        pass
+
     async def sendMessage(self, **kwargs) -> None:
         # Does only send if a messenger object exists
         if self._messenger:
@@ -139,6 +165,8 @@ class Scraper(ABC):
         of the instance is done. """
         cfg = APP_CONFIG_REPO.findScraperConfigByUrl(url=self.URL)
         self._iterSleep = (cfg.iterSleepFromScnds, cfg.iterSleepToScnds, cfg.iterSleepSteps)
+        self._fetchMaxConcurrency = max(1, cfg.fetchMaxConcurrency)
+        self._iterDeadline = max(0, cfg.iterDeadlineScnds)
         self._request.configure(
             timeout=cfg.fetchTimeoutScnds,
             maxRetries=cfg.fetchMaxRetries,
@@ -170,6 +198,14 @@ class ScraperFactory:
         if class_ not in self._scraperClasses:
             self._scraperClasses.append(class_)
 
+    def isSupported(self, scrapee: Scrapable) -> bool:
+        """ Check if a scraper is registered for the given scrapee, without making one.
+
+        :param scrapee: The scrapee to check
+        :return: True if `makeFromScrapee` would find a scraper class for the scrapee
+        """
+        return any(class_.URL == scrapee.url for class_ in self._scraperClasses)
+
     def makeFromScrapees(self,
                          scrapees: List[Scrapable],
                          scrapeeRepo,
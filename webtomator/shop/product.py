@@ -1,36 +1,99 @@
 # shop.product.py
 import datetime as dtt
+import sys
 import urllib.parse as urlparse
-from typing import Optional, Union, ClassVar, List
+from dataclasses import dataclass, field
+from typing import Optional, Union, ClassVar, List, Dict, Any
 
 import pytz
 
 import debug.logger as clog
 from scraper.base import Scrapable
-from storage.base import Identifiable
+from storage.base import Identifiable, ChangeTrackable
 from story.baseConverter import BaseConverter
 
 logger = clog.getLogger(__name__)
 
 
-class Product(Identifiable, Scrapable):
+def _intern(val: Any) -> Any:
+    # Short strings which repeat across many objects (size labels, currencies) are stored once.
+    return sys.intern(val) if type(val) is str else val
+
+
+@dataclass
+class ProductChanges:
+    """ Data wrapper for the changes of a product since its last commit. """
+    newSizes: List['Size'] = field(default_factory=list)
+    restockedSizes: List['Size'] = field(default_factory=list)
+    soldOutSizes: List['Size'] = field(default_factory=list)
+    isPriceChanged: bool = False
+    oldBasePrice: Optional[float] = None
+
+    @property
+    def isSizesChanged(self) -> bool:
+        return bool(self.newSizes or self.restockedSizes or self.soldOutSizes)
+
+
+class Product(Identifiable, Scrapable, ChangeTrackable):
     """ Product class.
+    Changes of its attributes and sizes are tracked, see `ChangeTrackable`. The scan
+    timestamp is not tracked.
 
     Note: All date/datetime data in this class are stored as UTC and UNIX timestamp (float) format.
+    Instances have no __dict__, so no other attributes can be set. The UID gets generated on
+    first access, if none was given.
+    Sizes are indexed by their label for `findSize()` and report their changes to the product.
+    So add sizes by `addSize()` or set them by the `sizes` setter, not by changing the list in
+    place.
     """
+    __slots__ = ("__uid", "__name", "__url", "__basePrice", "__currency", "__sizes", "__urlThumb",
+                 "__releaseDateStamp", "__lastScanStamp", "_changes", "_changedChildren",
+                 "_trackingParent", "__sizeIndex", "__indexedSizeCount", "__urlParts")
+
+    _DICT_KEYS: ClassVar[frozenset] = frozenset((
+        "uid", "name", "url", "basePrice", "currency", "sizes", "urlThumb", "releaseDateStamp",
+        "lastScanStamp"))
+    """ Keys of `toDict()` """
+
     def __init__(self, **kwargs):
-        self.__uid: str = kwargs.get("uid", self.generateUID())
+        self.__uid: Optional[str] = kwargs.get("uid", None)
         self.__name: str = kwargs.get("name", "")
         self.__url: str = kwargs.get("url", "")
-        self.basePrice: Optional[float] = kwargs.get("basePrice", None)
-        self.currency: Optional[str] = kwargs.get("currency", None)
+        self.__basePrice: Optional[float] = kwargs.get("basePrice", None)
+        self.__currency: Optional[str] = _intern(kwargs.get("currency", None))
         self.__sizes: [Size] = kwargs.get("sizes", list())
-        self.urlThumb: Optional[str] = kwargs.get("urlThumb", None)
+        self.__urlThumb: Optional[str] = kwargs.get("urlThumb", None)
         self.__releaseDateStamp: Optional[float] = kwargs.get("releaseDateStamp", None)  # **
         self.__lastScanStamp: float = kwargs.get("lastScanStamp", 0.0)  # **
+        self._changes = dict()
+        self._changedChildren = self._NO_CHANGED_CHILDREN
+        self._trackingParent = None
+        for size in self.__sizes:
+            # Like _adoptChild(), which is too slow for decoding many products.
+            size._trackingParent = self
+            if size._changes:
+                self._markChildChanged(size)
+        # Built on first lookup, so products which never get scraped don't pay for it.
+        self.__sizeIndex: Optional[Dict[str, Size]] = None
+        self.__indexedSizeCount: int = 0
+        self.__urlParts: Optional[urlparse.SplitResult] = None
 
         # ** is of format UTC UNIX epoch
 
+    def __getstate__(self) -> tuple:
+        # Used by copy and pickle. Copies must not generate a UID of their own.
+        return (self.uid, self.__name, self.__url, self.__basePrice, self.__currency,
+                self.__sizes, self.__urlThumb, self.__releaseDateStamp, self.__lastScanStamp,
+                self._changes, self._changedChildren, self._trackingParent)
+
+    def __setstate__(self, state: tuple) -> None:
+        (self.__uid, self.__name, self.__url, self.__basePrice, self.__currency,
+         self.__sizes, self.__urlThumb, self.__releaseDateStamp, self.__lastScanStamp,
+         self._changes, self._changedChildren, self._trackingParent) = state
+        self.__sizeIndex = None
+        self.__indexedSizeCount = 0
+        self.__urlParts = None
+
     def __repr__(self):
         info = f"<{self.__class__.__name__} uid: {self.uid}, name: {self.name}, " \
                f"url: {self.url}, price: {self.basePrice}, currency: {self.currency}, " \
@@ -41,8 +104,67 @@ class Product(Identifiable, Scrapable):
 
         return info
 
+    def toDict(self) -> Dict[str, Any]:
+        """ Deep conversion to a dict of plain data types, including all sizes.
+        Change tracking state is not included.
+
+        :return: The product as a dict
+        """
+        return {
+            "uid": self.uid,
+            "name": self.__name,
+            "url": self.__url,
+            "basePrice": self.__basePrice,
+            "currency": self.__currency,
+            "sizes": [s.toDict() for s in self.__sizes],
+            "urlThumb": self.__urlThumb,
+            "releaseDateStamp": self.__releaseDateStamp,
+            "lastScanStamp": self.__lastScanStamp,
+        }
+
+    @classmethod
+    def fromDict(cls, data: Dict[str, Any]) -> 'Product':
+        """ Create a product, including its sizes, from a dict as returned by `toDict()`.
+        The new product has no tracked changes.
+
+        :param data: A dict with keys like the keyword arguments of the constructor
+        :return: New Product object
+        """
+        kwargs = dict(data)
+        kwargs["sizes"] = [Size.fromDict(s) for s in data.get("sizes", list())]
+        return cls(**kwargs)
+
+    @classmethod
+    def isPlainDict(cls, data: Dict[str, Any]) -> bool:
+        """ Check if a dict equals what `toDict()` returns for a product which gets created
+        from it by `fromDict()`, so the dict may be used in place of the product's dict.
+
+        :param data: A product dict
+        :return: True if the dict has exactly the keys of `toDict()`, as have its sizes
+        """
+        return data.keys() == cls._DICT_KEYS and isinstance(data["sizes"], list) \
+            and all(isinstance(s, dict) and s.keys() == Size._DICT_KEYS for s in data["sizes"])
+
+    def hasEqualValues(self, other: 'Product') -> bool:
+        """ Compare the values of `toDict()` with those of another product, without building
+        the dicts. Returns on the first difference.
+
+        :param other: The product to compare with
+        :return: True if both products and all of their sizes have equal values
+        """
+        if self is other: return True
+        return self.uid == other.uid and self.__url == other.__url \
+            and self.__name == other.__name and self.__basePrice == other.__basePrice \
+            and self.__currency == other.__currency and self.__urlThumb == other.__urlThumb \
+            and self.__releaseDateStamp == other.__releaseDateStamp \
+            and self.__lastScanStamp == other.__lastScanStamp \
+            and len(self.__sizes) == len(other.__sizes) \
+            and all(s.hasEqualValues(o) for s, o in zip(self.__sizes, other.__sizes))
+
     @property
     def uid(self) -> str:
+        if self.__uid is None:
+            self.__uid = self.generateUID()
         return self.__uid
 
     @uid.setter
@@ -55,16 +177,61 @@ class Product(Identifiable, Scrapable):
 
     @url.setter
     def url(self, val: str) -> None:
+        if val != self.__url:
+            self._markChanged("url", self.__url)
+            self.__urlParts = None
         self.__url = val
 
+    @property
+    def urlParts(self) -> urlparse.SplitResult:
+        """ Parts of the URL as of `urllib.parse.urlsplit`. Parsed once per URL.
+
+        :raises: ValueError if the URL could not be parsed
+        """
+        if self.__urlParts is None:
+            self.__urlParts = urlparse.urlsplit(self.__url)  # raises
+        return self.__urlParts
+
     @property
     def name(self) -> str:
         return self.__name
 
     @name.setter
     def name(self, val: str) -> None:
+        if val != self.__name:
+            self._markChanged("name", self.__name)
         self.__name = val
 
+    @property
+    def basePrice(self) -> Optional[float]:
+        return self.__basePrice
+
+    @basePrice.setter
+    def basePrice(self, val: Optional[float]) -> None:
+        if val != self.__basePrice:
+            self._markChanged("basePrice", self.__basePrice)
+        self.__basePrice = val
+
+    @property
+    def currency(self) -> Optional[str]:
+        return self.__currency
+
+    @currency.setter
+    def currency(self, val: Optional[str]) -> None:
+        if val != self.__currency:
+            self._markChanged("currency", self.__currency)
+        self.__currency = _intern(val)
+
+    @property
+    def urlThumb(self) -> Optional[str]:
+        return self.__urlThumb
+
+    @urlThumb.setter
+    def urlThumb(self, val: Optional[str]) -> None:
+        if val != self.__urlThumb:
+            self._markChanged("urlThumb", self.__urlThumb)
+        self.__urlThumb = val
+
     @property
     def lastScanStamp(self) -> float:
         return self.__lastScanStamp
@@ -82,7 +249,13 @@ class Product(Identifiable, Scrapable):
         if not sizeList: return
         # Type checking
         if all(isinstance(i, Size) for i in sizeList):
+            self.__markSizesChanged()
+            for size in self.__sizes:
+                self._releaseChild(size)
             self.__sizes = sizeList
+            self.__sizeIndex = None
+            for size in sizeList:
+                self._adoptChild(size)
         else:
             raise TypeError("Could not set sizes list. All elements must be of type 'Size'.")
 
@@ -98,21 +271,114 @@ class Product(Identifiable, Scrapable):
                             f"but got {type(size)}")
 
         if size:
-            self.sizes.append(size)
+            self.__markSizesChanged()
+            self.__sizes.append(size)
+            self._adoptChild(size)
+            if self.__sizeIndex is not None:
+                self.__sizeIndex.setdefault(size.sizeEU, size)
+                self.__indexedSizeCount += 1
             logger.debug("Added new size %s for %s", size.sizeEU, self.url)
 
     def findSize(self, sizeStr: str) -> Optional['Size']:
-        """ Find and return a Size with the given size string.
+        """ Find and return a Size with the given size string. Takes constant time.
 
         :param sizeStr: Complete size string to search for.
-        :return: Size object if found, otherwise None
+        :return: Size object if found, otherwise None. Of multiple sizes with the same
+                 string, the first one.
         """
-        for size in self.sizes:
-            if size.sizeEU == sizeStr:
-                logger.debug("Found existing size %s for %s", sizeStr, self.url)
-                # Size exists. Return reference(!) of product.size
-                return size
-        return None
+        index = self.__getSizeIndex()
+        size = index.get(sizeStr)
+
+        # A size's label may have been changed after it was indexed.
+        if size is not None and size.sizeEU != sizeStr:
+            index = self.__getSizeIndex(rebuild=True)
+            size = index.get(sizeStr)
+
+        # Reference(!) of product.size
+        return size
+
+    def applySizeSnapshot(self, sizes: Dict[str, bool]) -> ProductChanges:
+        """ Apply scraped stock states to the product's sizes in one pass. Unknown sizes get
+        added. Sizes which are not part of the snapshot are left untouched.
+
+        :param sizes: In-stock state by size string
+        :return: The changes caused by the snapshot. Its price data is not set.
+        """
+        changes = ProductChanges()
+
+        for sizeStr, isInStock in sizes.items():
+            size = self.findSize(sizeStr)
+
+            if size is None:
+                size = Size(sizeEU=sizeStr, isInStock=isInStock)
+                self.addSize(size)
+                changes.newSizes.append(size)
+                continue
+
+            if isInStock and not size.isInStock:
+                changes.restockedSizes.append(size)
+            elif not isInStock and size.isInStock is True:
+                changes.soldOutSizes.append(size)
+            size.isInStock = isInStock
+
+        return changes
+
+    def getChanges(self) -> ProductChanges:
+        """ Get the changes of price and sizes since the last commit.
+
+        :return: A ProductChanges object. Its lists are empty if there are no changes.
+        """
+        changes = ProductChanges()
+
+        if "basePrice" in self._changes:
+            changes.isPriceChanged = True
+            changes.oldBasePrice = self._changes["basePrice"]
+
+        oldSizes = self._changes.get("sizes")
+        oldSizeIds = {id(s) for s in oldSizes} if oldSizes is not None else None
+
+        for size in self.__sizes:
+            if oldSizeIds is not None and id(size) not in oldSizeIds:
+                changes.newSizes.append(size)
+
+            elif "isInStock" in size.changedFields:
+                wasInStock = size.changedFields["isInStock"] is True
+                if size.isInStock is True and not wasInStock:
+                    changes.restockedSizes.append(size)
+                elif size.isInStock is False and wasInStock:
+                    changes.soldOutSizes.append(size)
+
+        return changes
+
+    def snapshot(self) -> 'Product':
+        """ See `ChangeTrackable.snapshot`. All sizes are copied. """
+        clone: Product = super().snapshot()
+        copies = {id(s): s.snapshot() for s in self.__sizes}
+        clone.__sizes = [copies[id(s)] for s in self.__sizes]
+        clone._changedChildren = {copies[id(s)]: None for s in self._changedChildren
+                                  if id(s) in copies} or self._NO_CHANGED_CHILDREN
+
+        # Keep object identities of the old sizes list consistent with the copies.
+        oldSizes = clone._changes.get("sizes")
+        if oldSizes is not None:
+            clone._changes["sizes"] = [copies.get(id(s), s) for s in oldSizes]
+
+        return clone
+
+    def __getSizeIndex(self, rebuild: bool = False) -> Dict[str, 'Size']:
+        # A count mismatch means that the sizes list has been changed in place.
+        if rebuild or self.__sizeIndex is None or self.__indexedSizeCount != len(self.__sizes):
+            index: Dict[str, Size] = dict()
+            for size in self.__sizes:
+                index.setdefault(size.sizeEU, size)
+            self.__sizeIndex = index
+            self.__indexedSizeCount = len(self.__sizes)
+        return self.__sizeIndex
+
+    def __markSizesChanged(self) -> None:
+        # Copy the list only once per commit.
+        if "sizes" not in self._changes:
+            self._markChanged("sizes", list(self.__sizes))
 
     @property
     def releaseDateStamp(self) -> Optional[float]:
@@ -125,6 +391,8 @@ class Product(Identifiable, Scrapable):
         """ Sets release date back to None.
         :return: None
         """
+        if self.__releaseDateStamp is not None:
+            self._markChanged("releaseDateStamp", self.__releaseDateStamp)
         self.__releaseDateStamp = None
 
     def getReleaseDate(self, forTimezone: str, forType: type) -> \
@@ -186,7 +454,10 @@ class Product(Identifiable, Scrapable):
             logger.error("Could not set product release date. %s", e, exc_info=True)
 
         else:
-            self.__releaseDateStamp = datetimeUTC.timestamp()
+            releaseDateStamp = datetimeUTC.timestamp()
+            if releaseDateStamp != self.__releaseDateStamp:
+                self._markChanged("releaseDateStamp", self.__releaseDateStamp)
+            self.__releaseDateStamp = releaseDateStamp
 
     def getPriceWithCurrency(self) -> str:
         if self.basePrice and self.currency:
@@ -218,20 +489,40 @@ class Product(Identifiable, Scrapable):
         return localAwareDatetime
 
 
-class Size(Identifiable):
+class Size(Identifiable, ChangeTrackable):
+    """ Size of a product. Changes of its attributes are tracked, see `ChangeTrackable`.
+    Instances have no __dict__ and the UID gets generated on first access, like `Product`.
+    """
+    __slots__ = ("__uid", "__sizeEU", "__price", "__url", "__urlAddToCart", "__isInStock",
+                 "_changes", "_trackingParent")
+
+    _DICT_KEYS: ClassVar[frozenset] = frozenset((
+        "uid", "sizeEU", "price", "url", "urlAddToCart", "isInStock"))
+    """ Keys of `toDict()` """
 
     def __init__(self, **kwargs):
-        self.__uid: str = kwargs.get("uid", self.generateUID())
+        self.__uid: Optional[str] = kwargs.get("uid", None)
         # Size itself must be str for patterns like '42 2/3'. None for unknown.
-        self.sizeEU: Optional[str] = kwargs.get("sizeEU", None)
+        self.__sizeEU: Optional[str] = _intern(kwargs.get("sizeEU", None))
         # Price None for unknown.
-        self.price: Optional[float] = kwargs.get("price", None)
+        self.__price: Optional[float] = kwargs.get("price", None)
         # URL None for unknown.
-        self.url: Optional[str] = kwargs.get("url", None)
+        self.__url: Optional[str] = kwargs.get("url", None)
         # addToCart url: None for unknown.
-        self.urlAddToCart: Optional[str] = kwargs.get("urlAddToCart", None)
+        self.__urlAddToCart: Optional[str] = kwargs.get("urlAddToCart", None)
         # In stock: None for unknown. Optionals won't not work for bool (as of Py 3.7.7)
-        self.isInStock: Optional[bool] = kwargs.get("isInStock", None)
+        self.__isInStock: Optional[bool] = kwargs.get("isInStock", None)
+        self._changes = dict()
+        self._trackingParent = None
+
+    def __getstate__(self) -> tuple:
+        # See Product.__getstate__
+        return (self.uid, self.__sizeEU, self.__price, self.__url, self.__urlAddToCart,
+                self.__isInStock, self._changes, self._trackingParent)
+
+    def __setstate__(self, state: tuple) -> None:
+        (self.__uid, self.__sizeEU, self.__price, self.__url, self.__urlAddToCart,
+         self.__isInStock, self._changes, self._trackingParent) = state
 
     def __repr__(self):
         info = f"<{self.__class__.__name__} uid: {self.uid}, sizeEU: {self.sizeEU}, " \
@@ -241,14 +532,103 @@ class Size(Identifiable):
 
         return info
 
+    def toDict(self) -> Dict[str, Any]:
+        """ Conversion to a dict of plain data types. Change tracking state is not included.
+
+        :return: The size as a dict
+        """
+        return {
+            "uid": self.uid,
+            "sizeEU": self.__sizeEU,
+            "price": self.__price,
+            "url": self.__url,
+            "urlAddToCart": self.__urlAddToCart,
+            "isInStock": self.__isInStock,
+        }
+
+    @classmethod
+    def fromDict(cls, data: Dict[str, Any]) -> 'Size':
+        """ Create a size from a dict as returned by `toDict()`.
+        The new size has no tracked changes.
+
+        :param data: A dict with keys like the keyword arguments of the constructor
+        :return: New Size object
+        """
+        return cls(**data)
+
+    def hasEqualValues(self, other: 'Size') -> bool:
+        """ Compare the values of `toDict()` with those of another size, without building
+        the dicts.
+
+        :param other: The size to compare with
+        :return: True if both sizes have equal values
+        """
+        if self is other: return True
+        return self.uid == other.uid and self.__sizeEU == other.__sizeEU \
+            and self.__price == other.__price and self.__url == other.__url \
+            and self.__urlAddToCart == other.__urlAddToCart \
+            and self.__isInStock == other.__isInStock
+
     @property
     def uid(self) -> str:
+        if self.__uid is None:
+            self.__uid = self.generateUID()
         return self.__uid
 
     @uid.setter
     def uid(self, val: str) -> None:
         self.__uid = val
 
+    @property
+    def sizeEU(self) -> Optional[str]:
+        return self.__sizeEU
+
+    @sizeEU.setter
+    def sizeEU(self, val: Optional[str]) -> None:
+        if val != self.__sizeEU:
+            self._markChanged("sizeEU", self.__sizeEU)
+        self.__sizeEU = _intern(val)
+
+    @property
+    def price(self) -> Optional[float]:
+        return self.__price
+
+    @price.setter
+    def price(self, val: Optional[float]) -> None:
+        if val != self.__price:
+            self._markChanged("price", self.__price)
+        self.__price = val
+
+    @property
+    def url(self) -> Optional[str]:
+        return self.__url
+
+    @url.setter
+    def url(self, val: Optional[str]) -> None:
+        if val != self.__url:
+            self._markChanged("url", self.__url)
+        self.__url = val
+
+    @property
+    def urlAddToCart(self) -> Optional[str]:
+        return self.__urlAddToCart
+
+    @urlAddToCart.setter
+    def urlAddToCart(self, val: Optional[str]) -> None:
+        if val != self.__urlAddToCart:
+            self._markChanged("urlAddToCart", self.__urlAddToCart)
+        self.__urlAddToCart = val
+
+    @property
+    def isInStock(self) -> Optional[bool]:
+        return self.__isInStock
+
+    @isInStock.setter
+    def isInStock(self, val: Optional[bool]) -> None:
+        if val != self.__isInStock:
+            self._markChanged("isInStock", self.__isInStock)
+        self.__isInStock = val
+
     @property
     def inStockReadable(self) -> str:
         # Explicitly ask for None. This is no glitch!
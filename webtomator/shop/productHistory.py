@@ -0,0 +1,200 @@
+# shop.productHistory.py
+import json
+import pathlib as pl
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import debug.logger as clog
+from config.base import APP_USERDATA_DIR
+from shop.product import Product
+from storage.recordFile import FixedRecordFile
+
+logger = clog.getLogger(__name__)
+
+
+class ProductHistory:
+    """ Compact history of product prices and size stock states.
+
+    Only changes are stored. Each product gets a numeric series ID. Records are fixed-size,
+    so the files are memory-mapped and scanned without loading them:
+        prices.bin: series ID (uint32), seconds since the file's base stamp (uint32),
+                    base price in cents (int32)
+        stock.bin:  series ID (uint32), seconds since the file's base stamp (uint32),
+                    stock bitmap (uint64), where bit i means: i-th known size is in stock.
+    The series index (index.json) maps product UIDs to series IDs, keeps the known sizes
+    of each product in bit order and the last stored values, so unchanged values
+    don't get stored again.
+    """
+    _DEFAULT_DIR = APP_USERDATA_DIR / "History"
+    _PRICE_FORMAT = "<IIi"
+    _STOCK_FORMAT = "<IIQ"
+    _MAX_SIZES = 64
+
+    def __init__(self, directory: pl.Path = None):
+        self.__directory: pl.Path = directory or self._DEFAULT_DIR
+        self.__indexPath: pl.Path = self.__directory / "index.json"
+        self.__series: Dict[str, dict] = self._loadIndex()
+        """ Series data by product UID: id, sizes, lastCents, lastStock, lastStamp """
+
+        baseStamp = int(time.time())
+        self.__prices = FixedRecordFile(self.__directory / "prices.bin",
+                                        self._PRICE_FORMAT, baseStamp)
+        self.__stock = FixedRecordFile(self.__directory / "stock.bin",
+                                       self._STOCK_FORMAT, baseStamp)
+        self.__pendingPrices: List[tuple] = list()
+        self.__pendingStock: List[tuple] = list()
+
+    @property
+    def hasPendingRecords(self) -> bool:
+        return bool(self.__pendingPrices or self.__pendingStock)
+
+    def record(self, products: Iterable[Product]) -> None:
+        """ Buffer the current price and stock state of the given products, if they
+        differ from their last recorded state. Call `flush()` to write them.
+
+        :param products: Scanned products
+        :return: None
+        """
+        for product in products:
+            if not product.uid: continue
+
+            series = self.__series.get(product.uid)
+            if series is None:
+                series = dict(id=len(self.__series), sizes=list(), lastCents=None,
+                              lastStock=None, lastStamp=None)
+                self.__series[product.uid] = series
+
+            stamp = product.lastScanStamp or time.time()
+            series["lastStamp"] = stamp
+
+            if product.basePrice is not None:
+                cents = int(round(product.basePrice * 100))
+                if cents != series["lastCents"]:
+                    series["lastCents"] = cents
+                    self.__pendingPrices.append(
+                        (series["id"], self._toOffset(stamp, self.__prices), cents))
+
+            stockBits = self._getStockBits(product, series)
+            if stockBits != series["lastStock"]:
+                series["lastStock"] = stockBits
+                self.__pendingStock.append(
+                    (series["id"], self._toOffset(stamp, self.__stock), stockBits))
+
+    def flush(self) -> None:
+        """ Write buffered records and the series index.
+
+        :return: None
+        :raises: On file errors. Buffered records are kept in that case.
+        """
+        if not self.hasPendingRecords: return
+
+        # Index first: Records of a series ID which is missing in the index would be
+        # assigned to another product after a restart.
+        self._saveIndex()  # raises
+        self.__prices.append(self.__pendingPrices)  # raises
+        self.__pendingPrices.clear()
+        self.__stock.append(self.__pendingStock)  # raises
+        self.__pendingStock.clear()
+
+    def getPriceSeries(self, productUID: str) -> List[Tuple[float, float]]:
+        """ Price changes of a product, oldest first. Only includes flushed records.
+
+        :param productUID: UID of the product
+        :return: List of (timestamp, price) tuples
+        """
+        series = self.__series.get(productUID)
+        if series is None: return list()
+
+        base = self.__prices.baseStamp
+        return [(base + offset, cents / 100)
+                for seriesID, offset, cents in self.__prices.iterRecords()
+                if seriesID == series["id"]]
+
+    def getStockSeries(self, productUID: str, sizeEU: str) -> List[Tuple[float, bool]]:
+        """ Stock changes of a product's size, oldest first. Only includes flushed records.
+
+        :param productUID: UID of the product
+        :param sizeEU: Size label of the product's size
+        :return: List of (timestamp, isInStock) tuples
+        """
+        bit = self._getSizeBit(productUID, sizeEU)
+        if bit is None: return list()
+
+        seriesID = self.__series[productUID]["id"]
+        base = self.__stock.baseStamp
+        results: List[Tuple[float, bool]] = list()
+
+        for recordSeriesID, offset, stockBits in self.__stock.iterRecords():
+            if recordSeriesID != seriesID: continue
+            isInStock = bool(stockBits & bit)
+            if not results or results[-1][1] != isInStock:
+                results.append((base + offset, isInStock))
+
+        return results
+
+    def getLastInStockStamp(self, productUID: str, sizeEU: str) -> Optional[float]:
+        """ When was the given size of a product last seen in stock? Scans the stock
+        history backwards, so recent results return fast. Only includes flushed records.
+
+        :param productUID: UID of the product
+        :param sizeEU: Size label of the product's size
+        :return: Timestamp of the last recorded scan if the size is still in stock. Else the
+                 timestamp at which it was detected as sold out. None if never seen in stock.
+        """
+        bit = self._getSizeBit(productUID, sizeEU)
+        if bit is None: return None
+
+        series = self.__series[productUID]
+        base = self.__stock.baseStamp
+        soldOutStamp = None
+
+        for recordSeriesID, offset, stockBits in self.__stock.iterRecords(reverse=True):
+            if recordSeriesID != series["id"]: continue
+            if stockBits & bit:
+                return series["lastStamp"] if soldOutStamp is None else soldOutStamp
+            soldOutStamp = base + offset
+
+        return None
+
+    def _getSizeBit(self, productUID: str, sizeEU: str) -> Optional[int]:
+        series = self.__series.get(productUID)
+        if series is None or sizeEU not in series["sizes"]: return None
+        return 1 << series["sizes"].index(sizeEU)
+
+    def _getStockBits(self, product: Product, series: dict) -> int:
+        knownSizes: List[str] = series["sizes"]
+        stockBits = 0
+
+        for size in product.sizes:
+            if not size.sizeEU: continue
+
+            if size.sizeEU not in knownSizes:
+                if len(knownSizes) >= self._MAX_SIZES:
+                    logger.warning("History supports max. %s sizes per product. Skipped size "
+                                   "%s of %s", self._MAX_SIZES, size.sizeEU, product.url)
+                    continue
+                knownSizes.append(size.sizeEU)
+
+            if size.isInStock:
+                stockBits |= 1 << knownSizes.index(size.sizeEU)
+
+        return stockBits
+
+    @staticmethod
+    def _toOffset(stamp: float, recordFile: FixedRecordFile) -> int:
+        # Timestamps before the file's base stamp are clamped to the base.
+        return min(max(0, int(stamp) - recordFile.baseStamp), 0xFFFFFFFF)
+
+    def _loadIndex(self) -> Dict[str, dict]:
+        if not self.__indexPath.is_file(): return dict()
+
+        with open(self.__indexPath, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _saveIndex(self) -> None:
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        tempPath = self.__indexPath.with_name(self.__indexPath.name + ".tmp")
+
+        with open(tempPath, "w", encoding="utf-8") as file:
+            json.dump(self.__series, file, separators=(",", ":"))
+        tempPath.replace(self.__indexPath)
@@ -9,7 +9,7 @@ from shop.productsUrlsDao import ProductsUrlsDao
 from shop.shop import Shop
 
 if TYPE_CHECKING:
-    from typing import Optional, List
+    from typing import Dict, Optional, List
     from storage.base import Dao
     from shop.product import Product
 
@@ -37,36 +37,33 @@ class ProductsUrlsRepo:
         if not products:
             return None
 
-        shops: List[Shop] = list()
-        shopsNetlocs: List[str] = list()
-        assignedProducts: List[Product] = list()
-
-        for product in reversed(products):
-            if product in assignedProducts: continue
+        # Group products by netloc in one pass. A shop gets created for a netloc if at least
+        # one of its product URLs has a scheme. The shop takes the scheme of the last one.
+        productsByNetloc: Dict[str, Dict[str, Product]] = dict()
+        shopSchemes: Dict[str, str] = dict()
+        lastPositions: Dict[str, int] = dict()
 
+        for position, product in enumerate(products):
             try:
-                urlParts = urlparse.urlparse(url=product.url)
-                productUrlScheme = urlParts.scheme
-                productNetloc = urlParts.netloc
+                urlParts = product.urlParts
 
             except Exception as e:
                 raise ValueError(f"URL could not be parsed into parts. {e}")
 
-            if not productUrlScheme or not productNetloc:
-                continue
-
-            if productNetloc in shopsNetlocs:
-                # Shop for this product already created, skip
-                continue
-
-            else:
-                # Create shop.
-                # Note: Leave shop.name empty, so it has a chance to become set by scraping.
-                shopsNetlocs.append(productNetloc)
-                shopURL = urlparse.urlunparse((productUrlScheme, productNetloc, '', '', '', ''))
-                shop = Shop(url=shopURL)
-                assignedProducts.extend(shop.assignProducts(products))
-                shops.append(shop)
+            if not urlParts.netloc: continue
+
+            # Of products with the same URL, keep the first one.
+            productsByNetloc.setdefault(urlParts.netloc, dict()).setdefault(product.url, product)
+            if urlParts.scheme:
+                shopSchemes[urlParts.netloc] = urlParts.scheme
+                lastPositions[urlParts.netloc] = position
+
+        # Shops in order of their last listed product, latest first.
+        shops: List[Shop] = list()
+        for netloc in sorted(shopSchemes, key=lastPositions.get, reverse=True):
+            # Note: Leave shop.name empty, so it has a chance to become set by scraping.
+            shopURL = urlparse.urlunsplit((shopSchemes[netloc], netloc, '', '', ''))
+            shops.append(Shop(url=shopURL, products=list(productsByNetloc[netloc].values())))
 
         if shops:
             return shops
@@ -3,13 +3,14 @@ from __future__ import annotations
 
 import asyncio
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, Set
 
 from bs4 import BeautifulSoup
 
 import debug.logger as clog
+from network.connection import Tools
 from scraper.base import Scraper
-from shop.product import Size
+from shop.product import ProductChanges
 
 if TYPE_CHECKING:
     from network.connection import Request
@@ -39,11 +40,29 @@ class ShopScraper(Scraper, ABC):
                          request=request,
                          messenger=messenger)
 
+        self._processedProductIds: Set[int] = set()
+        """ Object ids of all products which were processed in the current iteration. """
+
+        self._carriedOverProductIds: Set[int] = set()
+        """ Object ids of products which were missed in the last iteration because its
+        deadline exceeded. They are requested first in the next iteration. """
+
+        self._missedProductsCount = 0
+        """ Number of products which were missed in the last iteration. """
+
+        self._scanSizeChanges: Dict[int, ProductChanges] = dict()
+        """ Size changes of the products which are being scanned right now, by object id. """
+
     async def run(self) -> None:
         logger.debug("ShopScraper: run() called. %s", self._scrapee.url)
+        self._processedProductIds.clear()
         # Execute runMainItem and runAllLineItems concurrently,
         # but wait until BOTH are completed before returning.
         await asyncio.gather(self._requestShop(), self._requestAllProducts())
+        # Write all changes of this iteration at once.
+        self._flushScrapeeRepo()
+        self._missedProductsCount = 0
+        self._carriedOverProductIds.clear()
         uniIcon = "🔸" if self._failCount > 0 else "🔹"
         logger.info("%sShopScraper completed. Total fails: %d. %s",
                     uniIcon, self._failCount, self._scrapee.url)
@@ -62,17 +81,71 @@ class ShopScraper(Scraper, ABC):
             shopChanged = await self._setShopName(soup)
             self._scrapee.setLastScanNow()
             if shopChanged:
-                # Process things that have to be done when we got updated data for the shop
-                self._scrapeeRepo.update(shop=self._scrapee)
+                # Process things that have to be done when we got updated data for the shop.
+                # Written at the end of the iteration.
+                self._scrapeeRepo.scheduleUpdate(shop=self._scrapee)
 
     async def _requestAllProducts(self):
         logger.debug("Start requesting all products. %s", self._scrapee.url)
-        # Start product requests concurrently! This greatly decreases completion time.
-        productRunners = [self._requestProduct(product=p) for p in self._scrapee.products]
-        # But while waiting for all tasks to be completed, suspend me for other tasks.
-        await asyncio.gather(*productRunners)
+        # Queue all products, then let a bounded pool of workers consume the queue. Requests
+        # still run concurrently, but the number of open connections and parsed documents
+        # is capped by the scraper configuration - no matter how many products a shop has.
+        # Products which were missed in the last iteration go first.
+        carriedOverIds = self._carriedOverProductIds
+        products = sorted(self._scrapee.products, key=lambda p: id(p) not in carriedOverIds)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for product in products:
+            queue.put_nowait(product)
+
+        workerCount = min(self._fetchMaxConcurrency, queue.qsize())
+        workers = [self._runProductWorker(queue=queue) for _ in range(workerCount)]
+        # While waiting for all workers to be completed, suspend me for other tasks.
+        await asyncio.gather(*workers)
         logger.debug("All product requests completed. %s", self._scrapee.url)
 
+    async def _runProductWorker(self, queue: asyncio.Queue):
+        # Each worker processes one product completely before it takes the next one,
+        # so results are handled as soon as they come in.
+        while not queue.empty():
+            product: Product = queue.get_nowait()
+            try:
+                await self._requestProduct(product=product)
+
+            except Exception as e:
+                self._failCount += 1
+                logger.error("%s while requesting product. %s",
+                             Tools.getTypeString(e), product.url, exc_info=True)
+
+            finally:
+                queue.task_done()
+
+            # Not reached when the worker got cancelled while processing the product.
+            self._processedProductIds.add(id(product))
+
+    async def _onIterationDeadline(self) -> None:
+        missedProducts = [p for p in self._scrapee.products
+                          if id(p) not in self._processedProductIds]
+
+        self._missedProductsCount = len(missedProducts)
+        self._carriedOverProductIds = {id(p) for p in missedProducts}
+
+        logger.warning("ShopScraper missed %d of %d products. They will be requested first "
+                       "in the next iteration. %s",
+                       self._missedProductsCount, len(self._scrapee.products), self._scrapee.url)
+
+        # Commit everything we got so far.
+        self._scrapeeRepo.scheduleUpdate(shop=self._scrapee)
+        self._flushScrapeeRepo()
+
+    def _flushScrapeeRepo(self) -> None:
+        try:
+            self._scrapeeRepo.flush()
+
+        except Exception as e:
+            logger.error("Failed saving results of shop. %s %s",
+                         e, self._scrapee.url, exc_info=True)
+
     async def _requestProduct(self, product: Product):
         logger.debug("Request product %s", product.url)
         # Wait for heavy lift to be finished. Meanwhile, suspend me for other tasks.
@@ -83,56 +156,49 @@ class ShopScraper(Scraper, ABC):
         # Process the data we got
         if response.text:
             soup = BeautifulSoup(response.text, "html.parser")
-            results = await asyncio.gather(self._setProductName(soup, product),
-                                           self._setProductSizes(soup, product),
-                                           self._setProductPrice(soup, product),
-                                           self._setProductThumbUrl(soup, product),
-                                           self._setProductReleaseTime(soup, product))
+            oldBasePrice = product.basePrice
+            try:
+                results = await asyncio.gather(self._setProductName(soup, product),
+                                               self._setProductSizes(soup, product),
+                                               self._setProductPrice(soup, product),
+                                               self._setProductThumbUrl(soup, product),
+                                               self._setProductReleaseTime(soup, product))
+            finally:
+                changes = self._scanSizeChanges.pop(id(product), None) or ProductChanges()
+
+            # Changes of this scan only. Uncommitted changes of former scans don't count.
+            if product.basePrice != oldBasePrice:
+                changes.isPriceChanged = True
+                changes.oldBasePrice = oldBasePrice
             # Product completed
             product.setLastScanNow()
             logger.debug("Completed product %s", product.url)
             # Process things that have to be done when we got updated data for the product
+            if True in results or changes.isSizesChanged:
+                # Written at the end of the iteration. Also sold out sizes, which are not
+                # worth a message.
+                self._scrapeeRepo.scheduleUpdate(shop=self._scrapee)
             if True in results:
-                self._scrapeeRepo.update(shop=self._scrapee)
-                await self.sendMessage(productMsg=product, shop=self._scrapee)
+                await self.sendMessage(productMsg=product, shop=self._scrapee, changes=changes)
 
-    @staticmethod
-    def _processSizeChange(product: Product,
-                           sizeStr: str,
-                           isSizeInStock: bool) -> ProductChanged:
+    def _processSizes(self, product: Product, sizes: Dict[str, bool]) -> ProductChanged:
+        """ Apply the scraped sizes to the product. The changes get reported with the
+        product's message.
 
-        isProductChanged = False
+        :param product: The scraped product
+        :param sizes: In-stock state by scraped size string
+        :return: True if a size is new or has been restocked. Sold out sizes don't count,
+                 but their state gets updated as well, so messages are up-to-date.
+        """
+        changes = product.applySizeSnapshot(sizes)
+        self._scanSizeChanges[id(product)] = changes
 
-        # Check if scraped size already exists
-        foundSize: Size = product.findSize(sizeStr)
-
-        # If an existing size was found, copy its reference(!). Otherwise, take a new Size object.
-        size: Size = foundSize if foundSize else Size()
-
-        # 1.
-        # Scraped size does not exist at all, so add to product and mark product as changed.
-        if not foundSize:
-            size.sizeEU = sizeStr
-            product.addSize(size=size)
-            isProductChanged = True
+        for size in changes.newSizes:
             logger.debug("New size '%s' detected & added. %s", size.sizeEU, product.url)
-
-        # 2.
-        # Size already exists but its stock indicator is marked as unavailable, whereas the
-        # newly scraped size is marked as in-stock. Mark product as changed.
-        if not size.isInStock and isSizeInStock:
-            isProductChanged = True
+        for size in changes.restockedSizes:
             logger.debug("Size '%s' has been restocked. %s", size.sizeEU, product.url)
 
-        # 3.
-        # After comparison, set/update size stock indicator. Always update ALL
-        # found sizes as their availability may have changed to True or False and
-        # we have to be up-to-date in case we are sending a message.
-        # Note that 'size' var whether is a yet unrelated Size object or a reference
-        # to an existing product.size
-        size.isInStock = isSizeInStock
-
-        return isProductChanged
+        return bool(changes.newSizes or changes.restockedSizes)
 
     @abstractmethod
     async def _setShopName(self, soup: BeautifulSoup) -> ShopChanged:
@@ -70,19 +70,9 @@ class FootdistrictShopScraper(ShopScraper):
             self._failCount += 1
             return False
 
-        # Marks that at minimum one size of that product was out of stock, but now is in stock.
-        isProductChanged = False
-
-        for scrapedSizeStr, isScrapedInStock in zip(sizeList, isInStockList):
-
-            isSizeChanged = self._processSizeChange(
-                product=product, sizeStr=scrapedSizeStr, isSizeInStock=isScrapedInStock)
-
-            # Note that we never switch back to False!
-            if not isProductChanged:
-                isProductChanged = isSizeChanged
-
-        return isProductChanged
+        # True if at minimum one size of that product is new or was out of stock,
+        # but now is in stock.
+        return self._processSizes(product=product, sizes=dict(zip(sizeList, isInStockList)))
 
     async def _setProductPrice(self, soup: BeautifulSoup, product: Product) -> ProductChanged:
         """ We need to find & extract price and currency from the following JS code:
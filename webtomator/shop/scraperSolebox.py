@@ -85,17 +85,11 @@ class SoleboxShopScraper(ShopScraper):
 
         else:
             allSizes = sorted([e.text.strip() for e in allSizes])
-            availableSizes = sorted([e.text.strip() for e in availableSizes])
+            availableSizes = {e.text.strip() for e in availableSizes}
 
-            for scrapedSizeStr in allSizes:
-                isScrapedInStock = scrapedSizeStr in availableSizes
-
-                isSizeChanged = self._processSizeChange(
-                    product=product, sizeStr=scrapedSizeStr, isSizeInStock=isScrapedInStock)
-
-                # Note that we never switch back to False!
-                if not isProductChanged:
-                    isProductChanged = isSizeChanged
+            isProductChanged = self._processSizes(
+                product=product,
+                sizes={sizeStr: sizeStr in availableSizes for sizeStr in allSizes})
 
         return isProductChanged
 
@@ -1,24 +1,39 @@
 # shop.shop.py
 import debug.logger as clog
 import urllib.parse as urlparse
-from typing import List
+from typing import List, Dict, Any, Iterable, Optional
 
 from scraper.base import Scrapable
 from shop.product import Product
-from storage.base import Identifiable
+from storage.base import Identifiable, ChangeTrackable
 
 logger = clog.getLogger(__name__)
 
 
-class Shop(Identifiable, Scrapable):
+class Shop(Identifiable, Scrapable, ChangeTrackable):
     """ A scrapable shop.
+    Changes of its name, URL and products list are tracked, see `ChangeTrackable`.
+    Products may be decoded lazily, see `fromDict`. They are indexed by URL and report their
+    changes to the shop, so add and remove them by `addProduct()` and `removeProduct()` rather
+    than changing the list in place.
     """
     def __init__(self, **kwargs):
         self.__uid: str = kwargs.get("uid", self.generateUID())
         self.__name: str = kwargs.get("name", "")
         self.__url: str = kwargs.get("url", "")
         self.__products: List[Product] = kwargs.get("products", list())
-        self.__lastScanStamp: float = 0.0
+        self.__productItems: Optional[List[dict]] = None
+        """ Product dicts which have not been decoded yet. Never modified. """
+        self.__productIndex: Optional[Dict[str, Product]] = None
+        """ Products by URL. Built on first use. """
+        self.__productCopies: Optional[Dict[Product, Product]] = None
+        """ Snapshots only: Copies of changed products, which replace the originals in the
+        products list on first access. """
+        self.__lastScanStamp: float = kwargs.get("lastScanStamp", 0.0)
+        self._changes = dict()
+        self._changedChildren = self._NO_CHANGED_CHILDREN
+        for product in self.__products:
+            self._adoptChild(product)
 
     def __repr__(self):
         info = f"<{self.__class__.__name__} uid: {self.uid}, name: {self.name}, " \
@@ -27,7 +42,65 @@ class Shop(Identifiable, Scrapable):
         return info
 
     def __eq__(self, other):
-        return self.__repr__() == other.__repr__()
+        if self is other: return True
+        if not isinstance(other, Shop): return NotImplemented
+        # Compare values field by field, like the former comparison of repr() strings did,
+        # but return on the first difference. Cheap fields come first.
+        return self.__uid == other.__uid and self.__url == other.__url \
+            and self.__name == other.__name \
+            and self.__lastScanStamp == other.__lastScanStamp \
+            and self.__hasEqualProducts(other)
+
+    def toDict(self) -> Dict[str, Any]:
+        """ Deep conversion to a dict of plain data types, including all products and sizes.
+        Change tracking state is not included.
+
+        :return: The shop as a dict
+        """
+        return {
+            "uid": self.__uid,
+            "name": self.__name,
+            "url": self.__url,
+            "products": self.__encodeProducts(),
+            "lastScanStamp": self.__lastScanStamp,
+        }
+
+    @classmethod
+    def fromDict(cls, data: Dict[str, Any], lazyProducts: bool = False) -> 'Shop':
+        """ Create a shop, including its products and sizes, from a dict as returned
+        by `toDict()`. The new shop has no tracked changes.
+
+        :param data: A dict with keys like the keyword arguments of the constructor
+        :param lazyProducts: If True, the shop keeps the product dicts and decodes them on
+                             first access of its products. Until then, `toDict()` returns the
+                             product dicts as they are, if they are complete. The product
+                             dicts must not be modified afterwards.
+        :return: New Shop object
+        """
+        kwargs = dict(data)
+        productItems = kwargs.pop("products", list())
+
+        if lazyProducts:
+            shop = cls(**kwargs)
+            shop.__productItems = list(productItems)
+            return shop
+
+        kwargs["products"] = [Product.fromDict(p) for p in productItems]
+        return cls(**kwargs)
+
+    @property
+    def isProductsDecoded(self) -> bool:
+        """ False as long as lazily decoded products were not accessed. """
+        return self.__productItems is None
+
+    def getProductUrls(self) -> List[str]:
+        """ URLs of all products, without decoding lazily decoded products.
+
+        :return: List of URLs in order of the products
+        """
+        if self.__productItems is not None:
+            return [item.get("url", "") for item in self.__productItems]
+        return [p.url for p in self.products]
 
     @property
     def uid(self) -> str:
@@ -43,6 +116,8 @@ class Shop(Identifiable, Scrapable):
 
     @url.setter
     def url(self, val) -> None:
+        if val != self.__url:
+            self._markChanged("url", self.__url)
         self.__url = val
 
     @property
@@ -51,6 +126,8 @@ class Shop(Identifiable, Scrapable):
 
     @name.setter
     def name(self, val) -> None:
+        if val != self.__name:
+            self._markChanged("name", self.__name)
         self.__name = val
 
     @property
@@ -65,6 +142,10 @@ class Shop(Identifiable, Scrapable):
     def products(self) -> List[Product]:
         """ List of all product objects of this shop.
         """
+        if self.__productItems is not None:
+            self.__decodeProducts()
+        elif self.__productCopies is not None:
+            self.__applyProductCopies()
         return self.__products
 
     @products.setter
@@ -72,7 +153,20 @@ class Shop(Identifiable, Scrapable):
         if not productList: return
         # Type checking
         if all(isinstance(i, Product) for i in productList):
+            self.__markProductsChanged()
+            keptIds = {id(p) for p in productList}
+            for product in self.__products:
+                if id(product) not in keptIds:
+                    self._releaseChild(product)
+
+            committedIds = {id(p) for p in self._changes["products"]}
+            self.__productItems = None
             self.__products = productList
+            self.__productIndex = None
+            for product in productList:
+                self._adoptChild(product)
+                if id(product) not in committedIds:
+                    self._markChildChanged(product)
         else:
             raise TypeError(
                 "Could not set the shop's product list. All elements must be of type 'Product'.")
@@ -90,9 +184,13 @@ class Shop(Identifiable, Scrapable):
             raise TypeError(f"Could not add product {product} to shop. It must be an "
                             "instance of 'Product'")
 
-        urlDubs = len(list(filter(lambda p: p.url == product.url, self.__products)))
-        if urlDubs == 0:
+        index = self.__getProductIndex()
+        if product.url not in index:
+            self.__markProductsChanged()
             self.__products.append(product)
+            index[product.url] = product
+            self._adoptChild(product)
+            self._markChildChanged(product)
             logger.debug("Product added to shop '%s': %s", self.name, repr(product))
         else:
             logger.info("Product not added to shop, it's already registered: %s",
@@ -110,10 +208,133 @@ class Shop(Identifiable, Scrapable):
             raise TypeError(f"Could not remove product {product} from shop. It must be an "
                             "instance of 'Product'")
 
-        if product in self.__products:
+        index = self.__getProductIndex()
+        # Fall back to the list if the product's URL has been changed after adding it.
+        if index.get(product.url) is product or product in self.__products:
+            self.__markProductsChanged()
             self.__products.remove(product)
+            self._releaseChild(product)
+            if index.get(product.url) is product:
+                del index[product.url]
             logger.debug("Product removed from shop '%s': %s", self.name, repr(product))
 
+    def removeProducts(self, products: Iterable[Product]) -> None:
+        """ Remove multiple products from the shop's products list in one pass.
+
+        :param products: Products to be removed. Products which are not listed are ignored.
+        :return: None
+        """
+        removeIds = {id(p) for p in products}
+        if not any(id(p) in removeIds for p in self.products): return
+
+        self.__markProductsChanged()
+        keptProducts = list()
+        for product in self.__products:
+            if id(product) in removeIds:
+                self._releaseChild(product)
+            else:
+                keptProducts.append(product)
+        self.__products = keptProducts
+        self.__productIndex = None
+        logger.debug("%s products removed from shop '%s'", len(removeIds), self.name)
+
+    def findProduct(self, url: str) -> Optional[Product]:
+        """ Find a product by its URL. Takes constant time.
+        Note: If the URL of a listed product has been changed, the product is found by its
+        new URL only after a search for its former URL, or after the list has changed.
+
+        :param url: Complete URL of the product
+        :return: Product object if found, otherwise None
+        """
+        product = self.__getProductIndex().get(url)
+        if product is not None and product.url != url:
+            # The product's URL has been changed after it was indexed.
+            self.__productIndex = None
+            product = self.__getProductIndex().get(url)
+        return product
+
+    def getChangedProducts(self) -> List[Product]:
+        """ Products which were added or changed since the last commit, in order of their
+        first change. Takes time by the count of changed products.
+
+        :return: List of products, empty if there are no changes
+        """
+        # Added products are registered as changed, but may have no changes of their own.
+        isListChanged = "products" in self._changes
+        return [p for p in self._changedChildren if isListChanged or p.isChanged]
+
+    def snapshot(self) -> 'Shop':
+        """ See `ChangeTrackable.snapshot`. Changed products are copied. The products list
+        is copied without looking at its products, which get replaced by their copies on
+        first access of the snapshot's products. """
+        clone: Shop = super().snapshot()
+        clone._changedChildren = self._NO_CHANGED_CHILDREN
+        if self.__productItems is not None:
+            # Shares the product dicts, which are never modified.
+            return clone
+
+        copies = {p: p.snapshot() for p in self.getChangedProducts()}
+        clone._changedChildren = dict.fromkeys(copies.values()) or self._NO_CHANGED_CHILDREN
+        clone.__products = list(self.products)
+        clone.__productCopies = copies or None
+        clone.__productIndex = None
+        return clone
+
+    def __markProductsChanged(self) -> None:
+        # Copy the list only once per commit.
+        if "products" not in self._changes:
+            self._markChanged("products", list(self.products))
+
+    def __getProductIndex(self) -> Dict[str, Product]:
+        products = self.products
+        # A length mismatch means that the list has been changed in place, or that it holds
+        # products with the same URL, of which only the first one is indexed.
+        if self.__productIndex is None or len(self.__productIndex) != len(products):
+            index: Dict[str, Product] = dict()
+            for product in products:
+                index.setdefault(product.url, product)
+            self.__productIndex = index
+        return self.__productIndex
+
+    def __hasEqualProducts(self, other: 'Shop') -> bool:
+        if self.__productItems is None and other.__productItems is None:
+            products, otherProducts = self.products, other.products
+            return len(products) == len(otherProducts) \
+                and all(p.hasEqualValues(o) for p, o in zip(products, otherProducts))
+
+        # Don't decode the products of a lazily loaded shop only to compare them. Compare its
+        # dicts, which are there anyway.
+        items = self.__encodeProducts() if self.__productItems is not None else self.products
+        otherItems = other.__encodeProducts() if other.__productItems is not None \
+            else other.products
+        return len(items) == len(otherItems) \
+            and all(Shop.__asProductDict(item) == Shop.__asProductDict(o)
+                    for item, o in zip(items, otherItems))
+
+    @staticmethod
+    def __asProductDict(item: Any) -> dict:
+        return item.toDict() if isinstance(item, Product) else item
+
+    def __decodeProducts(self) -> None:
+        self.__products = [Product.fromDict(item) for item in self.__productItems]
+        self.__productItems = None
+        self.__productIndex = None
+        for product in self.__products:
+            self._adoptChild(product)
+
+    def __applyProductCopies(self) -> None:
+        copies = self.__productCopies
+        self.__products = [copies.get(p, p) for p in self.__products]
+        self.__productCopies = None
+
+    def __encodeProducts(self) -> List[dict]:
+        if self.__productItems is not None:
+            if all(Product.isPlainDict(item) for item in self.__productItems):
+                return list(self.__productItems)
+            # Incomplete dicts would be completed by decoding, e.g. with a new UID.
+            self.__decodeProducts()
+        return [p.toDict() for p in self.products]
+
     def getNetloc(self) -> str:
         """Returns netloc of the shop's URL, as of:
         <scheme>://<netloc>/<path>?<query>#<fragment>
@@ -140,9 +361,9 @@ class Shop(Identifiable, Scrapable):
         if not products:
             return matchingProducts
 
+        shopNetloc = self.getNetloc()
         for product in products:
-            netloc = urlparse.urlsplit(product.url).netloc
-            if netloc == self.getNetloc():
+            if product.urlParts.netloc == shopNetloc:
                 self.addProduct(product)
                 matchingProducts.append(product)
 
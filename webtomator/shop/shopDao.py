@@ -1,15 +1,17 @@
 # shop.shopDao.py
-import json
-from typing import ClassVar, Optional, List, Union
+import sqlite3
+from collections import defaultdict
+from typing import ClassVar, Optional, List, Union, Dict, Tuple, Iterable, Iterator, Set
 import pathlib as pl
 
-import tinydb as tdb
-
 import debug.logger as clog
 from config.base import APP_USERDATA_DIR
 from shop.product import Product, Size
 from shop.shop import Shop
-from storage.tinyDao import TinyDao
+from storage.base import Dao
+from storage.journal import JsonlJournal
+from storage.sqliteDao import SqliteDao
+from storage.tinyDao import TinyDao, TinyConnection
 
 logger = clog.getLogger(__name__)
 
@@ -18,9 +20,16 @@ class TinyShopDao(TinyDao):
     _TABLE_NAME: ClassVar[str] = "Shops"
     _DEFAULT_PATH: ClassVar = APP_USERDATA_DIR / "Shops.json"
 
-    def __init__(self, path: pl.Path = None):
+    def __init__(self, path: pl.Path = None, lazyProducts: bool = False):
+        """ Constructor
+
+        :param path: Full path of the database file
+        :param lazyProducts: If True, loaded shops decode their products on first access,
+                             see `Shop.fromDict`.
+        """
         path = path or self._DEFAULT_PATH
         super().__init__(path=path, table=self._TABLE_NAME)
+        self._lazyProducts = lazyProducts
 
     def saveAll(self, data: List[Shop]) -> None:
         """ Overwrite all Shop data at the target DB with a given Shop list.
@@ -33,13 +42,10 @@ class TinyShopDao(TinyDao):
         if (not isinstance(data, list)) or (not all(isinstance(i, Shop) for i in data)):
             raise TypeError("Could not save Shops. All elements must be of type 'Shop'.")
 
-        # Delete all data of the 'Shops' table
-        super().saveAll(list())  # raises
-
-        # Add given shops to table
-        shops = data
-        for shop in shops:
-            self.insert(shop)
+        # Encode all shops first, then replace the table's data with one bulk insert.
+        # Inserting shop by shop would rewrite the whole file for each shop.
+        shopItems = [self._encodeShop(shop) for shop in data]  # raises
+        super().saveAll(shopItems)  # raises
 
     def loadAll(self) -> Optional[List[Shop]]:
         """ Load all shops from the target DB as a list with Shop elements.
@@ -49,7 +55,7 @@ class TinyShopDao(TinyDao):
         # shopItems is a list of dict objects, generated by a TinyDB table query
         shopItems = super().loadAll()  # raises
         # Decode these dict objects into a list of Shop objects
-        shops = self._decodeShops(shopItems)
+        shops = self._decodeShops(shopItems, lazyProducts=self._lazyProducts)
         return shops if len(shops) > 0 else None
 
     def insert(self, data: Shop) -> None:
@@ -70,10 +76,13 @@ class TinyShopDao(TinyDao):
         # Insert record.
         super().insert(dataDict)  # raises
 
-    def update(self, data: Shop) -> None:
+    def update(self, data: Shop, changesOnly: bool = False) -> None:
         """ Updates a Shop record (inside the 'Shops' table) with the given Shop object.
 
         :param data: Shop object
+        :param changesOnly: If True, only fields and products which changed since the shop's
+                            last commit are encoded and written. The shop's persistent record
+                            is expected to match its last committed state.
         :return: None
         :raises:
         """
@@ -82,12 +91,44 @@ class TinyShopDao(TinyDao):
         if not isinstance(data, Shop):
             raise TypeError("Could not update Shop. Argument 'data' must be of type 'Shop'.")
 
+        if changesOnly and not data.isChanged:
+            logger.debug("Shop has no changes, skipping update. %s", data.url)
+            return
+
+        # Added or removed products change the structure of the products list, so we'll
+        # write the whole record in that case.
+        if changesOnly and "products" not in data.changedFields:
+            self._updateChanges(data)  # raises
+            return
+
         # Deep conversion: Shop object to dict, which is the expected data type of super.update()
         dataDict = self._encodeShop(data)  # raises
 
         # Update record.
         super().update(data=dataDict)  # raises
 
+    def _updateChanges(self, shop: Shop) -> None:
+        """ Writes changed shop fields and changed products only.
+
+        :param shop: Shop object
+        :return: None
+        :raises:
+        """
+        if not shop.uid:
+            raise ValueError("Failed updating shop changes. The shop has no UID.")
+
+        shopFields = {name: getattr(shop, name) for name in shop.changedFields}
+        shopFields["lastScanStamp"] = shop.lastScanStamp
+        changedProductsByUID = {p.uid: self._encodeProduct(p) for p in shop.getChangedProducts()}
+
+        def applyChanges(record: dict) -> None:
+            record.update(shopFields)
+            if changedProductsByUID:
+                record["products"] = [changedProductsByUID.get(p.get("uid"), p)
+                                      for p in record.get("products", list())]
+
+        self._updateByUID(uid=shop.uid, fields=applyChanges)  # raises
+
     def find(self, **kwargs) -> Union[Shop, List[Shop]]:
         """ Find one ore more shops, depending on given args.
 
@@ -113,14 +154,14 @@ class TinyShopDao(TinyDao):
         :return: A Shop if one single Shop was found
         :raises: When UID was not found, or multiple UIDs were found
         """
-        uidQuery = tdb.Query().uid == uid  # prepare statement
-        results = super().find(condition=uidQuery)  # raises
+        results = self._findByField("uid", uid)  # raises
 
         if isinstance(results, list):
             foundCount = len(results)
 
             if foundCount == 1:
-                decodedShops = self._decodeShops(shopItems=results)
+                decodedShops = self._decodeShops(shopItems=results,
+                                                 lazyProducts=self._lazyProducts)
                 return decodedShops[0]
 
             elif foundCount == 0:
@@ -136,14 +177,14 @@ class TinyShopDao(TinyDao):
         :return: List of shops if found, else raises
         :raises: When no shop was found
         """
-        shopNameQuery = tdb.Query().name == name  # prepare statement
-        results = super().find(condition=shopNameQuery)  # raises
+        results = self._findByField("name", name)  # raises
 
         if isinstance(results, list):
             foundCount = len(results)
 
             if foundCount > 0:
-                decodedShops = self._decodeShops(shopItems=results)
+                decodedShops = self._decodeShops(shopItems=results,
+                                                 lazyProducts=self._lazyProducts)
                 return decodedShops
 
             else:
@@ -151,46 +192,769 @@ class TinyShopDao(TinyDao):
 
     @classmethod
     def _encodeShop(cls, shop: Shop) -> dict:
-        # Object to dict to JSON string (traverse)
-        shopJsonStr = json.dumps(shop.__dict__, default=lambda o: o.__dict__)  # raises
-
-        # Key names are usually autogenerated from the attribute name. For attributes
-        # which hold an instance of a different class, the __dict__ hook generates
-        # a concatenated qualified key name.
-        # Ex.: Attribute 'products' in class 'Shop' holds a list of 'Product' objects. This
-        # becomes a qualified key name '_Shop__products'.
-        # Replace these keys named e.g. '_Shop__products' with 'products' etc.
-        shopJsonStr = shopJsonStr \
-            .replace(f"_{Shop.__name__}__", "") \
-            .replace(f"_{Product.__name__}__", "") \
-            .replace(f"_{Size.__name__}__", "")
-
-        # Convert final JSON string to dict
-        return json.loads(shopJsonStr)  # raises
+        # Deep conversion of the shop with all its products and sizes
+        return shop.toDict()
+
+    @classmethod
+    def _encodeProduct(cls, product: Product) -> dict:
+        # Deep conversion of the product with all its sizes
+        return product.toDict()
 
     @classmethod
-    def _decodeShops(cls, shopItems: List[dict]) -> List[Shop]:
-        decodedShops: List[Shop] = list()
-        for shopItem in shopItems:
-            shopItem: tdb.database.Document
-            shop = Shop(**shopItem)
-            shop.products = cls._decodeProducts(shop.products)
-            decodedShops.append(shop)
-        return decodedShops
+    def _decodeShops(cls, shopItems: List[dict], lazyProducts: bool = False) -> List[Shop]:
+        # Note: Decoded shops have no tracked changes, as their state equals persistent state.
+        return [Shop.fromDict(shopItem, lazyProducts=lazyProducts) for shopItem in shopItems]
 
     @classmethod
     def _decodeProducts(cls, productItems: list) -> List[Product]:
-        decodedProducts: List[Product] = list()
-        for productItem in productItems:
-            product = Product(**productItem)
-            product.sizes = cls._decodeSizes(product.sizes)
-            decodedProducts.append(product)
-        return decodedProducts
+        return [Product.fromDict(productItem) for productItem in productItems]
 
     @classmethod
     def _decodeSizes(cls, sizeItems: list) -> List[Size]:
-        decodedSizes: List[Size] = list()
-        for sizeItem in sizeItems:
-            size = Size(**sizeItem)
-            decodedSizes.append(size)
-        return decodedSizes
\ No newline at end of file
+        return [Size.fromDict(sizeItem) for sizeItem in sizeItems]
+
+
+class ShardedTinyShopDao(TinyDao):
+    """ Stores each shop in its own TinyDB file '<shop uid>.json' inside a directory. A
+    manifest file in that directory lists all shops with their shard file, name and URL.
+    Updating a shop only rewrites the shop's shard, so shops don't share one big file.
+    """
+    _TABLE_NAME: ClassVar[str] = "Manifest"
+    _MANIFEST_FILENAME: ClassVar[str] = "manifest.json"
+    _DEFAULT_DIR: ClassVar = APP_USERDATA_DIR / "Shops"
+
+    def __init__(self, directory: pl.Path = None, lazyProducts: bool = False):
+        """ Constructor
+
+        :param directory: Directory of the shard files and the manifest
+        :param lazyProducts: See TinyShopDao
+        """
+        self.__directory: pl.Path = directory or self._DEFAULT_DIR
+        self.__lazyProducts = lazyProducts
+        super().__init__(path=self.__directory / self._MANIFEST_FILENAME, table=self._TABLE_NAME)
+
+    def __enter__(self):
+        # Create shards directory and manifest if not exist.
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        if not self.connection.path.is_file():
+            self.connection.path.touch(exist_ok=False)
+        return super().__enter__()
+
+    @property
+    def directory(self) -> pl.Path:
+        return self.__directory
+
+    def getShardPath(self, uid: str) -> pl.Path:
+        """ Path of the shard file which holds the shop with the given UID. """
+        return self.__directory / f"{uid}.json"
+
+    def loadAll(self) -> Optional[List[Shop]]:
+        """ Load all shops of all shards as a list with Shop elements,
+        in order of the manifest.
+
+        :return: A Shop list if non-empty Shops where found, else None
+        """
+        shops = [self._loadShard(entry["uid"]) for entry in super().loadAll()]  # raises
+        return shops if len(shops) > 0 else None
+
+    def saveAll(self, data: List[Shop]) -> None:
+        """ Overwrite all shards and the manifest with a given Shop list. Shards of shops
+        which are not in the list get deleted.
+
+        :param data: A list of Shop objects.
+        :return: None
+        :raises:
+        """
+        # Type check
+        if (not isinstance(data, list)) or (not all(isinstance(i, Shop) for i in data)):
+            raise TypeError("Could not save Shops. All elements must be of type 'Shop'.")
+
+        for shop in data:
+            self._saveShard(shop)  # raises
+
+        savedUIDs = {shop.uid for shop in data}
+        for entry in super().loadAll():  # raises
+            if entry["uid"] not in savedUIDs:
+                self._deleteShard(entry["uid"])
+
+        super().saveAll([self._encodeManifestEntry(shop) for shop in data])  # raises
+
+    def deleteAll(self) -> None:
+        """ Deletes all shards and purges the manifest.
+
+        :return: None
+        :raises:
+        """
+        for entry in super().loadAll():  # raises
+            self._deleteShard(entry["uid"])
+
+        super().deleteAll()  # raises
+
+    def insert(self, data: Shop) -> None:
+        """ Adds a Shop as a new shard and lists it in the manifest.
+
+        :param data: Shop object
+        :return: None
+        :raises:
+        """
+        if not isinstance(data, Shop):
+            raise TypeError("Could not save Shop. Argument 'data' must be of type 'Shop'.")
+
+        self._saveShard(data)  # raises
+        super().insert(self._encodeManifestEntry(data))  # raises
+
+    def update(self, data: Shop, changesOnly: bool = False) -> None:
+        """ Updates the shard of the given Shop object. The manifest gets only written
+        if the shop's name or URL changed.
+
+        :param data: Shop object
+        :param changesOnly: See TinyShopDao.update
+        :return: None
+        :raises: LookupError if the shop is not listed in the manifest
+        """
+        if not isinstance(data, Shop):
+            raise TypeError("Could not update Shop. Argument 'data' must be of type 'Shop'.")
+
+        if changesOnly and not data.isChanged:
+            logger.debug("Shop has no changes, skipping update. %s", data.url)
+            return
+
+        entries = self._findByField("uid", data.uid)  # raises
+        if not entries:
+            raise LookupError(f"Failed updating shard. UID {data.uid} not found in manifest "
+                              f"{self.connection.path}")
+
+        with TinyShopDao(path=self.getShardPath(data.uid)) as shard:
+            shard.update(data=data, changesOnly=changesOnly)  # raises
+
+        manifestEntry = self._encodeManifestEntry(data)
+        if any(entries[0].get(key) != value for key, value in manifestEntry.items()):
+            super().update(data=manifestEntry)  # raises
+
+    def find(self, **kwargs) -> Union[Shop, List[Shop]]:
+        """ Find one ore more shops, depending on given args. Only the shards of
+        matching shops are loaded.
+
+        :param kwargs: 'uid': Find a Shop by its UID.
+                       'shopName': Find shops by name.
+        :return: A Shop list if Shops where found (or a single Shop -
+                 depends on kwargs).
+        :raises: If no shops were found.
+        """
+        if "uid" in kwargs:
+            uid = kwargs["uid"]
+            entries = self._findByField("uid", uid)  # raises
+            if not entries:
+                raise LookupError(f"No shops found with UID {uid}")
+            return self._loadShard(uid)
+
+        elif "shopName" in kwargs:
+            name = kwargs["shopName"]
+            entries = self._findByField("name", name)  # raises
+            if not entries:
+                raise LookupError(f"No shops found with name '{name}'")
+            return [self._loadShard(entry["uid"]) for entry in entries]
+
+        else:
+            raise KeyError(f"Shop search fail. None of the expected arguments were given. "
+                           f"kwargs: {kwargs}")
+
+    def _loadShard(self, uid: str) -> Shop:
+        with TinyShopDao(path=self.getShardPath(uid), lazyProducts=self.__lazyProducts) as shard:
+            return shard.find(uid=uid)  # raises
+
+    def _saveShard(self, shop: Shop) -> None:
+        if not shop.uid:
+            raise ValueError("Could not save Shop shard. The shop has no UID.")
+
+        shardPath = self.getShardPath(shop.uid)
+        if not shardPath.is_file():
+            shardPath.touch(exist_ok=False)
+        with TinyShopDao(path=shardPath) as shard:
+            shard.saveAll(data=[shop])  # raises
+
+    def _deleteShard(self, uid: str) -> None:
+        shardPath = self.getShardPath(uid)
+        # Drop a possibly shared connection first, else its next flush would recreate the file.
+        TinyConnection.closeShared(shardPath)
+        shardPath.unlink(missing_ok=True)
+
+    @staticmethod
+    def _encodeManifestEntry(shop: Shop) -> dict:
+        try:
+            netloc = shop.getNetloc()
+        except ValueError:
+            netloc = ""
+        return dict(uid=shop.uid, name=shop.name, url=shop.url, netloc=netloc)
+
+
+class SqliteShopDao(SqliteDao):
+    """ Stores shops, products and sizes in normalized SQLite tables. In contrast to
+    TinyShopDao, an update writes the changed rows only instead of the whole database.
+    List order of products and sizes is kept by a 'position' column.
+    """
+    _DEFAULT_PATH: ClassVar = APP_USERDATA_DIR / "Shops.sqlite"
+
+    _SHOP_COLUMNS: ClassVar[Tuple[str, ...]] = (
+        "uid", "name", "url", "netloc", "lastScanStamp")
+
+    _PRODUCT_COLUMNS: ClassVar[Tuple[str, ...]] = (
+        "uid", "shopUid", "position", "name", "url", "basePrice", "currency", "urlThumb",
+        "releaseDateStamp", "lastScanStamp")
+
+    _SIZE_COLUMNS: ClassVar[Tuple[str, ...]] = (
+        "uid", "productUid", "position", "sizeEU", "price", "url", "urlAddToCart", "isInStock")
+
+    # Note: Prices are declared without type, so SQLite keeps ints and floats as they were
+    # given. Otherwise a loaded shop would not compare equal to the saved one.
+    _SCHEMA: ClassVar[Tuple[str, ...]] = (
+        """CREATE TABLE IF NOT EXISTS shops (
+            uid TEXT PRIMARY KEY NOT NULL,
+            name TEXT,
+            url TEXT,
+            netloc TEXT,
+            lastScanStamp REAL)""",
+        "CREATE INDEX IF NOT EXISTS idx_shops_url ON shops (url)",
+        "CREATE INDEX IF NOT EXISTS idx_shops_netloc ON shops (netloc)",
+        "CREATE INDEX IF NOT EXISTS idx_shops_name ON shops (name)",
+        """CREATE TABLE IF NOT EXISTS products (
+            uid TEXT PRIMARY KEY NOT NULL,
+            shopUid TEXT NOT NULL REFERENCES shops (uid) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            name TEXT,
+            url TEXT,
+            basePrice,
+            currency TEXT,
+            urlThumb TEXT,
+            releaseDateStamp REAL,
+            lastScanStamp REAL)""",
+        "CREATE INDEX IF NOT EXISTS idx_products_shop ON products (shopUid, position)",
+        "CREATE INDEX IF NOT EXISTS idx_products_url ON products (url)",
+        """CREATE TABLE IF NOT EXISTS sizes (
+            uid TEXT PRIMARY KEY NOT NULL,
+            productUid TEXT NOT NULL REFERENCES products (uid) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            sizeEU TEXT,
+            price,
+            url TEXT,
+            urlAddToCart TEXT,
+            isInStock INTEGER)""",
+        "CREATE INDEX IF NOT EXISTS idx_sizes_product ON sizes (productUid, position)",
+    )
+
+    def __init__(self, path: pl.Path = None):
+        path = path or self._DEFAULT_PATH
+        super().__init__(path=path)
+
+    def loadAll(self) -> Optional[List[Shop]]:
+        """ Load all shops from the target DB as a list with Shop elements.
+
+        :return: A Shop list if non-empty Shops where found, else None
+        """
+        shops = self._selectShops()  # raises
+        return shops if len(shops) > 0 else None
+
+    def saveAll(self, data: List[Shop]) -> None:
+        """ Overwrite all Shop data at the target DB with a given Shop list.
+
+        :param data: A list of Shop objects.
+        :return: None
+        :raises:
+        """
+        # Type check
+        if (not isinstance(data, list)) or (not all(isinstance(i, Shop) for i in data)):
+            raise TypeError("Could not save Shops. All elements must be of type 'Shop'.")
+
+        self.connection.raiseWhenDisconnected()  # raises
+
+        with self.connection.db as db:
+            db.execute("DELETE FROM shops")
+            for shop in data:
+                self._upsertShop(db, shop)
+                self._syncProducts(db, shop)
+
+    def deleteAll(self) -> None:
+        """ Deletes all shops including their products and sizes.
+
+        :return: None
+        :raises:
+        """
+        self.connection.raiseWhenDisconnected()  # raises
+
+        with self.connection.db as db:
+            db.execute("DELETE FROM shops")
+
+    def insert(self, data: Shop) -> None:
+        """ Adds a Shop record to the DB.
+
+        :param data: Shop object
+        :return: None
+        :raises: sqlite3.IntegrityError if a shop with the same UID already exists
+        """
+        if not isinstance(data, Shop):
+            raise TypeError("Could not save Shop. Argument 'data' must be of type 'Shop'.")
+
+        self.connection.raiseWhenDisconnected()  # raises
+
+        with self.connection.db as db:
+            db.execute(f"INSERT INTO shops ({', '.join(self._SHOP_COLUMNS)}) "
+                       f"VALUES ({', '.join('?' * len(self._SHOP_COLUMNS))})",
+                       self._getShopRow(data))
+            self._syncProducts(db, data)
+
+    def update(self, data: Shop, changesOnly: bool = False) -> None:
+        """ Updates a Shop record with the given Shop object.
+
+        :param data: Shop object
+        :param changesOnly: If True, only rows of the shop, products and sizes which changed
+                            since the shop's last commit are written.
+        :return: None
+        :raises: LookupError if the shop's UID does not exist
+        """
+        if not isinstance(data, Shop):
+            raise TypeError("Could not update Shop. Argument 'data' must be of type 'Shop'.")
+
+        if not data.uid:
+            raise ValueError("Failed updating database. The shop's 'uid' value is empty.")
+
+        if changesOnly and not data.isChanged:
+            logger.debug("Shop has no changes, skipping update. %s", data.url)
+            return
+
+        self.connection.raiseWhenDisconnected()  # raises
+
+        with self.connection.db as db:
+            if not db.execute("SELECT 1 FROM shops WHERE uid = ?", (data.uid,)).fetchone():
+                raise LookupError(f"Failed updating database. UID {data.uid} not found "
+                                  "in table 'shops'")
+
+            self._upsertShop(db, data)
+
+            if changesOnly and "products" not in data.changedFields:
+                for position, product in enumerate(data.products):
+                    if product.isChanged:
+                        self._upsertProducts(db, data.uid, [(position, product)])
+                        self._writeSizeChanges(db, product)
+            else:
+                self._syncProducts(db, data)
+
+    def find(self, **kwargs) -> Union[Shop, List[Shop]]:
+        """ Find one ore more shops, depending on given args.
+
+        :param kwargs: 'uid': Find a Shop by its UID.
+                       'shopName': Find shops by name.
+        :return: A Shop list if Shops where found (or a single Shop -
+                 depends on kwargs).
+        :raises: If no shops were found.
+        """
+        if "uid" in kwargs:
+            uid = kwargs["uid"]
+            results = self._selectShops("WHERE uid = ?", (uid,))  # raises
+            if not results:
+                raise LookupError(f"No shops found with UID {uid}")
+            return results[0]
+
+        elif "shopName" in kwargs:
+            name = kwargs["shopName"]
+            results = self._selectShops("WHERE name = ?", (name,))  # raises
+            if not results:
+                raise LookupError(f"No shops found with name '{name}'")
+            return results
+
+        else:
+            raise KeyError(f"Shop search fail. None of the expected arguments were given. "
+                           f"kwargs: {kwargs}")
+
+    def _selectShops(self, where: str = "", params: tuple = ()) -> List[Shop]:
+        self.connection.raiseWhenDisconnected()  # raises
+        db = self.connection.db
+
+        shopRows = db.execute(f"SELECT * FROM shops {where} ORDER BY rowid", params).fetchall()
+        if not shopRows:
+            return list()
+
+        shopUids = [row["uid"] for row in shopRows]
+        shopFilter = f"WHERE shopUid IN ({', '.join('?' * len(shopUids))})" if where else ""
+        shopParams = tuple(shopUids) if where else ()
+
+        sizesByProductUid: Dict[str, List[Size]] = defaultdict(list)
+        for row in db.execute(
+                "SELECT sizes.* FROM sizes "
+                "JOIN products ON sizes.productUid = products.uid "
+                f"{shopFilter} ORDER BY sizes.productUid, sizes.position", shopParams):
+            sizesByProductUid[row["productUid"]].append(self._decodeSizeRow(row))
+
+        productsByShopUid: Dict[str, List[Product]] = defaultdict(list)
+        for row in db.execute(
+                f"SELECT * FROM products {shopFilter} ORDER BY shopUid, position", shopParams):
+            product = Product(uid=row["uid"],
+                              name=row["name"],
+                              url=row["url"],
+                              basePrice=row["basePrice"],
+                              currency=row["currency"],
+                              sizes=sizesByProductUid.get(row["uid"], list()),
+                              urlThumb=row["urlThumb"],
+                              releaseDateStamp=row["releaseDateStamp"],
+                              lastScanStamp=row["lastScanStamp"])
+            productsByShopUid[row["shopUid"]].append(product)
+
+        return [Shop(uid=row["uid"],
+                     name=row["name"],
+                     url=row["url"],
+                     products=productsByShopUid.get(row["uid"], list()),
+                     lastScanStamp=row["lastScanStamp"])
+                for row in shopRows]
+
+    @staticmethod
+    def _decodeSizeRow(row: sqlite3.Row) -> Size:
+        isInStock = row["isInStock"]
+        return Size(uid=row["uid"],
+                    sizeEU=row["sizeEU"],
+                    price=row["price"],
+                    url=row["url"],
+                    urlAddToCart=row["urlAddToCart"],
+                    isInStock=None if isInStock is None else bool(isInStock))
+
+    @classmethod
+    def _getShopRow(cls, shop: Shop) -> tuple:
+        try:
+            netloc = shop.getNetloc()
+        except ValueError:
+            netloc = ""
+        return shop.uid, shop.name, shop.url, netloc, shop.lastScanStamp
+
+    @classmethod
+    def _getUpsertStatement(cls, table: str, columns: Tuple[str, ...]) -> str:
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "uid")
+        return (f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (uid) DO UPDATE SET {updates}")
+
+    def _upsertShop(self, db: sqlite3.Connection, shop: Shop) -> None:
+        db.execute(self._getUpsertStatement("shops", self._SHOP_COLUMNS), self._getShopRow(shop))
+
+    def _upsertProducts(self, db: sqlite3.Connection, shopUid: str,
+                        products: Iterable[Tuple[int, Product]]) -> None:
+        db.executemany(
+            self._getUpsertStatement("products", self._PRODUCT_COLUMNS),
+            ((p.uid, shopUid, position, p.name, p.url, p.basePrice, p.currency, p.urlThumb,
+              p.releaseDateStamp, p.lastScanStamp) for position, p in products))
+
+    def _upsertSizes(self, db: sqlite3.Connection, productUid: str,
+                     sizes: Iterable[Tuple[int, Size]]) -> None:
+        db.executemany(
+            self._getUpsertStatement("sizes", self._SIZE_COLUMNS),
+            ((s.uid, productUid, position, s.sizeEU, s.price, s.url, s.urlAddToCart,
+              None if s.isInStock is None else int(s.isInStock)) for position, s in sizes))
+
+    def _syncProducts(self, db: sqlite3.Connection, shop: Shop) -> None:
+        """ Makes persistent products and sizes of the shop match the given ones:
+        Deletes rows which are not part of the shop anymore, then upserts all others. """
+        productUids = {p.uid for p in shop.products}
+        sizeUids = {s.uid for p in shop.products for s in p.sizes}
+
+        staleProductUids = [
+            row[0] for row in db.execute("SELECT uid FROM products WHERE shopUid = ?",
+                                         (shop.uid,))
+            if row[0] not in productUids]
+        db.executemany("DELETE FROM products WHERE uid = ?", ((uid,) for uid in staleProductUids))
+
+        staleSizeUids = [
+            row[0] for row in db.execute("SELECT sizes.uid FROM sizes "
+                                         "JOIN products ON sizes.productUid = products.uid "
+                                         "WHERE products.shopUid = ?", (shop.uid,))
+            if row[0] not in sizeUids]
+        db.executemany("DELETE FROM sizes WHERE uid = ?", ((uid,) for uid in staleSizeUids))
+
+        self._upsertProducts(db, shop.uid, enumerate(shop.products))
+        for product in shop.products:
+            self._upsertSizes(db, product.uid, enumerate(product.sizes))
+
+    def _writeSizeChanges(self, db: sqlite3.Connection, product: Product) -> None:
+        if "sizes" in product.changedFields:
+            # Sizes were added or replaced, so we sync all sizes of the product.
+            sizeUids = {s.uid for s in product.sizes}
+            staleSizeUids = [
+                row[0] for row in db.execute("SELECT uid FROM sizes WHERE productUid = ?",
+                                             (product.uid,))
+                if row[0] not in sizeUids]
+            db.executemany("DELETE FROM sizes WHERE uid = ?", ((uid,) for uid in staleSizeUids))
+            self._upsertSizes(db, product.uid, enumerate(product.sizes))
+
+        else:
+            self._upsertSizes(db, product.uid,
+                              ((i, s) for i, s in enumerate(product.sizes) if s.isChanged))
+
+
+class JournaledShopDao(Dao):
+    """ Writes shop changes as deltas to an append-only journal instead of rewriting them
+    in the snapshot store, which is any other shop DAO. Reading replays the journal onto
+    the snapshot; `compact()` folds the journal into the snapshot.
+
+    Journal records set absolute values, so replaying a record twice does no harm:
+        {"op": "setShop", "shop": {<complete shop>}}
+        {"op": "setShopFields", "shop": <uid>, "fields": {...}}
+        {"op": "setProductFields", "shop": <uid>, "product": <uid>, "fields": {...}}
+        {"op": "setSizeFields", "shop": <uid>, "product": <uid>, "size": <uid>, "fields": {...}}
+    """
+    _DEFAULT_JOURNAL_PATH: ClassVar = APP_USERDATA_DIR / "Shops.journal.jsonl"
+    _RECORD_OPS: ClassVar = ("setShop", "setShopFields", "setProductFields", "setSizeFields")
+
+    def __init__(self, snapshotDao: Dao, journalPath: pl.Path = None):
+        self._snapshotDao = snapshotDao
+        self._journal = JsonlJournal(journalPath or self._DEFAULT_JOURNAL_PATH)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    @property
+    def journal(self) -> JsonlJournal:
+        return self._journal
+
+    def loadAll(self) -> Optional[List[Shop]]:
+        """ Load all shops of the snapshot with the journal replayed onto them.
+
+        :return: A Shop list if non-empty Shops where found, else None
+        """
+        with self._snapshotDao as dao:
+            shops = dao.loadAll() or list()  # raises
+
+        shopItems = self._replay([shop.toDict() for shop in shops], self._journal.read())
+        shops = [Shop.fromDict(shopItem) for shopItem in shopItems]
+        return shops if len(shops) > 0 else None
+
+    def saveAll(self, data: List[Shop]) -> None:
+        """ Overwrite the snapshot with a given Shop list and clear the journal.
+
+        :param data: A list of Shop objects.
+        :return: None
+        :raises:
+        """
+        with self._snapshotDao as dao:
+            dao.saveAll(data=data)  # raises
+        self._journal.clear()
+
+    def deleteAll(self) -> None:
+        """ Deletes all shops of the snapshot and the journal.
+
+        :return: None
+        :raises:
+        """
+        with self._snapshotDao as dao:
+            dao.deleteAll()  # raises
+        self._journal.clear()
+
+    def insert(self, data: Shop) -> None:
+        """ Journals a new shop.
+
+        :param data: Shop object
+        :return: None
+        :raises:
+        """
+        if not isinstance(data, Shop):
+            raise TypeError("Could not save Shop. Argument 'data' must be of type 'Shop'.")
+
+        self._journal.append([dict(op="setShop", shop=data.toDict())])  # raises
+
+    def update(self, data: Shop, changesOnly: bool = False) -> None:
+        """ Journals the given Shop. Note that other than the snapshot DAOs, this does not
+        verify that the shop exists, as that would need to read the whole store.
+
+        :param data: Shop object
+        :param changesOnly: If True, only fields, products and sizes which changed since the
+                            shop's last commit are journaled. Else the complete shop.
+        :return: None
+        :raises:
+        """
+        if not isinstance(data, Shop):
+            raise TypeError("Could not update Shop. Argument 'data' must be of type 'Shop'.")
+
+        if not data.uid:
+            raise ValueError("Failed journaling shop. The shop's 'uid' value is empty.")
+
+        if changesOnly and not data.isChanged:
+            logger.debug("Shop has no changes, skipping update. %s", data.url)
+            return
+
+        self._journal.append(self.getUpdateRecords(data, changesOnly))  # raises
+
+    def appendRecords(self, records: List[dict]) -> None:
+        """ Journals records which were made by `getUpdateRecords`, e.g. in another process.
+
+        :param records: Journal records
+        :return: None
+        :raises: ValueError on records of unknown operations
+        """
+        for record in records:
+            if record.get("op") not in self._RECORD_OPS:
+                raise ValueError(f"Failed journaling records. Unknown operation: {record}")
+
+        self._journal.append(records)  # raises
+
+    @classmethod
+    def getUpdateRecords(cls, shop: Shop, changesOnly: bool = False) -> List[dict]:
+        """ Journal records which update the given shop.
+
+        :param shop: Shop object with a valid UID
+        :param changesOnly: See `update`
+        :return: Journal records
+        """
+        if changesOnly and "products" not in shop.changedFields:
+            return list(cls._getChangeRecords(shop))
+        return [dict(op="setShop", shop=shop.toDict())]
+
+    @staticmethod
+    def getRecordShopUID(record: dict) -> str:
+        """ UID of the shop which a journal record changes.
+
+        :param record: Journal record
+        :return: The shop's UID
+        """
+        return record["shop"]["uid"] if record.get("op") == "setShop" else record["shop"]
+
+    def find(self, **kwargs) -> Union[Shop, List[Shop]]:
+        """ Find one ore more shops, depending on given args.
+
+        :param kwargs: 'uid': Find a Shop by its UID.
+                       'uids': Find Shops by their UIDs. Shops which were not found are
+                               left out.
+                       'shopName': Find shops by name.
+        :return: A Shop list if Shops where found (or a single Shop -
+                 depends on kwargs).
+        :raises: If no shops were found.
+        """
+        if "uid" in kwargs:
+            uid = kwargs["uid"]
+            results = self._findByUIDs({uid})
+            if not results:
+                raise LookupError(f"No shops found with UID {uid}")
+            return results[0]
+
+        elif "uids" in kwargs:
+            return self._findByUIDs(set(kwargs["uids"]))
+
+        elif "shopName" in kwargs:
+            name = kwargs["shopName"]
+            results = [shop for shop in self.loadAll() or list() if shop.name == name]
+            if not results:
+                raise LookupError(f"No shops found with name '{name}'")
+            return results
+
+        else:
+            raise KeyError(f"Shop search fail. None of the expected arguments were given. "
+                           f"kwargs: {kwargs}")
+
+    def _findByUIDs(self, uids: Set[str]) -> List[Shop]:
+        """ Loads the given shops from the snapshot and replays only their journal records,
+        instead of replaying the journal onto all shops. """
+        shopItems = list()
+        with self._snapshotDao as dao:
+            for uid in uids:
+                try:
+                    shopItems.append(dao.find(uid=uid).toDict())  # raises
+                except LookupError:
+                    # Shops which were inserted after the last compaction are journaled only.
+                    pass
+
+        records = (record for record in self._journal.read()
+                   if self.getRecordShopUID(record) in uids)
+        return [Shop.fromDict(shopItem) for shopItem in self._replay(shopItems, records)]
+
+    def compact(self) -> None:
+        """ Fold the journal into the snapshot. Safe against crashes: Journal records are
+        only discarded after the snapshot has been written.
+
+        :return: None
+        :raises:
+        """
+        self._journal.rotate()
+
+        with self._snapshotDao as dao:
+            shops = dao.loadAll() or list()  # raises
+            shopItems = self._replay([shop.toDict() for shop in shops], self._journal.read())
+            dao.saveAll(data=[Shop.fromDict(shopItem) for shopItem in shopItems])  # raises
+
+        self._journal.discardRotated()
+        logger.debug("Shops journal compacted into snapshot.")
+
+    @staticmethod
+    def _getChangeRecords(shop: Shop) -> Iterator[dict]:
+        shopFields = {name: getattr(shop, name) for name in shop.changedFields}
+        shopFields["lastScanStamp"] = shop.lastScanStamp
+        yield dict(op="setShopFields", shop=shop.uid, fields=shopFields)
+
+        for product in shop.getChangedProducts():
+            productItem = product.toDict()
+            productFields = {name: productItem[name] for name in product.changedFields}
+            productFields["lastScanStamp"] = productItem["lastScanStamp"]
+            yield dict(op="setProductFields", shop=shop.uid, product=product.uid,
+                       fields=productFields)
+
+            # Replaced sizes have been journaled with the product fields.
+            if "sizes" in product.changedFields: continue
+
+            for size in product.sizes:
+                if not size.isChanged: continue
+                sizeItem = size.toDict()
+                yield dict(op="setSizeFields", shop=shop.uid, product=product.uid,
+                           size=size.uid,
+                           fields={name: sizeItem[name] for name in size.changedFields})
+
+    @staticmethod
+    def _replay(shopItems: List[dict], records: Iterable[dict]) -> List[dict]:
+        """ Applies journal records to encoded shops.
+
+        :param shopItems: Shops, encoded by Shop.toDict(). Get modified in place.
+        :param records: Journal records
+        :return: The resulting encoded shops
+        """
+        shopsByUID: Dict[str, dict] = {item["uid"]: item for item in shopItems}
+        productsByShopUID: Dict[str, Dict[str, dict]] = dict()
+
+        def getProductItem(record: dict) -> Optional[dict]:
+            shopUID = record["shop"]
+            if shopUID not in productsByShopUID:
+                shopItem = shopsByUID.get(shopUID, dict())
+                productsByShopUID[shopUID] = \
+                    {p["uid"]: p for p in shopItem.get("products", list())}
+            return productsByShopUID[shopUID].get(record["product"])
+
+        for record in records:
+            op = record.get("op")
+
+            if op == "setShop":
+                shopItem = record["shop"]
+                shopsByUID[shopItem["uid"]] = shopItem
+                productsByShopUID.pop(shopItem["uid"], None)
+                continue
+
+            if record.get("shop") not in shopsByUID:
+                logger.warning("Skipped journal record of unknown shop: %s", record)
+                continue
+
+            if op == "setShopFields":
+                shopsByUID[record["shop"]].update(record["fields"])
+
+            elif op == "setProductFields":
+                productItem = getProductItem(record)
+                if productItem is None:
+                    logger.warning("Skipped journal record of unknown product: %s", record)
+                    continue
+                productItem.update(record["fields"])
+
+            elif op == "setSizeFields":
+                productItem = getProductItem(record)
+                sizeItem = next((s for s in (productItem or dict()).get("sizes", list())
+                                 if s["uid"] == record["size"]), None)
+                if sizeItem is None:
+                    logger.warning("Skipped journal record of unknown size: %s", record)
+                    continue
+                sizeItem.update(record["fields"])
+
+            else:
+                logger.warning("Skipped journal record of unknown type: %s", record)
+
+        return list(shopsByUID.values())
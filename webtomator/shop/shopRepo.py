@@ -1,7 +1,13 @@
 # shop.shopRepo.py
-from typing import List
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Set, Callable, Tuple, Iterable
 
 import debug.logger as clog
+from shop.product import Product
+from shop.productHistory import ProductHistory
 from shop.productsUrlsRepo import ProductsUrlsRepo
 from shop.shop import Shop
 from shop.shopDao import TinyShopDao
@@ -10,10 +16,35 @@ from storage.base import Dao
 logger = clog.getLogger(__name__)
 
 
+@dataclass
+class ProductsUrlsPlan:
+    """ Changes which make persisted shops match the ProductsUrls repository. """
+    addShops: List[Shop] = field(default_factory=list)
+    removeShops: List[Shop] = field(default_factory=list)
+    addProducts: Dict[str, List[Product]] = field(default_factory=dict)
+    """ New products by UID of the shop to add them to. """
+    removeProductUrls: Dict[str, Set[str]] = field(default_factory=dict)
+    """ URLs of products to remove by UID of their shop. """
+
+    @property
+    def isEmpty(self) -> bool:
+        return not (self.addShops or self.removeShops or self.addProducts
+                    or self.removeProductUrls)
+
+    def __str__(self) -> str:
+        return f"Shops to add: {len(self.addShops)}, shops to remove: {len(self.removeShops)}, " \
+               f"products to add: {sum(len(p) for p in self.addProducts.values())}, " \
+               f"products to remove: {sum(len(u) for u in self.removeProductUrls.values())}"
+
+
 class ShopRepo:
 
-    def __init__(self, dao: Dao = TinyShopDao()):
+    def __init__(self, dao: Dao = TinyShopDao(), history: Optional[ProductHistory] = None):
         self._dao = dao
+        self._history = history
+        """ If set, price and stock changes of flushed products get recorded. """
+        self._pendingShops: Dict[str, Shop] = dict()
+        """ Shops which were scheduled for update but have not been written yet, by UID. """
 
     def getAll(self) -> List[Shop]:
         """ Load all shops from TinyDB to a list of 'Shop' objects.
@@ -31,6 +62,19 @@ class ShopRepo:
         with self._dao as dao:
             dao.saveAll(data=shops)  # raises
 
+        for shop in shops:
+            shop.commitChanges()
+
+    def insertAll(self, shops: List[Shop]) -> None:
+        """ Add new shops, without writing any other shops.
+        :param shops: List of shop objects which are not persisted yet
+        :return: None
+        """
+        with self._dao as dao:
+            for shop in shops:
+                dao.insert(data=shop)  # raises
+                shop.commitChanges()
+
     def update(self, shop: Shop) -> None:
         """ Update a shop in TinyDB.
         :param shop: A 'Shop' object with a valid UID.
@@ -39,6 +83,80 @@ class ShopRepo:
         with self._dao as dao:
             dao.update(data=shop)  # raises
 
+        shop.commitChanges()
+
+    def scheduleUpdate(self, shop: Shop) -> None:
+        """ Mark a shop as changed, without writing it yet. All scheduled shops are
+        written at once with the next call of `flush()`. Scheduling the same shop multiple
+        times results in one single write.
+
+        :param shop: A 'Shop' object with a valid UID.
+        :return: None
+        """
+        self._pendingShops[shop.uid] = shop
+
+    @property
+    def hasPendingUpdates(self) -> bool:
+        return len(self._pendingShops) > 0
+
+    def flush(self) -> None:
+        """ Write all shops which were scheduled by `scheduleUpdate()` within one
+        single connection. Only changes since a shop's last commit are written, unchanged
+        shops are skipped. Shops which failed to be written stay scheduled.
+
+        :return: None
+        :raises: Re-raises the first error after all other shops have been written.
+        """
+        if not self._pendingShops: return
+
+        errors = self._writeShops(list(self._pendingShops.values()), changesOnly=True)  # raises
+
+        for uid, shop in list(self._pendingShops.items()):
+            if uid not in errors:
+                shop.commitChanges()
+                del self._pendingShops[uid]
+
+        if errors:
+            raise next(iter(errors.values()))
+
+    def _writeShops(self, shops: List[Shop], changesOnly: bool) -> Dict[str, Exception]:
+        """ Write shops within one single connection and record their changed products in
+        the history, if set. Changes do not get committed.
+
+        :param shops: Shops to write
+        :param changesOnly: If True, only changes since a shop's last commit are written.
+        :return: Errors of shops which failed to be written, by shop UID
+        :raises: If the connection fails
+        """
+        errors: Dict[str, Exception] = dict()
+        if not shops: return errors
+
+        with self._dao as dao:
+            for shop in shops:
+                try:
+                    dao.update(data=shop, changesOnly=changesOnly)  # raises
+
+                except Exception as e:
+                    logger.error("Failed writing scheduled shop update. %s %s", e, shop.url)
+                    errors[shop.uid] = e
+
+                else:
+                    if self._history:
+                        self._history.record(self._getHistoryProducts(shop))
+
+        if self._history:
+            try:
+                self._history.flush()
+            except Exception as e:
+                logger.error("Failed writing product history. %s", e, exc_info=True)
+
+        return errors
+
+    def _getHistoryProducts(self, shop: Shop) -> List[Product]:
+        """ Products whose state gets recorded in the history after the given shop has been
+        written. """
+        return shop.getChangedProducts()
+
     def findByUID(self, uid: str) -> Shop:
         """ Finds a Shop with the given UID.
 
@@ -49,6 +167,16 @@ class ShopRepo:
             shop = dao.find(uid=uid)  # raises
         return shop
 
+    def findByUIDs(self, uids: Iterable[str]) -> List[Shop]:
+        """ Finds the shops with the given UIDs.
+
+        :param uids: UIDs of the shops to search
+        :return: List of found shops, without the UIDs which were not found
+        """
+        with self._dao as dao:
+            shops = dao.find(uids=list(uids))  # raises
+        return shops
+
     def findByName(self, name: str) -> List[Shop]:
         """ Finds shops by the given shop name.
 
@@ -60,8 +188,13 @@ class ShopRepo:
         return shops
 
     def updateFromProductsUrls(self, productsUrlsRepo: ProductsUrlsRepo):
-        # Note that we use the fact that lists are reference based, so any modifications
-        # of the lists are passed by reference.
+        """ Add and remove shops and products, so the persisted shops match the product URLs
+        of the given repository. Shops get written only if something changed.
+
+        :param productsUrlsRepo: Repository of the product URLs to be scraped
+        :return: None
+        :raises: ValueError if neither of both repositories has shops
+        """
         repoShops: List[Shop] = list()
 
         try:
@@ -70,59 +203,442 @@ class ShopRepo:
         except Exception as e:
             logger.warning("%s", e, exc_info=True)
 
-        try:
-            shopsFromProductURLs = productsUrlsRepo.createShops()
-
-        except Exception as e:
-            raise e
+        shopsFromProductURLs = productsUrlsRepo.createShops()  # raises
 
         if (not repoShops) and shopsFromProductURLs:
             self.setAll(shops=shopsFromProductURLs)
 
         elif repoShops and shopsFromProductURLs:
-            # Persist shops and/or products detected by productsUrlsRepo which
-            # currently do not exist in database.
-            for shopCandidate in shopsFromProductURLs:
-                # Check if shop exists in database
-                results = list(filter(lambda s: s.url == shopCandidate.url, repoShops))
-
-                if results:
-                    # Shop exists in database, add missing products from ProductsUrls repo
-                    foundPersistentShop = results[0]
-                    foundPersistentProductsUrls = \
-                        [p.url for p in foundPersistentShop.products if p.url]
-
-                    # Use exact URLs for product comparison.
-                    for productCandidate in shopCandidate.products:
-                        if productCandidate.url not in foundPersistentProductsUrls:
-                            foundPersistentShop.addProduct(product=productCandidate)
+            plan = self._planProductsUrlsUpdate(repoShops, shopsFromProductURLs)
+            if plan.isEmpty:
+                logger.debug("Shops are up-to-date with ProductsUrls repository.")
+                return
 
-                else:
-                    # Shop does not exist in database, add the entire shop candidate
-                    repoShops.append(shopCandidate)
+            logger.info("Updating shops from ProductsUrls repository. %s", plan)
+            self.setAll(shops=self._applyProductsUrlsPlan(repoShops, plan))
+
+        else:
+            raise ValueError("No shops found. Searched in shop repo and ProductsUrls repo.")
+
+    @staticmethod
+    def _planProductsUrlsUpdate(repoShops: List[Shop],
+                                urlsShops: List[Shop]) -> ProductsUrlsPlan:
+        """ Compare persisted shops with shops created from product URLs. Shops are matched
+        by their exact URL, products as well. Doesn't decode lazily loaded products.
+
+        :param repoShops: Persisted shops
+        :param urlsShops: Shops created by a ProductsUrlsRepo
+        :return: The changes which make the persisted shops match the product URLs
+        """
+        plan = ProductsUrlsPlan()
+
+        repoShopsByUrl: Dict[str, Shop] = dict()
+        for shop in repoShops:
+            repoShopsByUrl.setdefault(shop.url, shop)
+        urlsShopsByUrl: Dict[str, Shop] = dict()
+        for shop in urlsShops:
+            urlsShopsByUrl.setdefault(shop.url, shop)
+
+        for shopUrl, urlsShop in urlsShopsByUrl.items():
+            repoShop = repoShopsByUrl.get(shopUrl)
+            if repoShop is None:
+                plan.addShops.append(urlsShop)
+                continue
+
+            repoProductUrls = repoShop.getProductUrls()
+            existingUrls = {url for url in repoProductUrls if url}
+            wantedUrls = {url for url in urlsShop.getProductUrls() if url}
+
+            newProducts = [p for p in urlsShop.products if p.url not in existingUrls]
+            if newProducts:
+                plan.addProducts[repoShop.uid] = newProducts
+
+            obsoleteUrls = {url for url in repoProductUrls if url not in wantedUrls}
+            if obsoleteUrls:
+                plan.removeProductUrls[repoShop.uid] = obsoleteUrls
+
+        plan.removeShops = [s for s in repoShops if s.url not in urlsShopsByUrl]
+        return plan
+
+    @staticmethod
+    def _applyProductsUrlsPlan(repoShops: List[Shop], plan: ProductsUrlsPlan) -> List[Shop]:
+        """ Apply a plan of `_planProductsUrlsUpdate()` in one pass.
+
+        :param repoShops: Persisted shops, as passed for planning. Get modified.
+        :param plan: The planned changes
+        :return: The updated list of shops, including new shops
+        """
+        removeShopIds = {id(s) for s in plan.removeShops}
+        shops = [s for s in repoShops if id(s) not in removeShopIds]
+
+        for shop in shops:
+            for product in plan.addProducts.get(shop.uid, list()):
+                shop.addProduct(product=product)
+
+            obsoleteUrls = plan.removeProductUrls.get(shop.uid)
+            if obsoleteUrls:
+                shop.removeProducts([p for p in shop.products if p.url in obsoleteUrls])
+
+        shops.extend(plan.addShops)
+        return shops
+
+
+@dataclass
+class ShopWriteStats:
+    """ Counters of an AsyncShopRepo. """
+    receivedUpdates: int = 0
+    """ Count of shop updates which were sent to the storage actor. """
+    writtenShops: int = 0
+    """ Count of shops which were written after merging updates of the same shop. """
+    writeBatches: int = 0
+    """ Count of writes, each of which may include multiple shops. """
+    maxQueueDepth: int = 0
+    """ Max. count of messages which were waiting in the queue at the same time. """
+
+    @property
+    def mergeRatio(self) -> float:
+        """ Share of received updates which were merged into other updates of the same
+        shop, so they did not need a write of their own. """
+        if not self.receivedUpdates: return 0.0
+        return 1 - self.writtenShops / self.receivedUpdates
+
+
+@dataclass
+class _StorageMessage:
+    shop: Optional[Shop] = None
+    isFullWrite: bool = False
+    done: Optional[asyncio.Future] = None
+    """ If set, all pending shops get written. Completes after the write. """
 
-            # Delete shops and/or products from database which do not exist in ProductsURLs repo.
-            for persistentShop in reversed(repoShops):
-                # Check if shop exists in shops which were generated by ProductsUrls
-                results = list(filter(lambda s: s.url == persistentShop.url, shopsFromProductURLs))
 
-                if results:
-                    # Shop in database exists for ProductsUrls.
-                    # Check if some products have to be removed from the database.
-                    foundProductsUrlsShop = results[0]
-                    foundProductsUrls = [p.url for p in foundProductsUrlsShop.products if p.url]
-                    productsToDelete = \
-                        [p for p in persistentShop.products if p.url not in foundProductsUrls]
+class AsyncShopRepo(ShopRepo):
+    """ ShopRepo with a storage actor: A task on the event loop which is the only one to
+    access the DAO after startup. `scheduleUpdate()`, `update()` and `flush()` send messages
+    to the actor through an asyncio.Queue and never block.
 
-                    if productsToDelete:
-                        [persistentShop.products.remove(p) for p in productsToDelete]
+    The actor takes all messages which are waiting in the queue at once and merges updates
+    of the same shop. When a flush was requested, it writes the pending shops on a single
+    writer thread and waits for the write to complete before it takes the next messages.
+    So writes never overlap, and all updates which come in meanwhile get merged into the
+    next write. Shops are written from snapshots (see `ChangeTrackable.snapshot`) and get
+    committed when their write is dispatched. See `stats` for counters.
 
+    `update()` and `flush()` return an asyncio future. Await it to wait for the write to
+    complete, which raises on errors. Or ignore it to fire and forget: Errors get logged
+    anyway, and a shop which failed to be written is written completely next time.
+
+    Call `scheduleUpdate()`, `update()`, `flush()`, `runExclusive()` and `close()` from the
+    event loop's thread only. All other methods are inherited unchanged and access the DAO
+    synchronously. They are meant to be used before the first message is sent, e.g. at startup.
+    """
+
+    def __init__(self, dao: Dao = TinyShopDao(), history: Optional[ProductHistory] = None):
+        super().__init__(dao=dao, history=history)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ShopRepoWriter")
+        self._fullWriteUIDs: Set[str] = set()
+        """ UIDs of shops which must be written completely, e.g. because their last
+        write failed. """
+        self._fullWriteLock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._actor: Optional[asyncio.Task] = None
+        self._stats = ShopWriteStats()
+        self._removedUIDs: Set[str] = set()
+        """ UIDs of shops which were removed while running. Their updates are dropped. """
+        self._failedProducts: Dict[str, List[Product]] = dict()
+        """ Changed products of failed writes by shop UID, in the state they had when the
+        write was dispatched. They get recorded in the history with the next successful
+        write of their shop, as the shop itself has been committed already. """
+
+    @property
+    def stats(self) -> ShopWriteStats:
+        return self._stats
+
+    @property
+    def queueDepth(self) -> int:
+        """ Count of messages which are waiting for the storage actor. """
+        return self._queue.qsize() if self._queue else 0
+
+    @property
+    def hasPendingUpdates(self) -> bool:
+        return len(self._pendingShops) > 0 or self.queueDepth > 0
+
+    def scheduleUpdate(self, shop: Shop) -> None:
+        """ Send a shop to the storage actor, which writes it with the next flush. Updates of
+        the same shop are merged into one single write.
+
+        :param shop: A 'Shop' object with a valid UID.
+        :return: None
+        """
+        self._send(_StorageMessage(shop=shop))
+
+    def update(self, shop: Shop) -> asyncio.Future:
+        """ Write a complete shop, along with all other pending shops.
+
+        :param shop: A 'Shop' object with a valid UID.
+        :return: Future which completes when the shop was written. Raises on errors.
+        """
+        return self._send(_StorageMessage(shop=shop, isFullWrite=True,
+                                          done=self._createFuture()))
+
+    def flush(self) -> asyncio.Future:
+        """ Write all shops which were sent to the storage actor. Only changes since a
+        shop's last commit are written.
+
+        :return: Future which completes when all shops were written. Raises the first error.
+        """
+        return self._send(_StorageMessage(done=self._createFuture()))
+
+    def runExclusive(self, func: Callable, *args) -> asyncio.Future:
+        """ Run a function on the writer thread, so it never runs at the same time as a
+        write. Use this for any other work with the DAO, e.g. maintenance.
+
+        :param func: Function to run
+        :param args: Positional arguments for the function
+        :return: Future of the function's result
+        """
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def discardPending(self, uids: Iterable[str]) -> None:
+        """ Forget updates of the given shops which were not written yet, e.g. failed
+        writes of shops which were handed over to another process. Flush before, and don't
+        send updates of these shops meanwhile.
+
+        :param uids: UIDs of the shops
+        :return: None
+        """
+        with self._fullWriteLock:
+            for uid in uids:
+                self._pendingShops.pop(uid, None)
+                self._fullWriteUIDs.discard(uid)
+                self._failedProducts.pop(uid, None)
+
+    async def reloadFromProductsUrls(self, shops: List[Shop], productsUrlsRepo: ProductsUrlsRepo
+                                     ) -> Tuple[List[Shop], ProductsUrlsPlan]:
+        """ Like `updateFromProductsUrls`, but for shops which are in use: The given shops
+        are updated in place and only the changes get written, through the storage actor.
+        Updates of removed shops which are sent afterwards are dropped.
+        As no DAO is able to delete a single shop, all shops get rewritten if shops were
+        removed.
+
+        :param shops: The shops in use, as loaded from this repository
+        :param productsUrlsRepo: Repository of the product URLs to be scraped
+        :return: The updated list of shops, which includes new shops, and the applied plan
+        :raises: On errors while reading product URLs or writing shops. The given shops may
+                 have been updated in that case.
+        """
+        loop = asyncio.get_running_loop()
+        # Reading and parsing may take a moment for many URLs.
+        urlsShops = await loop.run_in_executor(None, productsUrlsRepo.createShops)  # raises
+        if not urlsShops:
+            # Most likely the file is being edited. Stopping all scrapers would be wrong.
+            logger.warning("Ignored ProductsUrls repository without any shop.")
+            return shops, ProductsUrlsPlan()
+
+        plan = self._planProductsUrlsUpdate(shops, urlsShops)
+        if plan.isEmpty:
+            return shops, plan
+
+        updatedShops = self._applyProductsUrlsPlan(shops, plan)
+
+        for shop in plan.removeShops:
+            self._removedUIDs.add(shop.uid)
+            self._pendingShops.pop(shop.uid, None)
+            with self._fullWriteLock:
+                self._fullWriteUIDs.discard(shop.uid)
+                self._failedProducts.pop(shop.uid, None)
+
+        if plan.removeShops:
+            await self._writeAll(updatedShops, isInsert=False)  # raises
+            return updatedShops, plan
+
+        await self._writeAll(plan.addShops, isInsert=True)  # raises
+        changedUIDs = set(plan.addProducts) | set(plan.removeProductUrls)
+        for shop in updatedShops:
+            if shop.uid in changedUIDs:
+                self.scheduleUpdate(shop)
+        await self.flush()  # raises
+
+        return updatedShops, plan
+
+    async def close(self) -> None:
+        """ Write all pending shops, stop the storage actor and the writer thread.
+
+        :return: None
+        :raises: The first error of the final write
+        """
+        try:
+            await self.flush()
+        finally:
+            self._queue.put_nowait(None)  # Stops the actor
+            await self._actor
+            self._actor = None
+            self._queue = None
+            self._executor.shutdown(wait=True)
+            logger.debug("Shop storage actor stopped. %s", self._stats)
+
+    def _send(self, message: _StorageMessage) -> Optional[asyncio.Future]:
+        if self._queue is None:
+            # Created here, as the queue must belong to the running event loop.
+            self._queue = asyncio.Queue()
+        if self._actor is None or self._actor.done():
+            # Also restarts the actor if it got cancelled, e.g. on shutdown, so the final
+            # flush still gets done.
+            self._actor = asyncio.ensure_future(self._runActor())
+
+        self._queue.put_nowait(message)
+        self._stats.maxQueueDepth = max(self._stats.maxQueueDepth, self._queue.qsize())
+        return message.done
+
+    async def _runActor(self) -> None:
+        while True:
+            messages = [await self._queue.get()]
+            while not self._queue.empty():
+                messages.append(self._queue.get_nowait())
+
+            isStopping = None in messages
+            waiters: List[asyncio.Future] = list()
+
+            for message in messages:
+                if message is None:
+                    continue
+                if message.shop and message.shop.uid in self._removedUIDs:
+                    logger.debug("Dropped update of removed shop %s", message.shop.url)
+                elif message.shop:
+                    self._stats.receivedUpdates += 1
+                    self._pendingShops[message.shop.uid] = message.shop
+                    if message.isFullWrite:
+                        with self._fullWriteLock:
+                            self._fullWriteUIDs.add(message.shop.uid)
+                if message.done:
+                    waiters.append(message.done)
+
+            if waiters:
+                await self._writePending(waiters)
+
+            if isStopping:
+                return
+
+    async def _writePending(self, waiters: List[asyncio.Future]) -> None:
+        shops = list(self._pendingShops.values())
+        self._pendingShops.clear()
+        error = None
+
+        try:
+            try:
+                await self._dispatchWrite(shops=shops)
+            except Exception as e:
+                error = e
+                # Keep failed shops pending, so they get written with the next flush.
+                with self._fullWriteLock:
+                    for shop in shops:
+                        if shop.uid in self._fullWriteUIDs:
+                            self._pendingShops.setdefault(shop.uid, shop)
+
+            for waiter in waiters:
+                if waiter.done():
+                    continue
+                if error:
+                    waiter.set_exception(error)
                 else:
-                    # Shop in database does not exist anymore for ProductsUrls - remove it
-                    repoShops.remove(persistentShop)
+                    waiter.set_result(None)
+
+        finally:
+            # The actor got cancelled while waiting for the write.
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.cancel()
+
+    def _dispatchWrite(self, shops: List[Shop]) -> asyncio.Future:
+        snapshots: List[Shop] = list()
+        fullWriteUIDs: Set[str] = set()
+
+        # Snapshot and commit run on the event loop, as the shops get changed there. Both take
+        # time by the count of changed products, see ChangeTrackable.
+        with self._fullWriteLock:
+            for shop in shops:
+                isFullWrite = shop.uid in self._fullWriteUIDs
+                if not (isFullWrite or shop.isChanged):
                     continue
+                if isFullWrite:
+                    fullWriteUIDs.add(shop.uid)
+                    self._fullWriteUIDs.discard(shop.uid)
+                snapshots.append(shop.snapshot())
+                shop.commitChanges()
 
-            self.setAll(shops=repoShops)
+        self._stats.writtenShops += len(snapshots)
+        self._stats.writeBatches += 1 if snapshots else 0
+        return self.runExclusive(self._writeSnapshots, snapshots, fullWriteUIDs)
 
-        else:
-            raise ValueError("No shops found. Searched in shop repo and ProductsUrls repo.")
\ No newline at end of file
+    def _writeSnapshots(self, snapshots: List[Shop], fullWriteUIDs: Set[str]) -> None:
+        # Runs on the writer thread.
+        failedUIDs = {s.uid for s in snapshots}
+        try:
+            errors = self._writeShops(
+                [s for s in snapshots if s.uid not in fullWriteUIDs], changesOnly=True)
+            errors.update(self._writeShops(
+                [s for s in snapshots if s.uid in fullWriteUIDs], changesOnly=False))
+            failedUIDs = set(errors)
+
+            if errors:
+                raise next(iter(errors.values()))
+
+        except Exception as e:
+            logger.error("Failed writing %d of %d shop(s). %s",
+                         len(failedUIDs), len(snapshots), e)
+            raise
+
+        finally:
+            if failedUIDs:
+                with self._fullWriteLock:
+                    self._fullWriteUIDs.update(failedUIDs)
+                    for snapshot in snapshots:
+                        if snapshot.uid in failedUIDs:
+                            self._failedProducts.setdefault(snapshot.uid, list()).extend(
+                                snapshot.getChangedProducts())
+
+    def _getHistoryProducts(self, shop: Shop) -> List[Product]:
+        # Runs on the writer thread. Failed writes first, so the history keeps the order.
+        with self._fullWriteLock:
+            failedProducts = self._failedProducts.pop(shop.uid, list())
+        return failedProducts + super()._getHistoryProducts(shop)
+
+    async def _writeAll(self, shops: List[Shop], isInsert: bool) -> None:
+        # Shops get written on the writer thread, while they may be changed on the event loop.
+        # So like in _dispatchWrite(), snapshots get written and the shops get committed for
+        # the changes of their snapshots.
+        snapshots = [shop.snapshot() for shop in shops]
+        for shop in shops:
+            shop.commitChanges()
+
+        try:
+            await self.runExclusive(self._saveSnapshots, snapshots, isInsert)  # raises
+
+        except Exception:
+            # Write them completely with the next flush.
+            with self._fullWriteLock:
+                for shop in shops:
+                    self._fullWriteUIDs.add(shop.uid)
+                    self._pendingShops.setdefault(shop.uid, shop)
+            raise
+
+    def _saveSnapshots(self, snapshots: List[Shop], isInsert: bool) -> None:
+        # Runs on the writer thread. Other than setAll() and insertAll(), this doesn't commit,
+        # as snapshots share unchanged products with the shops in use.
+        with self._dao as dao:
+            if isInsert:
+                for snapshot in snapshots:
+                    dao.insert(data=snapshot)  # raises
+            else:
+                dao.saveAll(data=snapshots)  # raises
+
+    def _createFuture(self) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(self._retrieveError)
+        return future
+
+    @staticmethod
+    def _retrieveError(future: asyncio.Future) -> None:
+        # Errors have been logged by the writer. Retrieve them, so asyncio does not complain
+        # about never retrieved exceptions of fired and forgotten writes.
+        if not future.cancelled():
+            future.exception()
@@ -1,4 +1,5 @@
 # storage.base.py
+import copy
 import logging
 import pathlib as pl
 import typing as tp
@@ -86,6 +87,7 @@ class Connection(ABC):
 
 
 class Identifiable(ABC):
+    __slots__ = ()
 
     @property
     @abstractmethod
@@ -100,6 +102,97 @@ class Identifiable(ABC):
         return str(uuid.uuid4())
 
 
+class ChangeTrackable(ABC):
+    """ Keeps track of fields which were changed since the last commit. Implementing classes
+    must call `_markChanged()` from their setters and initialize `_changes` with an empty dict.
+
+    Nested trackable objects report their changes to their parent, so finding and committing
+    the changes of an object takes time by the count of changed nested objects, not of all
+    nested objects. Classes with nested objects initialize `_changedChildren` with
+    `_NO_CHANGED_CHILDREN` and register each nested object by `_adoptChild()`. Classes of
+    nested objects initialize `_trackingParent` with None.
+    """
+    __slots__ = ()
+    _NO_CHANGED_CHILDREN: tp.ClassVar[tuple] = ()
+    """ Shared by all objects without changed nested objects, which need no dict of their own
+    this way. Unlike an empty dict it is immutable, unlike a mapping proxy it can be pickled.
+    """
+    _changes: tp.Dict[str, tp.Any]
+    """ Names of changed fields, mapped to their values at the time of the last commit. """
+    _changedChildren: tp.Collection['ChangeTrackable'] = _NO_CHANGED_CHILDREN
+    """ Nested objects which were changed since the last commit, in order of their first
+    change. A dict used as an ordered set, else `_NO_CHANGED_CHILDREN`. """
+    _trackingParent: tp.Optional['ChangeTrackable'] = None
+    """ The object which holds this one and gets its changes reported. """
+
+    @property
+    def changedFields(self) -> tp.Dict[str, tp.Any]:
+        """ Own fields which were changed since the last commit (without nested objects),
+        mapped to their values at the time of the last commit.
+        """
+        return dict(self._changes)
+
+    @property
+    def isChanged(self) -> bool:
+        """ True if this object or one of its nested objects was changed since
+        the last commit. """
+        if self._changes: return True
+        for child in self._changedChildren:
+            if child.isChanged: return True
+        return False
+
+    def commitChanges(self) -> None:
+        """ Mark this object and all of its nested objects as unchanged. Call this
+        after all changes were persisted.
+
+        :return: None
+        """
+        self._changes.clear()
+        if self._changedChildren:
+            for child in self._changedChildren:
+                child.commitChanges()
+            self._changedChildren = self._NO_CHANGED_CHILDREN
+
+    def snapshot(self) -> 'ChangeTrackable':
+        """ Copy which keeps the current change state, e.g. for writing the changes while
+        this object keeps being modified. Implementing classes copy their changed nested
+        objects and register the copies as changed children of the copy. Unchanged ones are
+        shared with the original. So a snapshot must never be committed, as that would commit
+        the shared objects as well.
+
+        :return: The copy, which has no parent
+        """
+        clone = copy.copy(self)
+        clone._changes = dict(self._changes)
+        clone._trackingParent = None
+        return clone
+
+    def _markChanged(self, field: str, oldValue: tp.Any) -> None:
+        # Only the value at the time of the last commit is of interest.
+        if field not in self._changes:
+            self._changes[field] = oldValue
+        if self._trackingParent is not None:
+            self._trackingParent._markChildChanged(self)
+
+    def _markChildChanged(self, child: 'ChangeTrackable') -> None:
+        if not self._changedChildren:
+            self._changedChildren = dict()
+        self._changedChildren[child] = None
+        if self._trackingParent is not None:
+            self._trackingParent._markChildChanged(self)
+
+    def _adoptChild(self, child: 'ChangeTrackable') -> None:
+        child._trackingParent = self
+        if child.isChanged:
+            self._markChildChanged(child)
+
+    def _releaseChild(self, child: 'ChangeTrackable') -> None:
+        if child._trackingParent is self:
+            child._trackingParent = None
+        if child in self._changedChildren:
+            del self._changedChildren[child]
+
+
 class Connectible(ABC):
 
     @property
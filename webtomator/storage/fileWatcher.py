@@ -0,0 +1,56 @@
+# storage.fileWatcher.py
+import pathlib as pl
+from typing import Optional, Tuple
+
+import debug.logger as clog
+
+logger = clog.getLogger(__name__)
+
+FileStamp = Optional[Tuple[int, int]]  # type alias: (mtime in ns, size) or None if missing
+
+
+class FileWatcher:
+    """ Detects changes of a file by polling its modification time and size, so it works
+    the same on all platforms and file systems.
+
+    A change is reported once the file did not change anymore between two polls. So a
+    file which is still being written (e.g. saved by an editor in chunks) is not reported
+    before it is complete. Polls must be some time apart for that reason.
+    """
+
+    def __init__(self, path: pl.Path):
+        """ Constructor. The current state of the file is taken as unchanged.
+
+        :param path: Full path of the file to watch. It does not need to exist.
+        """
+        self.__path: pl.Path = path
+        self.__reportedStamp: FileStamp = self._getStamp()
+        self.__lastStamp: FileStamp = self.__reportedStamp
+
+    @property
+    def path(self) -> pl.Path:
+        return self.__path
+
+    def hasChanged(self) -> bool:
+        """ Poll the file.
+
+        :return: True if the file changed since the last reported change (or since the
+                 watcher was created) and did not change since the previous poll.
+        """
+        stamp = self._getStamp()
+        isSettled = stamp == self.__lastStamp
+        self.__lastStamp = stamp
+
+        if isSettled and stamp != self.__reportedStamp:
+            self.__reportedStamp = stamp
+            logger.debug("Detected change of %s", self.__path)
+            return True
+
+        return False
+
+    def _getStamp(self) -> FileStamp:
+        try:
+            stat = self.__path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
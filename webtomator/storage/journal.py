@@ -0,0 +1,110 @@
+# storage.journal.py
+import json
+import pathlib as pl
+from typing import Iterable, Iterator
+
+import debug.logger as clog
+
+logger = clog.getLogger(__name__)
+
+
+class JsonlJournal:
+    """ Append-only journal of JSON records, one record per line.
+
+    For compaction, the journal gets rotated: The current file is moved aside, so new
+    records go to a fresh file while the rotated records are folded into a snapshot.
+    Until `discardRotated` gets called, reading yields the rotated records first. So a
+    crash during compaction loses nothing, as long as replaying a record twice gives the
+    same result as replaying it once.
+    """
+
+    def __init__(self, path: pl.Path):
+        self.__path: pl.Path = path
+        self.__rotatedPath: pl.Path = path.with_name(path.name + ".compacting")
+
+    @property
+    def path(self) -> pl.Path:
+        return self.__path
+
+    @property
+    def rotatedPath(self) -> pl.Path:
+        return self.__rotatedPath
+
+    @property
+    def size(self) -> int:
+        """ Count of bytes of the current and the rotated journal file. """
+        return sum(p.stat().st_size for p in (self.__path, self.__rotatedPath) if p.is_file())
+
+    def append(self, records: Iterable[dict]) -> None:
+        """ Append records to the journal.
+
+        :param records: JSON serializable dicts
+        :return: None
+        :raises: On file or encoding errors
+        """
+        lines = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        if not lines: return
+
+        with open(self.__path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+    def read(self) -> Iterator[dict]:
+        """ Yields all records, starting with the rotated ones. Lines which can not be
+        decoded (e.g. cut by a crash while writing) are skipped.
+
+        :return: Iterator of records
+        """
+        for path in (self.__rotatedPath, self.__path):
+            if not path.is_file(): continue
+
+            with open(path, "r", encoding="utf-8") as file:
+                for lineNumber, line in enumerate(file, start=1):
+                    if not line.strip(): continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        logger.warning("Skipped invalid journal record at %s, line %s",
+                                       path, lineNumber)
+
+    def rotate(self) -> None:
+        """ Move the current records aside, so new records go to a fresh file. If a rotated
+        file still exists from an interrupted compaction, the current records are appended
+        to it.
+
+        :return: None
+        """
+        if not self.__path.is_file(): return
+
+        if not self.__rotatedPath.is_file():
+            self.__path.replace(self.__rotatedPath)
+            return
+
+        # A crash may have cut the last record, which must not swallow the next one.
+        isLineOpen = False
+        if self.__rotatedPath.stat().st_size > 0:
+            with open(self.__rotatedPath, "rb") as rotated:
+                rotated.seek(-1, 2)
+                isLineOpen = rotated.read(1) != b"\n"
+
+        with open(self.__rotatedPath, "a", encoding="utf-8") as rotated, \
+                open(self.__path, "r", encoding="utf-8") as current:
+            if isLineOpen:
+                rotated.write("\n")
+            for line in current:
+                rotated.write(line)
+        self.__path.unlink()
+
+    def discardRotated(self) -> None:
+        """ Delete the rotated records, which must have been folded into a snapshot before.
+
+        :return: None
+        """
+        self.__rotatedPath.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """ Delete all records.
+
+        :return: None
+        """
+        self.__path.unlink(missing_ok=True)
+        self.__rotatedPath.unlink(missing_ok=True)
@@ -0,0 +1,105 @@
+# storage.recordFile.py
+import mmap
+import pathlib as pl
+import struct
+from typing import Iterable, Iterator, Tuple
+
+import debug.logger as clog
+
+logger = clog.getLogger(__name__)
+
+
+class FixedRecordFile:
+    """ Append-only binary file of fixed-size records, as of a `struct` format.
+
+    The file starts with a header: Magic bytes, format version, record size and a base
+    timestamp (int seconds), which users may take as reference for compact relative
+    timestamps. Records are read through a memory map, so files much larger than
+    the available memory can be scanned.
+    """
+    _MAGIC: bytes = b"WTRF"
+    _VERSION: int = 1
+    _HEADER = struct.Struct("<4sHHq")
+
+    def __init__(self, path: pl.Path, recordFormat: str, baseStamp: int = 0):
+        """ Constructor
+
+        :param path: Full path to the file. Gets created with the first append.
+        :param recordFormat: `struct` format of a record, e.g. "<IIi".
+        :param baseStamp: Base timestamp, stored in the header of a new file. Existing
+                          files keep their base timestamp.
+        :raises: ValueError if an existing file does not match the given record format.
+        """
+        self.__path: pl.Path = path
+        self.__record = struct.Struct(recordFormat)
+        self.__baseStamp: int = int(baseStamp)
+
+        if path.is_file() and path.stat().st_size > 0:
+            self.__baseStamp = self._readHeader()  # raises
+
+    @property
+    def path(self) -> pl.Path:
+        return self.__path
+
+    @property
+    def baseStamp(self) -> int:
+        return self.__baseStamp
+
+    @property
+    def count(self) -> int:
+        """ Count of records in the file. """
+        if not self.__path.is_file(): return 0
+        size = self.__path.stat().st_size - self._HEADER.size
+        return max(0, size // self.__record.size)
+
+    def append(self, records: Iterable[tuple]) -> None:
+        """ Append records to the end of the file.
+
+        :param records: Tuples with values as of the record format
+        :return: None
+        :raises: struct.error on values not matching the record format
+        """
+        data = b"".join(self.__record.pack(*record) for record in records)
+        if not data: return
+
+        isNew = not self.__path.is_file() or self.__path.stat().st_size == 0
+        self.__path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(self.__path, "ab") as file:
+            if isNew:
+                file.write(self._HEADER.pack(self._MAGIC, self._VERSION,
+                                             self.__record.size, self.__baseStamp))
+            else:
+                # A crash may have cut the last record. Skip the rest of it, else all
+                # following records would be read shifted.
+                excess = (file.tell() - self._HEADER.size) % self.__record.size
+                if excess:
+                    file.truncate(file.tell() - excess)
+                    file.seek(0, 2)
+            file.write(data)
+
+    def iterRecords(self, reverse: bool = False) -> Iterator[Tuple]:
+        """ Yields all records as tuples, read from a memory map of the file.
+
+        :param reverse: If True, yields the newest record first.
+        :return: Iterator of record tuples
+        """
+        count = self.count
+        if count == 0: return
+
+        with open(self.__path, "rb") as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            offsets = range(count - 1, -1, -1) if reverse else range(count)
+            headerSize, recordSize = self._HEADER.size, self.__record.size
+            for i in offsets:
+                yield self.__record.unpack_from(mapped, headerSize + i * recordSize)
+
+    def _readHeader(self) -> int:
+        with open(self.__path, "rb") as file:
+            magic, version, recordSize, baseStamp = self._HEADER.unpack(
+                file.read(self._HEADER.size))
+
+        if magic != self._MAGIC or version != self._VERSION or recordSize != self.__record.size:
+            raise ValueError(f"File does not match expected record format: {self.__path}")
+
+        return baseStamp
@@ -0,0 +1,108 @@
+# storage.snapshot.py
+import os
+import pathlib as pl
+import pickle
+import struct
+from typing import Any, Iterable, List, Optional, Tuple
+
+import debug.logger as clog
+
+logger = clog.getLogger(__name__)
+
+SourceStamp = Optional[Tuple[int, ...]]  # type alias: (mtime in ns, size, ...) or None
+
+
+class PickleSnapshot:
+    """ Binary cache of objects which were built from other files (the sources). Loading
+    it takes one read and no decoding or object construction through constructors.
+
+    The file starts with a header: Magic bytes and format version, followed by the
+    pickled stamps (mtime and size) of the sources at the time of saving, followed by the
+    pickled data (protocol 5). A snapshot is stale as soon as one of the stamps differs.
+
+    Bump `VERSION` whenever the layout of the pickled classes changes, so old snapshots
+    get ignored. As pickle is able to execute code, only load snapshots which this
+    application wrote itself.
+    """
+    VERSION: int = 3
+    _MAGIC: bytes = b"WTSN"
+    _HEADER = struct.Struct("<4sH")
+    _PROTOCOL: int = 5
+
+    def __init__(self, path: pl.Path, sourcePaths: Iterable[pl.Path]):
+        """ Constructor
+
+        :param path: Full path of the snapshot file
+        :param sourcePaths: Files or directories the snapshot data depends on. For a
+                            directory, the files inside it are taken into account.
+        """
+        self.__path: pl.Path = path
+        self.__sourcePaths: List[pl.Path] = list(sourcePaths)
+
+    @property
+    def path(self) -> pl.Path:
+        return self.__path
+
+    def save(self, data: Any) -> None:
+        """ Write the snapshot, along with the current stamps of its sources. Call this only
+        when the sources have been completely written.
+
+        :param data: Picklable data
+        :return: None
+        :raises: On file or pickling errors
+        """
+        self.__path.parent.mkdir(parents=True, exist_ok=True)
+        tempPath = self.__path.with_name(self.__path.name + ".tmp")
+
+        with open(tempPath, "wb") as file:
+            file.write(self._HEADER.pack(self._MAGIC, self.VERSION))
+            pickle.dump(self._getSourceStamps(), file, protocol=self._PROTOCOL)
+            pickle.dump(data, file, protocol=self._PROTOCOL)
+        tempPath.replace(self.__path)
+
+    def load(self) -> Optional[Any]:
+        """ Read the snapshot, if it exists and its sources did not change since it was
+        saved. Returns gracefully.
+
+        :return: The data, or None if the snapshot is missing, stale or unreadable
+        """
+        if not self.__path.is_file(): return None
+
+        try:
+            with open(self.__path, "rb") as file:
+                magic, version = self._HEADER.unpack(file.read(self._HEADER.size))
+                if magic != self._MAGIC or version != self.VERSION:
+                    logger.info("Ignored snapshot of another format version: %s", self.__path)
+                    return None
+
+                if pickle.load(file) != self._getSourceStamps():
+                    logger.info("Ignored stale snapshot: %s", self.__path)
+                    return None
+
+                return pickle.load(file)
+
+        except Exception as e:
+            logger.warning("Failed loading snapshot %s: %s", self.__path, e)
+            return None
+
+    def delete(self) -> None:
+        """ Delete the snapshot file.
+
+        :return: None
+        """
+        self.__path.unlink(missing_ok=True)
+
+    def _getSourceStamps(self) -> List[SourceStamp]:
+        return [self._getStamp(path) for path in self.__sourcePaths]
+
+    @staticmethod
+    def _getStamp(path: pl.Path) -> SourceStamp:
+        if path.is_dir():
+            # A directory's mtime only changes when entries get added or removed.
+            stats = [entry.stat() for entry in os.scandir(path) if entry.is_file()]
+            return (max((s.st_mtime_ns for s in stats), default=0),
+                    sum(s.st_size for s in stats), len(stats))
+        if path.is_file():
+            stat = path.stat()
+            return stat.st_mtime_ns, stat.st_size
+        return None
@@ -0,0 +1,94 @@
+# storage.sqliteDao.py
+import pathlib as pl
+import sqlite3
+from abc import ABC
+from typing import Optional, ClassVar, Tuple
+
+import debug.logger as clog
+from storage.base import Dao, Connectible, Connection, PathCheckMode
+
+logger = clog.getLogger(__name__)
+
+
+class SqliteConnection(Connection):
+
+    def __init__(self, path: pl.Path):
+        self.__db: Optional[sqlite3.Connection] = None
+        self.__path: pl.Path = path
+
+    @property
+    def db(self) -> Optional[sqlite3.Connection]:
+        return self.__db
+
+    @property
+    def path(self) -> pl.Path:
+        return self.__path
+
+    def open(self):
+        # SQLite creates the database file if it does not exist, so we only need the directory.
+        self.verifyPath(PathCheckMode.Directory)  # raises
+
+        try:
+            db = sqlite3.connect(str(self.path))
+            db.row_factory = sqlite3.Row
+            # Write-ahead logging: Readers do not block the writer and vice versa, and a
+            # commit appends to the log instead of rewriting database pages.
+            db.execute("PRAGMA journal_mode=WAL")
+            # Safe with WAL. Commits are durable as of the next checkpoint.
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            self.__db = db
+            logger.debug("SQLite connection succeeded at path %s", self.path)
+
+        except Exception as e:
+            raise IOError(f"SQLite database could not be opened at: {self.path}") from e
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.__db = None
+            logger.debug("SQLite connection closed at path %s", self.path)
+
+
+class SqliteDao(Dao, Connectible, ABC):
+    """ Interface for SQLite data access with some basic implementation. Concrete classes
+    define their tables by `_SCHEMA`, which is applied each time a connection gets opened.
+    """
+    _SCHEMA: ClassVar[Tuple[str, ...]] = tuple()
+    """ SQL statements which create tables and indexes if they not exist. """
+
+    def __init__(self, path: pl.Path = pl.Path()):
+        """ Constructor
+        :param path: Full path to the SQLite database file.
+        """
+        self.__connection = SqliteConnection(path)
+
+    def __enter__(self):
+        # Context manager entry. Works even in subclasses.
+        self.connection.open()
+        try:
+            self._createSchema()
+        except Exception:
+            self.connection.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Context manager exit. Works even in subclasses.
+        self.connection.close()
+
+    def __del__(self):
+        # Close connection when last reference to SqliteDao instance was invalidated.
+        if self.connection is not None and self.connection.isOpen:
+            self.connection.close()
+
+    @property
+    def connection(self) -> SqliteConnection:
+        return self.__connection
+
+    def _createSchema(self) -> None:
+        self.connection.raiseWhenDisconnected()  # raises
+
+        with self.connection.db as db:
+            for statement in self._SCHEMA:
+                db.execute(statement)
@@ -1,9 +1,13 @@
 # storage.tinyDao.py
 import pathlib as pl
+import threading
+import time
 from abc import ABC
-from typing import List, Optional
+from typing import List, Optional, Union, Callable, ClassVar, Dict, Any, Tuple
 
 import tinydb as tdb
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage
 
 import debug.logger as clog
 from storage.base import Dao, Connectible, Connection, PathCheckMode
@@ -11,14 +15,39 @@ from storage.base import Dao, Connectible, Connection, PathCheckMode
 logger = clog.getLogger(__name__)
 
 
+class IndexedTinyDB(tdb.TinyDB):
+    """ TinyDB which additionally holds in-memory field indexes. Indexes are built and kept
+    in sync by TinyDao, so they live as long as the TinyDB instance. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fieldIndexes: Dict[Tuple[str, str], Dict[Any, List[int]]] = dict()
+        """ Document IDs by field value, by (table name, field name). """
+
+
 class TinyConnection(Connection):
+    """ By default, each open() reads the whole JSON file and each close() releases it.
+
+    In persistent mode (see `enablePersistentMode`), open() hands out one TinyDB instance per
+    path which stays open for the life of the process. Its data is cached in memory and
+    writes are buffered (write-behind) until the buffer is full, the flush interval is due
+    at close(), or `flushShared` / `closeShared` gets called.
+    Shared databases may be used from different threads, as long as each database is only
+    used by one thread at a time. close() therefore flushes its own database only.
+    """
+    _isPersistentMode: ClassVar[bool] = False
+    _writeCacheSize: ClassVar[int] = 100
+    _flushIntervalScnds: ClassVar[float] = 5.0
+    _lastFlushStamps: ClassVar[Dict[pl.Path, float]] = dict()
+    _sharedDBs: ClassVar[Dict[pl.Path, IndexedTinyDB]] = dict()
+    _sharedLock: ClassVar[threading.RLock] = threading.RLock()
 
     def __init__(self, path: pl.Path):
         self.__db: Optional[tdb.TinyDB] = None
         self.__path: pl.Path = path
 
     @property
-    def db(self) -> Optional[tdb.TinyDB]:
+    def db(self) -> Optional[IndexedTinyDB]:
         return self.__db
 
     @property
@@ -30,9 +59,13 @@ class TinyConnection(Connection):
         # check for various file access situations as Tiny itself handles it.
         self.verifyPath(PathCheckMode.File)  # raises
 
+        if TinyConnection._isPersistentMode:
+            self.__db = self._getSharedDB(self.path)  # raises
+            return
+
         try:
             # Set ref to DB.
-            self.__db = tdb.TinyDB(self.path)
+            self.__db = IndexedTinyDB(self.path)
             logger.debug("TinyDB connection succeeded at path %s", self.path)
 
         except Exception as e:
@@ -41,10 +74,113 @@ class TinyConnection(Connection):
     def close(self):
         # Explicitly ask for db is not None since db may also have a dict or list of len 0,
         # which is not what we wanna know here.
-        if self.db is not None:
-            self.db.close()
-            self.__db = None  # IMPORTANT to invalidate; triggers __del__ if it's the last ref!
-            logger.debug("TinyDB connection closed at path %s", self.path)
+        if self.db is None:
+            return
+
+        key = self._getKey(self.path)
+        if self.db is TinyConnection._sharedDBs.get(key):
+            # Shared DB stays open, just release our reference.
+            self.__db = None
+            lastFlushStamp = TinyConnection._lastFlushStamps.get(key, 0.0)
+            if time.monotonic() - lastFlushStamp >= self._flushIntervalScnds:
+                self._flushSharedDB(key)
+            return
+
+        self.db.close()
+        self.__db = None  # IMPORTANT to invalidate; triggers __del__ if it's the last ref!
+        logger.debug("TinyDB connection closed at path %s", self.path)
+
+    @classmethod
+    def enablePersistentMode(cls, writeCacheSize: int = 100,
+                             flushIntervalScnds: float = 5.0) -> None:
+        """ Let all connections which get opened from now on share one TinyDB per path.
+
+        :param writeCacheSize: Count of buffered writes per database after which it gets
+                               written to disk.
+        :param flushIntervalScnds: Min. seconds between flushes triggered by close().
+        :return: None
+        """
+        cls._isPersistentMode = True
+        cls._writeCacheSize = max(1, writeCacheSize)
+        cls._flushIntervalScnds = max(0.0, flushIntervalScnds)
+        logger.debug("TinyDB persistent connections enabled. Write cache size: %s, "
+                     "flush interval: %s s", cls._writeCacheSize, cls._flushIntervalScnds)
+
+    @classmethod
+    def flushShared(cls) -> None:
+        """ Write buffered data of all shared databases to disk.
+
+        :return: None
+        """
+        with cls._sharedLock:
+            for key in list(cls._sharedDBs):
+                cls._flushSharedDB(key)
+
+    @classmethod
+    def closeShared(cls, path: pl.Path = None) -> None:
+        """ Flush and close shared databases. Connections opened afterwards load the
+        file again.
+
+        :param path: Close the shared database of this path only. Closes all if omitted.
+        :return: None
+        """
+        with cls._sharedLock:
+            keys = [cls._getKey(path)] if path else list(cls._sharedDBs)
+            dbs = [(key, cls._sharedDBs.pop(key, None)) for key in keys]
+
+        for key, db in dbs:
+            if db is None:
+                continue
+            cls._lastFlushStamps.pop(key, None)
+            try:
+                db.close()
+                logger.debug("Shared TinyDB closed at path %s", key)
+            except Exception as e:
+                logger.error("Failed closing TinyDB at path %s: %s", key, e, exc_info=True)
+
+    @classmethod
+    def disablePersistentMode(cls) -> None:
+        """ Close all shared databases and switch back to one TinyDB per connection.
+
+        :return: None
+        """
+        cls.closeShared()
+        cls._isPersistentMode = False
+
+    @classmethod
+    def _getSharedDB(cls, path: pl.Path) -> IndexedTinyDB:
+        key = cls._getKey(path)
+        with cls._sharedLock:
+            db = cls._sharedDBs.get(key)
+            if db is not None:
+                return db
+
+            try:
+                db = IndexedTinyDB(path, storage=CachingMiddleware(JSONStorage))
+                db._storage.WRITE_CACHE_SIZE = cls._writeCacheSize
+                cls._sharedDBs[key] = db
+                cls._lastFlushStamps[key] = time.monotonic()
+                logger.debug("Shared TinyDB opened at path %s", path)
+                return db
+
+            except Exception as e:
+                raise IOError(f"TinyDB file could not be opened at: {path}") from e
+
+    @classmethod
+    def _flushSharedDB(cls, key: pl.Path) -> None:
+        db = cls._sharedDBs.get(key)
+        if db is None:
+            return
+
+        cls._lastFlushStamps[key] = time.monotonic()
+        try:
+            db._storage.flush()
+        except Exception as e:
+            logger.error("Failed flushing TinyDB at path %s: %s", key, e, exc_info=True)
+
+    @staticmethod
+    def _getKey(path: pl.Path) -> pl.Path:
+        return pl.Path(path).resolve()
 
 
 class TinyDao(Dao, Connectible, ABC):
@@ -117,6 +253,7 @@ class TinyDao(Dao, Connectible, ABC):
             tdbTable = self._getTableObject()
             tdbTable.purge()
             tdbTable.insert_multiple(data)
+            self._dropFieldIndexes()
             logger.debug("Table data replaced: %s", repr(tdbTable))
 
         except Exception as e:
@@ -134,6 +271,7 @@ class TinyDao(Dao, Connectible, ABC):
         try:
             tdbTable = self._getTableObject()
             tdbTable.purge()
+            self._dropFieldIndexes()
             logger.debug("All table data deleted: %s", repr(tdbTable))
 
         except Exception as e:
@@ -150,6 +288,9 @@ class TinyDao(Dao, Connectible, ABC):
         # check for that. Also we return the new TinyDB document id of the Shop.
         tdbTable = self._getTableObject()  # raises
         newTinyID = tdbTable.insert(data)  # raises
+        for (table, field), index in self.connection.db.fieldIndexes.items():
+            if table == self._table:
+                self._addToFieldIndex(index, data.get(field), newTinyID)
         return newTinyID
 
     def update(self, data: dict) -> None:
@@ -176,31 +317,43 @@ class TinyDao(Dao, Connectible, ABC):
             raise ValueError(f"Failed updating data in table {self._table}. "
                              f"The 'uid' value is needed but empty. Data: {data}")
 
+        self._updateByUID(uid=uid, fields=data)  # raises
+
+    def _updateByUID(self, uid: str, fields: Union[dict, Callable[[dict], None]]) -> None:
+        """ Updates the one record which has the given UID.
+
+        :param uid: UID of the record to update
+        :param fields: Fields (dict) which are merged into the record, or a function which
+                       gets the record (dict) and modifies it in place.
+        :return: None
+        :raises: When UID was not found, or multiple UIDs were found
+        """
         self.connection.raiseWhenDisconnected()  # raises
 
         table = self._getTableObject()
 
-        # Prepare statement
-        condition = tdb.Query().uid == uid
-
         # Find occurrences of uid. We expect a list with one single element.
-        # Returns list with 0 elements if not found.
-        results: List[tdb.database.Document] = table.search(cond=condition)
+        docIDs = self._getFieldIndex("uid").get(uid, list())
 
-        if not results:
+        if not docIDs:
             raise LookupError(
                 f"Failed updating database. UID {uid} not found in table '{self._table}'")
 
         # Finding multiple results is supposed to be an error
         # since we're searching for a UUIDv4
-        if len(results) > 1:
+        if len(docIDs) > 1:
             raise LookupError(
-                f"Failed updating database. UID {uid} found {len(results)} times in "
+                f"Failed updating database. UID {uid} found {len(docIDs)} times in "
                 f"table '{self._table}'. Expected only one. "
                 "Check your database for UID duplicates!"
             )
 
-        table.update(data, condition)
+        table.update(fields, doc_ids=docIDs)
+
+        # Values of indexed fields may have changed. Index of 'uid' stays valid, as we
+        # update by UID.
+        changedFields = fields.keys() if isinstance(fields, dict) else None
+        self._dropFieldIndexes(fields=changedFields, keep="uid")
 
     def find(self, condition: tdb.queries.QueryImpl) -> List[dict]:
         """ Find all documents which match the given search condition.
@@ -228,6 +381,58 @@ class TinyDao(Dao, Connectible, ABC):
 
         return results
 
+    def _findByField(self, field: str, value: Any) -> List[tdb.database.Document]:
+        """ Find all documents of which the given field equals the given value. Other than
+        find(), this uses an in-memory index of the field instead of querying each document.
+
+        :param field: Name of a root level field
+        :param value: Hashable value to search for
+        :return: The list of matching documents or an empty list if not found.
+        """
+        self.connection.raiseWhenDisconnected()  # raises
+
+        docIDs = self._getFieldIndex(field).get(value, list())
+        if not docIDs:
+            return list()
+
+        table = self._getTableObject()
+        docs = [table.get(doc_id=docID) for docID in docIDs]
+        return [doc for doc in docs if doc is not None]
+
+    def _getFieldIndex(self, field: str) -> Dict[Any, List[int]]:
+        """ Document IDs by value of the given field. Built with one pass over the table
+        on first use, then kept in sync by this class' write methods. """
+        key = (self._table, field)
+        index = self.connection.db.fieldIndexes.get(key)
+
+        if index is None:
+            index = dict()
+            for doc in self._getTableObject().all():
+                self._addToFieldIndex(index, doc.get(field), doc.doc_id)
+            self.connection.db.fieldIndexes[key] = index
+
+        return index
+
+    @staticmethod
+    def _addToFieldIndex(index: Dict[Any, List[int]], value: Any, docID: int) -> None:
+        try:
+            index.setdefault(value, list()).append(docID)
+        except TypeError:
+            # Unhashable values (lists, dicts) can't be searched by index anyway.
+            pass
+
+    def _dropFieldIndexes(self, fields=None, keep: str = None) -> None:
+        """ Invalidates indexes of this table, so they get rebuilt on next use.
+
+        :param fields: Names of fields of which the indexes get dropped. All if None.
+        :param keep: Name of a field of which the index must be kept.
+        :return: None
+        """
+        indexes = self.connection.db.fieldIndexes
+        for table, field in list(indexes):
+            if table == self._table and field != keep and (fields is None or field in fields):
+                del indexes[(table, field)]
+
     def _getTableObject(self) -> tdb.database.Table:
         """ Caution: Creates new table with name self._table if not exists.
         :return: TinyDB Table object
@@ -1,26 +1,43 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import argparse
 import asyncio
+import atexit
+import dataclasses
+import multiprocessing
+import os
+import signal
+import socket
 import sys
+import time
 from typing import TYPE_CHECKING
 
 import debug.logger as clog
 import network.messenger as msn
+from cluster.coordinator import Coordinator
+from cluster.node import CoordinatorClient, CoordinatorShopDao
+from cluster.supervisor import Supervisor, WorkerContext, WorkerMetrics, assignShops
 from network.connection import AioHttpRequest, AioHttpSession
+from network.eventLoop import setEventLoop
 from network.proxyDao import FileProxyDao
 from network.proxyRepo import ProxyRepo
 from network.userAgentDao import FileUserAgentDao
 from network.userAgentRepo import UserAgentRepo
 from scraper.base import ScraperFactory
+from shop.productHistory import ProductHistory
 from shop.productsUrlsDao import ProductsUrlsDao
 from shop.productsUrlsRepo import ProductsUrlsRepo
-from shop.shopDao import TinyShopDao
-from shop.shopRepo import ShopRepo
+from shop.shopDao import TinyShopDao, SqliteShopDao, ShardedTinyShopDao, JournaledShopDao
+from shop.shopRepo import AsyncShopRepo
 from config.base import APP_CONFIG_REPO, APP_USERDATA_DIR
+from storage.fileWatcher import FileWatcher
+from storage.snapshot import PickleSnapshot
+from storage.tinyDao import TinyConnection
 
 if TYPE_CHECKING:
-    from typing import List, TYPE_CHECKING
+    from typing import Dict, List, Optional, TYPE_CHECKING
+    from config.base import ProcessConfig
     from network.connection import Request, Session
     from scraper.base import Scraper
     from shop.shop import Shop
@@ -29,13 +46,72 @@ logger = clog.getLogger(__name__)
 
 
 class Main:
+    _JOURNAL_CHECK_INTERVAL_SCNDS = 60
+    _PRODUCTS_URLS_CHECK_INTERVAL_SCNDS = 5
+    _SUPERVISOR_POLL_INTERVAL_SCNDS = 1
+    _WORKER_STOP_CHECK_INTERVAL_SCNDS = 0.5
+    _WORKER_METRICS_INTERVAL_SCNDS = 60
 
-    def __init__(self):
+    def __init__(self, worker: Optional[WorkerContext] = None,
+                 processConfig: Optional[ProcessConfig] = None):
+        """ Constructor
+
+        :param worker: If set, this is a worker process of a supervisor (see `runSupervised`),
+                       which runs the scrapers of the worker's shops only.
+        :param processConfig: Process configuration. If not set, it gets loaded.
+        """
+        self._worker = worker
+        self._processConfig = processConfig or APP_CONFIG_REPO.findProcessConfig()
+        # Workers of a supervisor are never part of a cluster.
+        clusterRole = "" if worker else self._processConfig.clusterRole
+        self._coordinatorClient: Optional[CoordinatorClient] = None
+        self._coordinator: Optional[Coordinator] = None
         self.logfilePath = APP_USERDATA_DIR / "Logs/log_current.txt"
-        self.shopsRepoPath = APP_USERDATA_DIR / "Shops.json"
-        shopDao = TinyShopDao(path=self.shopsRepoPath)
+        storageConfig = APP_CONFIG_REPO.findStorageConfig()
+        self._storageConfig = storageConfig
+        if storageConfig.tinyPersistentConnections:
+            TinyConnection.enablePersistentMode(
+                writeCacheSize=storageConfig.tinyWriteCacheSize,
+                flushIntervalScnds=storageConfig.tinyFlushIntervalScnds)
+            # Last resort to write buffered data, e.g. when we did not reach run().
+            atexit.register(TinyConnection.closeShared)
+
+        if storageConfig.shopsBackend == "sqlite":
+            self.shopsRepoPath = APP_USERDATA_DIR / "Shops.sqlite"
+            shopDao = SqliteShopDao(path=self.shopsRepoPath)
+        elif storageConfig.shopsBackend == "tinydb-sharded":
+            # A directory. Gets created by the DAO if not exists.
+            self.shopsRepoPath = APP_USERDATA_DIR / "Shops"
+            shopDao = ShardedTinyShopDao(directory=self.shopsRepoPath, lazyProducts=True)
+        else:
+            self.shopsRepoPath = APP_USERDATA_DIR / "Shops.json"
+            shopDao = TinyShopDao(path=self.shopsRepoPath, lazyProducts=True)
+        self.shopsJournalDao: Optional[JournaledShopDao] = None
+        self.shopsJournalCompactBytes = storageConfig.shopsJournalCompactBytes
+        if clusterRole == "node":
+            # Shops are owned by the coordinator, nodes keep no shop files.
+            nodeID = self._processConfig.clusterNodeID or f"{socket.gethostname()}-{os.getpid()}"
+            self._coordinatorClient = CoordinatorClient(
+                address=self._processConfig.clusterAddress, nodeID=nodeID)
+            shopDao = CoordinatorShopDao(client=self._coordinatorClient)
+        elif storageConfig.shopsJournal or clusterRole == "coordinator":
+            # The coordinator writes the changes of nodes as journal records.
+            self.shopsJournalDao = JournaledShopDao(
+                snapshotDao=shopDao, journalPath=APP_USERDATA_DIR / "Shops.journal.jsonl")
+            shopDao = self.shopsJournalDao
         self.productsUrlsRepoPath = APP_USERDATA_DIR / "ProductsURLs.txt"
         productsUrlsDao = ProductsUrlsDao(filepath=self.productsUrlsRepoPath)
+        self.shopsSnapshot: Optional[PickleSnapshot] = None
+        if storageConfig.startupSnapshot and not (worker or clusterRole):
+            snapshotSources = [self.shopsRepoPath, self.productsUrlsRepoPath]
+            if self.shopsJournalDao:
+                snapshotSources.append(self.shopsJournalDao.journal.path)
+            if storageConfig.shopsBackend == "sqlite":
+                # Uncheckpointed writes only change the write-ahead log.
+                snapshotSources.append(self.shopsRepoPath.with_name(
+                    self.shopsRepoPath.name + "-wal"))
+            self.shopsSnapshot = PickleSnapshot(
+                path=APP_USERDATA_DIR / "Shops.snapshot", sourcePaths=snapshotSources)
         self.messengersRepoPath = APP_USERDATA_DIR / "Messengers.json"
         discordMessengerDao = msn.DiscordTinyDao(path=self.messengersRepoPath)
         self.proxiesRepoPath = APP_USERDATA_DIR / "Proxies.txt"
@@ -43,7 +119,12 @@ class Main:
         self.userAgentsRepoPath = APP_USERDATA_DIR / "UserAgents.txt"
         userAgentDao = FileUserAgentDao(filepath=self.userAgentsRepoPath)
 
-        self.shopRepo = ShopRepo(dao=shopDao)
+        productHistory = None
+        if storageConfig.productHistory and not clusterRole:
+            productHistory = ProductHistory(directory=APP_USERDATA_DIR / "History")
+
+        # Shop writes run on a writer thread, so scrapers don't block on file I/O.
+        self.shopRepo = AsyncShopRepo(dao=shopDao, history=productHistory)
         self.productsUrlsRepo = ProductsUrlsRepo(dao=productsUrlsDao)
         self.discordMessengerRepo = msn.Repo(dao=discordMessengerDao)
         self.proxyRepo = ProxyRepo(dao=proxyDao)
@@ -52,33 +133,366 @@ class Main:
         self.session = None
         self.scrapers: List[Scraper] = list()
         self.shops: List[Shop] = list()
+        self._scraperFactory = ScraperFactory()
+        self._messenger: Optional[msn.Discord] = None
+        self._scraperTasks: Dict[str, asyncio.Task] = dict()
+        """ Running scraper loops by UID of their shop. """
+        self._scrapersDone: Optional[asyncio.Future] = None
 
         self._configureLogger()
         self._createRepoFilesIfNotExist()
 
     async def run(self):
         self._setShops()
+        backgroundTasks: List[asyncio.Future] = list()
 
         try:
             await self._startHttpSession()
             await self._setScrapers()
 
-            # Create runners, start scraping
-            loopRunners = [s.loopRun() for s in self.scrapers]
-            await asyncio.gather(*loopRunners)
+            # Runs until a scraper fails, all scrapers have been stopped, the
+            # supervisor asks to stop, or this node lost its lease.
+            self._scrapersDone = asyncio.get_running_loop().create_future()
+
+            if self.shopsJournalDao:
+                backgroundTasks.append(asyncio.ensure_future(self._compactShopsJournalLoop()))
+            if self._worker:
+                backgroundTasks.append(asyncio.ensure_future(self._watchSupervisorLoop()))
+            elif self._coordinatorClient:
+                backgroundTasks.append(asyncio.ensure_future(self._heartbeatLoop()))
+            else:
+                backgroundTasks.append(asyncio.ensure_future(self._watchProductsUrlsLoop()))
+
+            for scraper in self.scrapers:
+                self._startScraper(scraper)
+            await self._scrapersDone
+
+        finally:
+            for task in [*backgroundTasks, *self._scraperTasks.values()]:
+                task.cancel()
+            isShopsWritten = False
+            try:
+                # Write shop changes which did not make it to the end of an iteration
+                # and wait for all writes in flight.
+                await self.shopRepo.close()
+                isShopsWritten = True
+                stats = self.shopRepo.stats
+                logger.info("Shop storage: %d updates merged into %d shop writes (merge ratio "
+                            "%.2f), max. queue depth %d.", stats.receivedUpdates,
+                            stats.writtenShops, stats.mergeRatio, stats.maxQueueDepth)
+            finally:
+                # Write buffered data of persistent TinyDB connections.
+                TinyConnection.closeShared()
+                if isShopsWritten:
+                    self._saveShopsSnapshot()
+                if self._worker:
+                    self._reportMetrics()
+                if self._coordinatorClient:
+                    await self._leaveCluster()
+                await self.session.close()
+
+    async def runCoordinator(self):
+        """ Coordinator mode: Hold the shops and lease them to worker nodes, until
+        interrupted. Nodes run the scrapers and write their shops through this process,
+        see `Coordinator`. When the product URLs change, the shops get updated.
+
+        :return: None
+        """
+        self._setShops()
+        self._coordinator = Coordinator(shopRepo=self.shopRepo,
+                                        journalDao=self.shopsJournalDao,
+                                        leaseScnds=self._processConfig.clusterLeaseScnds)
+        self._coordinator.setShopUIDs(shop.uid for shop in self.shops)
+        # Nodes load the shops from the journal.
+        self.shops = list()
+        compactorTask = None
+
+        try:
+            await self._coordinator.start(self._processConfig.clusterAddress)
+            compactorTask = asyncio.ensure_future(self._compactShopsJournalLoop())
+            await self._watchProductsUrlsLoop()
+
+        finally:
+            if compactorTask:
+                compactorTask.cancel()
+            try:
+                await self._coordinator.close()
+                await self.shopRepo.close()
+            finally:
+                TinyConnection.closeShared()
+
+    def runSupervised(self, workerCount: int) -> None:
+        """ Supervisor mode: Run the scrapers in worker processes, until interrupted.
+        Shops get distributed across workers by their cost, see `assignShops`. Workers
+        which crashed get restarted. When the product URLs change, all workers get stopped
+        and started again with the updated shops.
+
+        Workers write their shops themselves. If the storage configuration does not allow
+        that, all scrapers run in this process instead, see `run`.
+
+        :param workerCount: Max. count of worker processes
+        :return: None
+        """
+        blockers = self._getSupervisorBlockers()
+        if blockers:
+            logger.warning("Supervisor mode is not possible, running all scrapers in this "
+                           "process. Reason: %s", "; ".join(blockers))
+            asyncio.run(self.run())
+            return
+
+        watcher = FileWatcher(self.productsUrlsRepoPath)
+        with Supervisor(target=_runWorker) as supervisor:
+            try:
+                supervisor.start(self._assignShopsToWorkers(workerCount))
+                while supervisor.isRunning:
+                    time.sleep(self._SUPERVISOR_POLL_INTERVAL_SCNDS)
+                    supervisor.poll()
+                    if watcher.hasChanged():
+                        logger.info("Product URLs changed. Restarting workers.")
+                        supervisor.stop()
+                        supervisor.start(self._assignShopsToWorkers(workerCount))
+
+            finally:
+                supervisor.stop()
+                stats = supervisor.getStorageStats()
+                logger.info("Supervisor ended after %d worker restarts. Shop storage of all "
+                            "workers: %d updates merged into %d shop writes (merge ratio "
+                            "%.2f), max. queue depth %d.", supervisor.restartCount,
+                            stats.receivedUpdates, stats.writtenShops, stats.mergeRatio,
+                            stats.maxQueueDepth)
 
+    def _getSupervisorBlockers(self) -> List[str]:
+        # Workers write concurrently, so each file may be written by one worker only.
+        config = self._storageConfig
+        blockers = list()
+        if config.shopsBackend == "tinydb-sharded":
+            # Workers update the manifest whenever a shop's name or URL changes.
+            blockers.append("Shops backend 'tinydb-sharded' has one manifest for all shops")
+        elif config.shopsBackend != "sqlite":
+            blockers.append(f"Shops backend '{config.shopsBackend}' keeps all shops in one file")
+        if config.shopsJournal:
+            blockers.append("The shops journal is one file for all shops")
+        if config.productHistory:
+            blockers.append("The product history has one index for all products")
+        return blockers
+
+    def _assignShopsToWorkers(self, workerCount: int) -> List[List[str]]:
+        self._setShops()
+        # Workers load their shops from the backend. So write buffered data first, and load
+        # the files again next time, as workers are going to change them.
+        TinyConnection.closeShared()
+
+        shops = [shop for shop in self.shops if self._scraperFactory.isSupported(shop)]
+        if not shops:
+            raise LookupError("No scrapers were generated.")
+
+        groups = assignShops(shops, workerCount)
+        logger.info("Assigned %d shops to %d workers.", len(shops), len(groups))
+        return groups
+
+    async def _watchSupervisorLoop(self):
+        lastReportStamp = time.monotonic()
+        while not self._worker.isStopRequested:
+            await asyncio.sleep(self._WORKER_STOP_CHECK_INTERVAL_SCNDS)
+            if time.monotonic() - lastReportStamp >= self._WORKER_METRICS_INTERVAL_SCNDS:
+                self._reportMetrics()
+                lastReportStamp = time.monotonic()
+
+        logger.info("Stopping, as requested by the supervisor.")
+        if not self._scrapersDone.done():
+            self._scrapersDone.set_result(None)
+
+    def _reportMetrics(self):
+        self._worker.reportMetrics(WorkerMetrics(
+            name=self._worker.name,
+            pid=os.getpid(),
+            shopCount=len(self.shops),
+            scraperCount=len(self.scrapers),
+            storage=dataclasses.replace(self.shopRepo.stats)))
+
+    async def _heartbeatLoop(self):
+        # Renews the lease of this node and applies the shops which the coordinator
+        # assigns. Without a lease, another node may run our shops, so we stop.
+        client = self._coordinatorClient
+        loop = asyncio.get_running_loop()
+        lastLeaseStamp = time.monotonic()
+        delay = client.leaseScnds / 3
+
+        while True:
+            await asyncio.sleep(delay)
+            delay = client.leaseScnds / 3
+            requestStamp = time.monotonic()
+            try:
+                holding = [shop.uid for shop in self.shops]
+                assignedUIDs = await loop.run_in_executor(None, client.heartbeat, holding)
+
+            except ConnectionError as e:
+                if time.monotonic() - lastLeaseStamp < client.leaseScnds:
+                    logger.warning("Heartbeat failed: %s", e)
+                    continue
+                if not self._scrapersDone.done():
+                    self._scrapersDone.set_exception(ConnectionError(
+                        f"Lost the lease of node {client.nodeID}: {e}"))
+                return
+
+            lastLeaseStamp = requestStamp
+            try:
+                if await self._applyAssignedShops(assignedUIDs):
+                    # Tell the coordinator about released shops right away.
+                    delay = 0
+            except Exception as e:
+                logger.error("Failed applying assigned shops: %s", e, exc_info=True)
+
+    async def _applyAssignedShops(self, assignedUIDs: List[str]) -> bool:
+        # Returns True if shops were released.
+        assignedUIDs = set(assignedUIDs)
+        releasedShops = [shop for shop in self.shops if shop.uid not in assignedUIDs]
+        heldUIDs = {shop.uid for shop in self.shops}
+        newUIDs = [uid for uid in assignedUIDs if uid not in heldUIDs]
+
+        if releasedShops:
+            releasedUIDs = {shop.uid for shop in releasedShops}
+            tasks = [self._scraperTasks.pop(uid) for uid in releasedUIDs
+                     if uid in self._scraperTasks]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.scrapers = [s for s in self.scrapers if s.scrapee.uid not in releasedUIDs]
+            try:
+                # Shops count as held until their changes are written.
+                await self.shopRepo.flush()
+            except Exception as e:
+                logger.error("Failed writing released shops: %s", e)
+            self.shopRepo.discardPending(releasedUIDs)
+            self.shops = [shop for shop in self.shops if shop.uid not in releasedUIDs]
+            logger.info("Released %d shops.", len(releasedShops))
+
+        if newUIDs:
+            loop = asyncio.get_running_loop()
+            shops = await loop.run_in_executor(
+                None, self._coordinatorClient.getShops, newUIDs)  # raises
+            self.shops.extend(shops)
+            for shop in shops:
+                try:
+                    scraper = self._makeScraper(shop)
+                except LookupError as e:
+                    # Still held, else the coordinator would assign it again and again.
+                    logger.warning("Scraper factory: %s", e)
+                    continue
+                self.scrapers.append(scraper)
+                self._startScraper(scraper)
+            logger.info("Took over %d shops.", len(shops))
+
+        return bool(releasedShops)
+
+    async def _leaveCluster(self):
+        # So other nodes take over our shops right away, not after our lease expired.
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._coordinatorClient.leave)
+        except Exception as e:
+            logger.warning("Failed leaving the cluster: %s", e)
         finally:
-            await self.session.close()
+            self._coordinatorClient.close()
+
+    async def _compactShopsJournalLoop(self):
+        while True:
+            await asyncio.sleep(self._JOURNAL_CHECK_INTERVAL_SCNDS)
+            if self.shopsJournalDao.journal.size < self.shopsJournalCompactBytes:
+                continue
+            try:
+                # Serialized with the journal writes.
+                await self.shopRepo.runExclusive(self.shopsJournalDao.compact)
+            except Exception as e:
+                logger.error("Failed compacting shops journal: %s", e, exc_info=True)
+
+    async def _watchProductsUrlsLoop(self):
+        watcher = FileWatcher(self.productsUrlsRepoPath)
+        while True:
+            await asyncio.sleep(self._PRODUCTS_URLS_CHECK_INTERVAL_SCNDS)
+            if not watcher.hasChanged():
+                continue
+            try:
+                await self._reloadProductsUrls()
+            except Exception as e:
+                logger.error("Failed reloading product URLs: %s", e, exc_info=True)
+
+    async def _reloadProductsUrls(self):
+        if self._coordinator:
+            plan = await self._coordinator.reloadFromProductsUrls(self.productsUrlsRepo)
+            logger.info("Reloaded product URLs. %s", plan)
+            return
+
+        # Running shops get updated in place. Scrapers take their new products with
+        # their next iteration.
+        shops, plan = await self.shopRepo.reloadFromProductsUrls(
+            shops=self.shops, productsUrlsRepo=self.productsUrlsRepo)
+        if plan.isEmpty:
+            logger.info("Product URLs changed, but shops are up-to-date.")
+            return
+
+        self.shops = shops
+        removedUIDs = {shop.uid for shop in plan.removeShops}
+        self.scrapers = [s for s in self.scrapers if s.scrapee.uid not in removedUIDs]
+        for uid in removedUIDs:
+            task = self._scraperTasks.pop(uid, None)
+            if task:
+                task.cancel()
+
+        for shop in plan.addShops:
+            try:
+                scraper = self._makeScraper(shop)
+            except LookupError as e:
+                logger.warning("Scraper factory: %s", e)
+                continue
+            self.scrapers.append(scraper)
+            self._startScraper(scraper)
+
+        logger.info("Reloaded product URLs. %s", plan)
+
+    def _startScraper(self, scraper: Scraper):
+        task = asyncio.ensure_future(scraper.loopRun())
+        self._scraperTasks[scraper.scrapee.uid] = task
+        task.add_done_callback(self._onScraperDone)
+
+    def _onScraperDone(self, task: asyncio.Task):
+        # Cancelled scrapers were stopped on purpose, e.g. as their shop was removed.
+        if self._scrapersDone.done() or task.cancelled():
+            return
+        if task.exception():
+            self._scrapersDone.set_exception(task.exception())
+        elif all(t.done() for t in self._scraperTasks.values()):
+            self._scrapersDone.set_result(None)
+
+    def _saveShopsSnapshot(self):
+        # Only after all shops have been written, else the snapshot would not match the
+        # shops backend.
+        if not (self.shopsSnapshot and self.shops):
+            return
+        try:
+            self.shopsSnapshot.save(self.shops)
+        except Exception as e:
+            logger.error("Failed saving shops snapshot: %s", e, exc_info=True)
+            self.shopsSnapshot.delete()
 
     def _configureLogger(self):
         loggerConfig = APP_CONFIG_REPO.findLoggerConfig()
+        if self._worker:
+            # The supervisor writes the logs of all workers.
+            clog.configureQueueLogger(logger=clog.getRootLogger(),
+                                      config=loggerConfig,
+                                      queue=self._worker.logQueue)
+            return
         clog.configureLogger(logger=clog.getRootLogger(),
                              config=loggerConfig,
                              logfilePath=self.logfilePath)
 
     def _createRepoFilesIfNotExist(self):
-        if not self.shopsRepoPath.is_file():
-            self.shopsRepoPath.touch(exist_ok=False)
+        if not self.shopsRepoPath.exists():
+            if self.shopsRepoPath.suffix:
+                self.shopsRepoPath.touch(exist_ok=False)
+            else:
+                self.shopsRepoPath.mkdir(parents=True)
         if not self.productsUrlsRepoPath.is_file():
             self.productsUrlsRepoPath.touch(exist_ok=False)
         if not self.messengersRepoPath.is_file():
@@ -89,6 +503,29 @@ class Main:
             self.userAgentsRepoPath.touch(exist_ok=False)
 
     def _setShops(self):
+        if self._coordinatorClient:
+            # The coordinator keeps the shops in sync with the ProductsUrls repository.
+            uids = self._coordinatorClient.heartbeat(holding=list())  # raises
+            self.shops = self._coordinatorClient.getShops(uids) if uids else list()  # raises
+            logger.info("Joined the cluster as node %s with %d shops.",
+                        self._coordinatorClient.nodeID, len(self.shops))
+            return
+
+        if self._worker:
+            # The supervisor already updated the shops from the ProductsUrls repository.
+            self.shops = [self.shopRepo.findByUID(uid) for uid in self._worker.shopUIDs]
+            logger.info("Loaded %d shops.", len(self.shops))
+            return
+
+        if self.shopsSnapshot:
+            # Valid as long as neither the shops nor the ProductsUrls changed since it was saved,
+            # so shops are already in sync with the ProductsUrls repository.
+            self.shops = self.shopsSnapshot.load()
+            if self.shops:
+                logger.info("Loaded %d shops from snapshot %s",
+                            len(self.shops), self.shopsSnapshot.path)
+                return
+
         # Update shop repo by looking through the ProductsUrls repository.
         # This adds and/or deletes repo-shops and/or repo-products which do not correspond to
         # the detected ProductsUrls.
@@ -106,43 +543,113 @@ class Main:
                                                userAgentRepo=self.userAgentRepo)
 
     async def _setScrapers(self):
-        if not self.shops:
+        # Nodes may get their shops later on, see `_heartbeatLoop`.
+        isNode = self._coordinatorClient is not None
+        if not (self.shops or isNode):
             raise AttributeError("Unable to create scrapers: Shops are not set.")
         if not self.session:
             raise AttributeError("Unable to create scrapers: Session not set.")
 
         messengerRequest: Request = AioHttpRequest(session=self.session)
-        discordMessenger = msn.Discord(request=messengerRequest, repo=self.discordMessengerRepo)
+        self._messenger = msn.Discord(request=messengerRequest, repo=self.discordMessengerRepo)
 
-        scraperFactory = ScraperFactory()
-        self.scrapers = scraperFactory.makeFromScrapees(
+        self.scrapers = self._scraperFactory.makeFromScrapees(
             scrapees=self.shops,
             scrapeeRepo=self.shopRepo,
             session=self.session,
             requestClass=AioHttpRequest,
-            messenger=discordMessenger)
+            messenger=self._messenger)
 
-        if not self.scrapers:
+        if not (self.scrapers or isNode):
             raise LookupError("No scrapers were generated.")
 
+    def _makeScraper(self, shop: Shop) -> Scraper:
+        return self._scraperFactory.makeFromScrapee(
+            scrapee=shop,
+            scrapeeRepo=self.shopRepo,
+            session=self.session,
+            requestClass=AioHttpRequest,
+            messenger=self._messenger)
+
+
+def _exitOnSignal(signum, frame):
+    # Turn termination into an exception, so 'finally' blocks get the chance to write data.
+    raise SystemExit(f"Received signal {signum}")
+
+
+def _setEventLoopPolicy(eventLoop: str):
+    eventLoop = setEventLoop(eventLoop)
+    logger.info("Using event loop '%s'.", eventLoop)
+
+
+def _parseArgs() -> argparse.Namespace:
+    # Overrides of the process configuration, e.g. to run a coordinator and several nodes
+    # with the same user data directory.
+    parser = argparse.ArgumentParser(description="Webtomator")
+    parser.add_argument("--cluster-role", choices=("coordinator", "node"),
+                        help="Run as coordinator or node of a cluster.")
+    parser.add_argument("--cluster-address",
+                        help="Address of the coordinator: 'host:port' or 'unix:/path'.")
+    parser.add_argument("--node-id", help="ID of this node, unique within the cluster.")
+    return parser.parse_args()
+
+
+def _runWorker(worker: WorkerContext):
+    # Entry point of worker processes. Ctrl+C reaches all processes of a terminal, but
+    # workers wait for their supervisor to ask them to stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _exitOnSignal)
+
+    main = Main(worker=worker)
+    try:
+        _setEventLoopPolicy(APP_CONFIG_REPO.findProcessConfig().eventLoop)
+        asyncio.run(main.run())
+
+    except SystemExit as e:
+        logger.info("Worker ended: %s", e)
+        raise
+
+    except Exception as e:
+        logger.error("Worker ended: %s", e, exc_info=True)
+        sys.exit(1)
+
 
 if __name__ == "__main__":
+    # Needed by worker processes of frozen builds.
+    multiprocessing.freeze_support()
+
+    args = _parseArgs()
+    processConfig = APP_CONFIG_REPO.findProcessConfig()
+    if args.cluster_role:
+        processConfig.clusterRole = args.cluster_role
+    if args.cluster_address:
+        processConfig.clusterAddress = args.cluster_address
+    if args.node_id:
+        processConfig.clusterNodeID = args.node_id
+
     # Logger not configured at this time, so we print
     print("Webtomator started. Initializing...")
+    signal.signal(signal.SIGTERM, _exitOnSignal)
 
-    main = Main()
+    main = Main(processConfig=processConfig)
     logger.info("Webtomator initialized. Your user data directory is %s", APP_USERDATA_DIR)
 
     try:
-        if sys.platform == 'win32' and sys.version_info >= (3, 8, 0):
-            # Use this workaround on Win for Python >= 3.8, else
-            # web proxies won't work with aiohttp.
-            # source: https://github.com/aio-libs/aiohttp/issues/2245#issuecomment-545586306
-            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-        asyncio.run(main.run())
+        _setEventLoopPolicy(processConfig.eventLoop)
+        if processConfig.clusterRole == "coordinator":
+            asyncio.run(main.runCoordinator())
+        elif processConfig.clusterRole == "node":
+            asyncio.run(main.run())
+        elif processConfig.supervisor:
+            main.runSupervised(workerCount=processConfig.workerProcesses or os.cpu_count() or 1)
+        else:
+            asyncio.run(main.run())
 
     except KeyboardInterrupt:
         logger.info("Webtomator ended by KeyboardInterrupt.")
 
+    except SystemExit as e:
+        logger.info("Webtomator ended: %s", e)
+
     except Exception as globExc:
         logger.error("Webtomator ended: %s", globExc, exc_info=True)